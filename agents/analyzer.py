@@ -5,13 +5,38 @@ import numpy as np
 import re
 from datetime import datetime
 import logging
+import threading
+from collections import OrderedDict
+from utils.fiscal_periods import PeriodLedger, identify_fiscal_period
+from utils.chart_series import build_chart_series
+from utils.numeric_parser import parse_numeric_value, parse_table
+from utils.table_classifier import (
+    INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW, OTHER, STATEMENT_TYPES, index_tables, score_table
+)
 
 class FinancialAnalyzer:
     """Extract and calculate financial metrics from parsed documents"""
     
-    def __init__(self):
+    def __init__(self, llm_extractor=None, metrics_cache_size=512):
+        """
+        Args:
+            llm_extractor (LLMMetricExtractor): Optional fallback for filings whose tables yield
+                fewer than half the key metrics; without it the text patterns are used.
+            metrics_cache_size (int): Filings whose extracted metrics are kept for later calls.
+        """
         self.logger = logging.getLogger(__name__)
         
+        # Extracted metrics per filing (most recently used last), so filings seen by an
+        # earlier call are not parsed again; periods are rebuilt on every analyze(). The
+        # analyzer is shared by concurrent jobs, so the cache is only touched under its lock.
+        self.metrics_cache_size = metrics_cache_size
+        self._metrics_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # LLM fallback and its usage per filing
+        self.llm_extractor = llm_extractor
+        self.extraction_costs = {}
+        
         # Define key financial metrics to look for
         self.key_metrics = [
             "revenue", "net_income", "operating_income", "gross_profit",
@@ -32,102 +57,274 @@ class FinancialAnalyzer:
             "cash_and_equivalents": ["cash and cash equivalents", "cash and equivalents"],
             "long_term_debt": ["long-term debt", "long term debt"],
             "short_term_debt": ["short-term debt", "current portion of debt"],
-            "operating_cash_flow": ["net cash provided by operating activities", "cash from operations"],
-            "capex": ["capital expenditures", "purchases of property and equipment"],
+            "operating_cash_flow": ["net cash provided by operating activities", "cash generated by operating activities",
+                                    "cash from operations"],
+            "capex": ["capital expenditures", "purchases of property and equipment",
+                      "payments for acquisition of property, plant and equipment"],
             "r_and_d": ["research and development", "r&d expense"]
         }
+        
+        # Statement each metric is reported on; only tables tagged with that type are searched
+        self.metric_statements = {
+            "revenue": INCOME_STATEMENT, "net_income": INCOME_STATEMENT,
+            "operating_income": INCOME_STATEMENT, "gross_profit": INCOME_STATEMENT,
+            "r_and_d": INCOME_STATEMENT,
+            "total_assets": BALANCE_SHEET, "total_liabilities": BALANCE_SHEET,
+            "total_equity": BALANCE_SHEET, "cash_and_equivalents": BALANCE_SHEET,
+            "long_term_debt": BALANCE_SHEET, "short_term_debt": BALANCE_SHEET,
+            "operating_cash_flow": CASH_FLOW, "capex": CASH_FLOW
+        }
+        
+        # Text patterns are compiled once rather than per section and term. An amount needs a
+        # "$" or a unit, so years and other bare numbers ("fiscal 2024") are not taken for it
+        amount = r"\$\s?\d[\d,]*(?:\.\d+)?(?:\s*(?:thousand|million|billion)s?)?" \
+                 r"|(?<![\d.,])\d[\d,]*(?:\.\d+)?\s*(?:thousand|million|billion)s?\b"
+        self._text_patterns = {
+            term: re.compile(re.escape(term) + r"[^\n]*?(" + amount + ")")
+            for terms in self.search_terms.values() for term in terms
+        }
     
     def analyze(self, parsed_filings):
         """Analyze a set of parsed filings to extract financial metrics"""
         self.logger.info(f"Analyzing {len(parsed_filings)} parsed filings")
         
-        # Sort filings by date
-        sorted_filings = sorted(
-            parsed_filings,
-            key=lambda x: datetime.strptime(x["metadata"]["filing_date"], "%Y-%m-%d") 
-                if x["metadata"]["filing_date"] != "Unknown" else datetime.min
-        )
+        # Sort filings by fiscal period where known, falling back to filing date
+        sorted_filings = sorted(parsed_filings, key=self._filing_sort_key)
         
-        # Extract financial data from each filing
+        # Extract financial data from each filing and fold it into a ledger of just these filings
         financials = []
+        extraction_costs = []
+        ledger = PeriodLedger()
         for filing in sorted_filings:
-            metrics = self._extract_metrics(filing)
+            metrics, ledger = self.add_filing(filing, ledger)
+            cost = self.extraction_costs.get(filing["metadata"].get("file_path"))
+            if cost:
+                extraction_costs.append({"filing_date": filing["metadata"].get("filing_date"),
+                                         "doc_type": filing["metadata"].get("doc_type"), **cost})
             if metrics:
+                metrics = dict(metrics)
                 metrics["filing_date"] = filing["metadata"]["filing_date"]
                 metrics["doc_type"] = filing["metadata"]["doc_type"]
+                metrics["period_end_date"] = filing["metadata"].get("period_end_date")
+                metrics["fiscal_year_end"] = filing["metadata"].get("fiscal_year_end")
+                period = identify_fiscal_period(filing["metadata"])
+                if period:
+                    metrics["fiscal_year"], metrics["fiscal_period"] = period
                 financials.append(metrics)
         
         # Calculate financial ratios
         enriched_financials = self._calculate_ratios(financials)
         
-        # Analyze trends over time
-        trends = self._analyze_trends(enriched_financials)
+        # Analyze trends over comparable periods only
+        series, periods_per_year, basis = self._comparable_series(ledger, enriched_financials)
+        trends = self._analyze_trends(series, periods_per_year)
+        
+        latest = dict(enriched_financials[-1]) if enriched_financials else {}
+        if latest and "fiscal_period" in latest:
+            period = (latest["fiscal_year"], latest["fiscal_period"])
+            for metric, growth in ledger.yoy(*period).items():
+                latest[f"{metric}_growth"] = growth
+            for metric, value in ledger.ttm(*period).items():
+                if metric in ledger.flow_metrics:
+                    latest[f"{metric}_ttm"] = value
         
         return {
             "financials": enriched_financials,
             "trends": trends,
-            "latest": enriched_financials[-1] if enriched_financials else {}
+            "trend_basis": basis,
+            "periods": ledger.rows(),
+            "latest": latest,
+            # LLM extraction fallback usage per filing (empty when it was not needed)
+            "extraction_costs": extraction_costs,
+            # Sorted, typed arrays so the UI does not rebuild DataFrames on every render
+            "chart_series": build_chart_series(enriched_financials)
         }
     
+    def add_filing(self, filing, ledger=None):
+        """
+        Add one parsed filing to a period ledger (a new one when ledger is None).
+        
+        Metrics are extracted once per filing and cached; adding a filing only updates
+        the TTM/YoY rollups that depend on it.
+        
+        Returns:
+            tuple: (metrics, ledger)
+        """
+        metadata = filing.get("metadata", {})
+        key = metadata.get("file_path")
+        
+        with self._cache_lock:
+            metrics = self._metrics_cache.get(key) if key else None
+            if metrics is not None:
+                self._metrics_cache.move_to_end(key)
+        
+        if metrics is None:
+            # Extracted outside the lock, which would otherwise serialize jobs on the LLM fallback
+            metrics = self._extract_metrics(filing)
+            if key:
+                with self._cache_lock:
+                    self._metrics_cache[key] = metrics
+                    while len(self._metrics_cache) > self.metrics_cache_size:
+                        evicted, _ = self._metrics_cache.popitem(last=False)
+                        self.extraction_costs.pop(evicted, None)
+        
+        if ledger is None:
+            ledger = PeriodLedger()
+        
+        period = identify_fiscal_period(metadata)
+        if period and metrics:
+            ledger.add(period[0], period[1], metrics, key=key)
+        
+        return metrics, ledger
+    
+    def _filing_sort_key(self, filing):
+        """Chronological sort key for a parsed filing"""
+        metadata = filing["metadata"]
+        period = identify_fiscal_period(metadata)
+        period_key = (period[0], 4 if period[1] == "FY" else int(period[1][1])) if period else (0, 0)
+        filing_date = metadata.get("filing_date", "Unknown")
+        date_key = datetime.strptime(filing_date, "%Y-%m-%d") if filing_date != "Unknown" else datetime.min
+        return period_key, date_key
+    
+    def _comparable_series(self, ledger, financials):
+        """
+        Pick a series of like-for-like periods for trend analysis.
+        
+        Prefers fiscal years, then trailing-twelve-month rollups, and finally
+        filings of the same form type as the latest one.
+        
+        Returns:
+            tuple: (rows, periods_per_year, basis)
+        """
+        if ledger is not None:
+            annual = ledger.annual_series()
+            if len(annual) >= 2:
+                return self._calculate_ratios(annual), 1, "annual"
+            
+            ttm = ledger.ttm_series()
+            if len(ttm) >= 2:
+                return self._calculate_ratios(ttm), 4, "ttm"
+        
+        if not financials:
+            return [], 1, "filings"
+        
+        latest_type = financials[-1].get("doc_type")
+        same_form = [f for f in financials if f.get("doc_type") == latest_type]
+        if latest_type != "10-K" and ledger is not None:
+            # 10-Q cash flow items are year-to-date, so trend the ledger's three-month values
+            same_form = [self._three_month_row(ledger, row) for row in same_form]
+        return same_form, 1 if latest_type == "10-K" else 4, "filings"
+    
+    def _three_month_row(self, ledger, row):
+        """A 10-Q row with its year-to-date metrics replaced by three-month values, where known"""
+        quarter = ledger.quarter(row.get("fiscal_year"), row.get("fiscal_period")) or {}
+        row = {k: v for k, v in row.items() if k not in ledger.ytd_metrics}
+        row.update({metric: quarter[metric] for metric in ledger.ytd_metrics if metric in quarter})
+        return row
+    
     def _extract_metrics(self, filing):
         """Extract metrics from a single filing"""
         metrics = {}
         
-        # Extract from tables
-        for table in filing.get("tables", []):
-            self._extract_from_table(table, metrics)
+        # Extract from the statement tables tagged at parse time
+        tables = filing.get("tables", [])
+        table_index = index_tables(tables, filing.get("table_types"))
         
-        # Extract from text if tables didn't yield all metrics
+        if any(table_type in table_index for table_type in STATEMENT_TYPES):
+            for table_type in STATEMENT_TYPES:
+                wanted = [m for m, statement in self.metric_statements.items() if statement == table_type]
+                for i in table_index.get(table_type, []) or self._untagged_candidates(tables, table_index, table_type):
+                    self._extract_from_table(tables[i], metrics, wanted)
+        else:
+            # No recognizable statements (e.g. plain-text filings), so scan every table
+            for table in tables:
+                self._extract_from_table(table, metrics)
+        
+        # Fall back to the LLM, then to text patterns, if tables didn't yield enough metrics
         if len(metrics) < len(self.key_metrics) / 2:
-            self._extract_from_text(filing.get("sections", {}), metrics)
+            answered = self.llm_extractor is not None and \
+                self._extract_with_llm(filing, tables, table_index, metrics)
+            if not answered:
+                # A metric the model reported as missing is not filled from the text
+                self._extract_from_text(filing.get("sections", {}), metrics)
         
         return metrics
     
-    def _extract_from_table(self, table, metrics):
-        """Extract metrics from a table"""
-        if not isinstance(table, pd.DataFrame):
+    def _untagged_candidates(self, tables, table_index, table_type):
+        """
+        Untagged tables to search for a statement no table was tagged as (e.g. a condensed
+        balance sheet below the classifier's threshold), most similar first
+        """
+        scored = [(score_table(tables[i]).get(table_type, 0), i) for i in table_index.get(OTHER, [])]
+        return [i for score, i in sorted(scored, key=lambda pair: -pair[0])]
+    
+    def _extract_with_llm(self, filing, tables, table_index, metrics):
+        """
+        Fill missing metrics with one LLM request over the filing's statement tables.
+        
+        Returns:
+            bool: False if no request was made (e.g. no candidate tables) or the model
+                gave no usable value, so the text patterns should be tried.
+        """
+        wanted = {
+            metric: (self.metric_statements[metric], self.search_terms[metric])
+            for metric in self.key_metrics if metric not in metrics
+        }
+        values, cost = self.llm_extractor.extract(tables, table_index, wanted)
+        
+        file_path = filing.get("metadata", {}).get("file_path")
+        if cost["calls"] or cost["cached"]:
+            cost = {**cost, "metrics_found": sorted(values or {})}
+            self.extraction_costs[file_path] = cost
+            self.logger.info(
+                f"LLM extraction for {file_path}: {len(cost['metrics_found'])} metrics, "
+                f"{cost['prompt_tokens'] + cost['completion_tokens']} tokens, "
+                f"{cost['seconds']:.2f}s{' (cached)' if cost['cached'] else ''}"
+            )
+        
+        if not values or not (cost["calls"] or cost["cached"]):
+            return False
+        metrics.update(values)
+        return True
+    
+    def _extract_from_table(self, table, metrics, metric_names=None):
+        """Extract metrics (all of them, or only metric_names) from a table"""
+        if not isinstance(table, pd.DataFrame) or table.empty or table.shape[1] < 2:
             return
         
-        # Convert table to string for easier searching
-        table_str = table.to_string().lower()
+        # Row labels are the first column; values are parsed for the whole table at once,
+        # scaled by the "(In millions)" style unit stated in the table header
+        labels = table.iloc[:, 0].astype(str).str.lower()
+        numeric = None
         
         # Check for each metric
-        for metric, search_terms in self.search_terms.items():
+        for metric in metric_names or self.search_terms:
             if metric in metrics:
                 continue  # Already found this metric
             
-            for term in search_terms:
-                if term.lower() in table_str:
-                    # Found a match, now extract the value
-                    value = self._find_value_in_table(table, term)
-                    if value is not None:
-                        metrics[metric] = value
-                        break
+            for term in self.search_terms[metric]:
+                matches = labels.str.contains(term, regex=False).to_numpy()
+                if not matches.any():
+                    continue
+                if numeric is None:
+                    numeric = parse_table(table).to_numpy()[:, 1:]
+                # Found a match, now extract the value
+                value = self._find_value_in_table(numeric, matches)
+                if value is not None:
+                    metrics[metric] = value
+                    break
     
-    def _find_value_in_table(self, table, term):
-        """Find a value in a table based on a search term"""
-        # Strategy 1: Look for term in index
-        for idx in table.index:
-            row_text = str(table.loc[idx]).lower()
-            if term.lower() in str(idx).lower() or term.lower() in row_text:
-                # Get the value from the last column (often contains the most recent value)
-                try:
-                    value = table.iloc[idx, -1]
-                    return self._parse_numeric_value(value)
-                except:
-                    pass
-        
-        # Strategy 2: Look for term in any cell
-        for idx, row in table.iterrows():
-            for col, cell in row.items():
-                if term.lower() in str(cell).lower():
-                    # Get the value from the same row, last column
-                    try:
-                        value = row.iloc[-1]
-                        return self._parse_numeric_value(value)
-                    except:
-                        pass
+    def _find_value_in_table(self, numeric, matches):
+        """
+        First value on the first matching row that has one.
         
+        SEC statements list the most recent period first, so the leftmost numeric
+        cell after the label is the current value.
+        """
+        for row in numeric[matches]:
+            values = row[~np.isnan(row)]
+            if len(values):
+                return float(values[0])
         return None
     
     def _extract_from_text(self, sections, metrics):
@@ -139,7 +336,7 @@ class FinancialAnalyzer:
             if section_name not in sections:
                 continue
                 
-            text = sections[section_name]
+            text = sections[section_name].lower()
             
             # Check for metrics not already found
             for metric, search_terms in self.search_terms.items():
@@ -147,53 +344,19 @@ class FinancialAnalyzer:
                     continue  # Already found
                 
                 for term in search_terms:
-                    # Pattern to find the term followed by numbers
-                    pattern = f"{term.lower()}[^\n]*?(\$?[\d,]+\.?\d*)"
-                    matches = re.findall(pattern, text.lower())
+                    # Find the term followed by a number and an optional unit ("$1.2 billion")
+                    match = self._text_patterns[term].search(text)
                     
-                    if matches:
+                    if match:
                         # Take the first match
-                        value = self._parse_numeric_value(matches[0])
+                        value = self._parse_numeric_value(match.group(1))
                         if value is not None:
                             metrics[metric] = value
                             break
     
     def _parse_numeric_value(self, value):
         """Parse a numeric value from string, handling common formats"""
-        if isinstance(value, (int, float)):
-            return value
-        
-        if not isinstance(value, str):
-            return None
-            
-        # Remove currency symbols, commas, parentheses (negative numbers)
-        value = value.replace('$', '').replace(',', '')
-        
-        # Handle parentheses for negative numbers
-        if '(' in value and ')' in value:
-            value = value.replace('(', '-').replace(')', '')
-        
-        # Handle "in thousands" or "in millions"
-        multiplier = 1
-        if "thousand" in value.lower() or "thousands" in value.lower():
-            multiplier = 1000
-            value = re.sub(r'\s*in\s*thousands?', '', value, flags=re.IGNORECASE)
-        elif "million" in value.lower() or "millions" in value.lower():
-            multiplier = 1000000
-            value = re.sub(r'\s*in\s*millions?', '', value, flags=re.IGNORECASE)
-        elif "billion" in value.lower() or "billions" in value.lower():
-            multiplier = 1000000000
-            value = re.sub(r'\s*in\s*billions?', '', value, flags=re.IGNORECASE)
-        
-        # Extract number
-        matches = re.search(r'(-?\d+\.?\d*)', value)
-        if matches:
-            try:
-                return float(matches.group(1)) * multiplier
-            except:
-                return None
-        
-        return None
+        return parse_numeric_value(value)
     
     def _calculate_ratios(self, financials):
         """Calculate financial ratios for each period"""
@@ -223,20 +386,20 @@ class FinancialAnalyzer:
             
         return financials
     
-    def _analyze_trends(self, financials):
-        """Analyze trends in financial metrics over time"""
+    def _analyze_trends(self, financials, periods_per_year=1):
+        """Analyze trends in financial metrics over comparable periods"""
         if len(financials) < 2:
             return {}
         
         # Convert to DataFrame for easier analysis
-        df = pd.DataFrame(financials)
+        df = pd.DataFrame(financials).drop(columns=["fiscal_year"], errors="ignore")
         
         trends = {}
         numeric_columns = df.select_dtypes(include=[np.number]).columns
         
         for col in numeric_columns:
             if col in df.columns and not col.endswith('_growth'):
-                # Calculate year-over-year growth rate
+                # Calculate period-over-period growth rate
                 df[f"{col}_growth"] = df[col].pct_change()
                 
                 # Calculate average growth and CAGR if we have enough data
@@ -257,7 +420,7 @@ class FinancialAnalyzer:
                     
                     # Calculate CAGR (Compound Annual Growth Rate)
                     if first_val > 0 and last_val > 0:
-                        periods = len(df) - 1
+                        periods = (len(df) - 1) / periods_per_year
                         cagr = (last_val / first_val) ** (1 / periods) - 1
                         trends[f"{col}_cagr"] = cagr
         
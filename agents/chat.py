@@ -0,0 +1,186 @@
+# Follow-up questions over a ticker's indexed filings
+# agents/chat.py
+import re
+import time
+import logging
+from collections import OrderedDict
+from config.prompts import CHAT_PROMPT
+from utils.prompt_builder import rank_facts, SENTENCE_SPLIT
+
+# Questions that lean on the previous turn ("what about its margins?", "why did that happen?")
+FOLLOW_UP = re.compile(
+    r"^\s*(and|also|so|then|what about|how about|why|how come)\b|"
+    r"\b(it|its|it's|they|them|their|this|that|these|those|there|same|previous|above)\b",
+    re.IGNORECASE
+)
+
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "by", "with", "at", "from", "as",
+    "is", "are", "was", "were", "be", "been", "do", "does", "did", "has", "have", "had", "what", "which",
+    "who", "how", "why", "when", "where", "about", "tell", "me", "please", "can", "could", "would",
+    "should", "it", "its", "they", "them", "their", "this", "that", "these", "those", "there", "company",
+    "also", "so", "then", "any", "much", "many", "more", "most", "same", "previous", "above",
+}
+
+_TERM = re.compile(r"[a-z0-9][a-z0-9&'\-]*", re.IGNORECASE)
+
+
+def content_terms(text):
+    """Lowercased non-stop-words in order of first appearance"""
+    seen = []
+    for term in _TERM.findall(text.lower()):
+        if term not in STOP_WORDS and term not in seen:
+            seen.append(term)
+    return seen
+
+
+class ChatSession:
+    """
+    Conversation about one ticker's filings.
+
+    The ticker's collection is loaded once per session; question embeddings are cached
+    by the EmbeddingManager and retrieved chunks by the session, so a follow-up costs
+    one search (or none, for a repeated question) plus the LLM call. The last few turns
+    are kept verbatim and older ones are folded into a short extractive summary, which
+    keeps the prompt within the model's budget however long the conversation runs.
+    """
+
+    def __init__(self, ticker, embedding_manager, llm_manager, prompt_builder, results=None,
+                 k=5, recent_turns=3, summary_sentences=12, cache_size=64, max_tokens=600):
+        """
+        Args:
+            ticker (str): Ticker whose "<TICKER>_filings" collection is searched.
+            results (dict): Pipeline results for the ticker; their key metrics are given to the model.
+            k (int): Chunks retrieved per question.
+            recent_turns (int): Turns kept verbatim before being summarized.
+            summary_sentences (int): Most summary lines kept for older turns.
+            cache_size (int): Retrieval results cached per session.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.ticker = ticker.upper()
+        self.collection_name = f"{self.ticker}_filings"
+        self.embedding_manager = embedding_manager
+        self.llm_manager = llm_manager
+        self.prompt_builder = prompt_builder
+        self.k = k
+        self.recent_turns = recent_turns
+        self.summary_sentences = summary_sentences
+        self.cache_size = cache_size
+        self.max_tokens = max_tokens
+
+        latest = (results or {}).get("analysis", {}).get("latest", {})
+        self.metric_facts = rank_facts(latest)[:12]
+
+        self.history = []  # {"question", "query", "answer", "sources"}
+        self.summary = []  # one line per turn folded out of history
+        self._retrieval_cache = OrderedDict()  # standalone query -> hits
+        self._last_hits = []
+
+        # Load the collection and lexical index now rather than on the first question
+        self.ready = self.embedding_manager.load_collection(self.collection_name)
+
+    def ask(self, question):
+        """
+        Answer a question in the context of the conversation so far.
+
+        Returns:
+            dict: {"answer", "query" (the standalone search query), "sources", "timings"}
+        """
+        question = question.strip()
+        if not question:
+            return {"answer": "", "query": "", "sources": [], "timings": {}}
+
+        started = time.perf_counter()
+        query = self.rewrite_query(question)
+        hits = self.retrieve(query)
+        follow_up = bool(self.history) and bool(FOLLOW_UP.search(question))
+        context_hits = self._merge_hits(hits, self._last_hits if follow_up else [])
+        retrieved = time.perf_counter()
+
+        prompt = self.prompt_builder.build(CHAT_PROMPT, {
+            "ticker": self.ticker,
+            "financial_metrics": self.metric_facts or "Not available.",
+            # Newest first, so a tight budget drops the oldest turns
+            "conversation_summary": self.summary[::-1] or "Nothing yet.",
+            "recent_turns": self._recent_turns() or "None.",
+            "context": [self._format_hit(hit) for hit in context_hits] or "No matching excerpts were found.",
+            "question": question,
+        })
+        answer = self.llm_manager.generate(prompt, temperature=0.3, max_tokens=self.max_tokens, task="chat")
+        answer = answer.strip() or "The model did not return an answer; please try again."
+        generated = time.perf_counter()
+
+        sources = [
+            {"section": hit["metadata"].get("section"), "filing_date": hit["metadata"].get("filing_date"),
+             "doc_type": hit["metadata"].get("doc_type"), "excerpt": hit["document"][:300]}
+            for hit in context_hits
+        ]
+        self._remember(question, query, answer, sources)
+        self._last_hits = hits
+
+        return {
+            "answer": answer,
+            "query": query,
+            "sources": sources,
+            "timings": {"retrieval": retrieved - started, "generation": generated - retrieved}
+        }
+
+    def rewrite_query(self, question):
+        """
+        Standalone search query for a question.
+
+        Follow-ups that refer back ("and their margins?", "why did that fall?") borrow
+        the content terms of the previous query that the question does not repeat.
+        """
+        if not self.history or not FOLLOW_UP.search(question):
+            return question
+
+        own = set(content_terms(question))
+        carried = [term for term in content_terms(self.history[-1]["query"]) if term not in own][:8]
+        return f"{question} {' '.join(carried)}".strip() if carried else question
+
+    def retrieve(self, query):
+        """Hybrid search over the ticker's filings, cached per normalized query"""
+        key = " ".join(query.lower().split())
+        if key in self._retrieval_cache:
+            self._retrieval_cache.move_to_end(key)
+            return self._retrieval_cache[key]
+
+        hits = self.embedding_manager.hybrid_search(query, self.collection_name, k=self.k) if self.ready else []
+        self._retrieval_cache[key] = hits
+        if len(self._retrieval_cache) > self.cache_size:
+            self._retrieval_cache.popitem(last=False)
+        return hits
+
+    def reset(self):
+        """Forget the conversation (cached retrieval is kept)"""
+        self.history = []
+        self.summary = []
+        self._last_hits = []
+
+    def _merge_hits(self, hits, previous):
+        """New hits first, then chunks from the previous turn the question refers back to"""
+        merged, seen = [], set()
+        for hit in list(hits) + list(previous):
+            if hit["id"] not in seen:
+                seen.add(hit["id"])
+                merged.append(hit)
+        return merged[:self.k + 2]
+
+    def _format_hit(self, hit):
+        metadata = hit.get("metadata", {})
+        label = f"[{metadata.get('doc_type', 'Filing')} {metadata.get('filing_date', '')}, " \
+                f"{str(metadata.get('section', '')).replace('_', ' ')}]"
+        return f"{label} {hit['document']}"
+
+    def _recent_turns(self):
+        return "\n".join(f"Q: {turn['question']}\nA: {turn['answer']}" for turn in self.history[-self.recent_turns:])
+
+    def _remember(self, question, query, answer, sources):
+        """Record a turn, folding turns beyond recent_turns into the summary"""
+        self.history.append({"question": question, "query": query, "answer": answer, "sources": sources})
+        if len(self.history) > self.recent_turns:
+            oldest = self.history[-self.recent_turns - 1]
+            lead = SENTENCE_SPLIT.split(oldest["answer"].strip())[0][:240]
+            self.summary.append(f"Asked: {oldest['question']} Answered: {lead}")
+            self.summary = self.summary[-self.summary_sentences:]
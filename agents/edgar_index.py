@@ -0,0 +1,294 @@
+# Bulk filing ingestion from EDGAR form index files
+# agents/edgar_index.py
+import os
+import time
+import logging
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+EDGAR_ARCHIVES_URL = "https://www.sec.gov/Archives/edgar"
+
+IndexEntry = namedtuple("IndexEntry", ["cik", "company", "form", "date_filed", "filename"])
+
+
+def accession_of(entry):
+    """Accession number from an index entry's filename (edgar/data/<cik>/<accession>.txt)"""
+    return os.path.splitext(os.path.basename(entry.filename))[0]
+
+
+def parse_master_index(lines):
+    """
+    Parse a master index (full-index/.../master.idx or daily-index/.../master.YYYYMMDD.idx).
+
+    Args:
+        lines (iterable): Lines of the index file.
+
+    Yields:
+        IndexEntry: One per filing, in file order.
+    """
+    in_body = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not in_body:
+            # Header block ends with a row of dashes under "CIK|Company Name|..."
+            in_body = line.startswith("-----")
+            continue
+        parts = line.split("|")
+        if len(parts) != 5:
+            continue
+        cik, company, form, date_filed, filename = parts
+        if len(date_filed) == 8:
+            # Daily indexes use YYYYMMDD
+            date_filed = f"{date_filed[:4]}-{date_filed[4:6]}-{date_filed[6:]}"
+        yield IndexEntry(cik.strip(), company.strip(), form.strip(), date_filed, filename.strip())
+
+
+def quarter_index_paths(start, end):
+    """Relative paths of the quarterly master indexes covering [start, end]"""
+    paths = []
+    year, quarter = start.year, (start.month - 1) // 3 + 1
+    while (year, quarter) <= (end.year, (end.month - 1) // 3 + 1):
+        paths.append(f"full-index/{year}/QTR{quarter}/master.idx")
+        year, quarter = (year + 1, 1) if quarter == 4 else (year, quarter + 1)
+    return paths
+
+
+def daily_index_paths(start, end):
+    """Relative paths of the daily master indexes for each weekday in [start, end]"""
+    paths = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            quarter = (day.month - 1) // 3 + 1
+            paths.append(f"daily-index/{day.year}/QTR{quarter}/master.{day.strftime('%Y%m%d')}.idx")
+        day += timedelta(days=1)
+    return paths
+
+
+class RateLimiter:
+    """Space out calls across threads to at most `rate` per second"""
+
+    def __init__(self, rate=10):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class EdgarIndexSource:
+    """
+    Read index files and filings from EDGAR or a local mirror of its Archives/edgar tree.
+
+    A local root is any directory laid out like the archive (full-index/, daily-index/,
+    data/), which keeps bulk ingestion testable offline.
+    """
+
+    def __init__(self, root=EDGAR_ARCHIVES_URL, user_agent="YourCompanyName your.email@example.com",
+                 rate=10, pool_size=8):
+        """
+        Args:
+            root (str): Archive base URL or local directory.
+            rate (float): Maximum requests per second against a remote archive (SEC allows 10).
+            pool_size (int): Pooled connections kept open to the archive host.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.root = root.rstrip("/")
+        self.is_remote = self.root.startswith(("http://", "https://"))
+        self.rate_limiter = RateLimiter(rate)
+
+        self.session = None
+        if self.is_remote:
+            self.session = requests.Session()
+            self.session.headers.update({"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"})
+            retry = Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def iter_lines(self, path):
+        """Stream the lines of an index file; yields nothing if it does not exist"""
+        if not self.is_remote:
+            local_path = os.path.join(self.root, path)
+            if not os.path.exists(local_path):
+                return
+            with open(local_path, encoding="latin-1") as f:
+                yield from f
+            return
+
+        self.rate_limiter.wait()
+        with self.session.get(f"{self.root}/{path}", stream=True, timeout=60) as response:
+            if response.status_code in (403, 404):
+                # Holidays and future dates have no daily index
+                return
+            response.raise_for_status()
+            response.encoding = "latin-1"
+            yield from response.iter_lines(decode_unicode=True)
+
+    def fetch(self, path):
+        """Return the bytes of an archive file"""
+        # Index filenames are relative to Archives/ and start with "edgar/"
+        if path.startswith("edgar/"):
+            path = path[len("edgar/"):]
+        if not self.is_remote:
+            with open(os.path.join(self.root, path), "rb") as f:
+                return f.read()
+
+        self.rate_limiter.wait()
+        response = self.session.get(f"{self.root}/{path}", timeout=60)
+        response.raise_for_status()
+        return response.content
+
+
+class BulkIndexIngestor:
+    """Find new 10-K/10-Q filings with one scan of the form indexes and download only those"""
+
+    def __init__(self, source, output_dir="data/filings", forms=["10-K", "10-Q"], cik_to_ticker=None,
+                 max_workers=4, archive=None):
+        """
+        Args:
+            source (EdgarIndexSource): Where index files and filings are read from.
+            output_dir (str): Same root SECRetriever uses; filings land in
+                sec-edgar-filings/<TICKER>/<FORM>/<ACCESSION>/full-submission.txt, from which
+                FilingParser reads the primary HTML document.
+            forms (list): Form types to ingest.
+            cik_to_ticker (dict): Restrict ingestion to these CIKs, stored under the ticker.
+                All companies are ingested (under their CIK) when omitted.
+            max_workers (int): Concurrent downloads (still bound by the source rate limit).
+            archive (FilingArchive): Store filings in this compressed archive instead of output_dir.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.source = source
+        self.output_dir = output_dir
+        self.forms = set(forms)
+        self.cik_to_ticker = {str(int(cik)): ticker.upper() for cik, ticker in (cik_to_ticker or {}).items()}
+        self.max_workers = max_workers
+        self.archive = archive
+
+    def scan(self, index_paths, since=None, until=None):
+        """
+        Sequentially scan index files for filings that are not on disk yet.
+
+        Args:
+            index_paths (list): Relative index paths (see quarter_index_paths/daily_index_paths).
+            since (str): Only include filings dated on or after this YYYY-MM-DD date.
+            until (str): Only include filings dated on or before this YYYY-MM-DD date.
+
+        Returns:
+            list: New IndexEntry records, deduplicated by accession.
+        """
+        new_entries = {}
+        for path in index_paths:
+            try:
+                for entry in parse_master_index(self.source.iter_lines(path)):
+                    if entry.form not in self.forms:
+                        continue
+                    if self.cik_to_ticker and entry.cik not in self.cik_to_ticker:
+                        continue
+                    if (since and entry.date_filed < since) or (until and entry.date_filed > until):
+                        continue
+                    accession = accession_of(entry)
+                    if accession not in new_entries and not self._is_stored(entry):
+                        new_entries[accession] = entry
+            except Exception as e:
+                self.logger.error(f"Error scanning index {path}: {e}")
+
+        self.logger.info(f"Found {len(new_entries)} new filings in {len(index_paths)} index files")
+        return list(new_entries.values())
+
+    def download(self, entries):
+        """
+        Download filings concurrently through the source's pooled, rate-limited client.
+
+        Returns:
+            list: Paths of the stored full-submission files (archive references with an archive).
+        """
+        stored = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="edgar") as executor:
+            futures = {executor.submit(self._download_one, entry): entry for entry in entries}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    stored.append(future.result())
+                except Exception as e:
+                    self.logger.error(f"Error downloading {entry.filename}: {e}")
+        return stored
+
+    def ingest(self, index_paths, since=None, until=None):
+        """Scan the given indexes and download every new filing"""
+        return self.download(self.scan(index_paths, since=since, until=until))
+
+    def _download_one(self, entry):
+        content = self.source.fetch(entry.filename)
+        if self.archive is not None:
+            owner = self.cik_to_ticker.get(entry.cik, entry.cik)
+            return self.archive.add(owner, entry.form, accession_of(entry), content,
+                                    filename="full-submission.txt", filing_date=entry.date_filed)
+
+        path = self._target_path(entry)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    def _is_stored(self, entry):
+        if self.archive is not None:
+            return accession_of(entry) in self.archive
+        return os.path.exists(self._target_path(entry))
+
+    def _target_path(self, entry):
+        owner = self.cik_to_ticker.get(entry.cik, entry.cik)
+        return os.path.join(self.output_dir, "sec-edgar-filings", owner, entry.form,
+                            accession_of(entry), "full-submission.txt")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest new filings from EDGAR form indexes")
+    parser.add_argument("--source", default=EDGAR_ARCHIVES_URL, help="Archive URL or local mirror directory")
+    parser.add_argument("--since", default=(date.today() - timedelta(days=7)).isoformat(),
+                        help="First filing date to ingest (YYYY-MM-DD)")
+    parser.add_argument("--until", default=date.today().isoformat(), help="Last filing date (YYYY-MM-DD)")
+    parser.add_argument("--daily", action="store_true", help="Read daily indexes instead of quarterly ones")
+    parser.add_argument("--tickers", default="", help="Comma-separated tickers to restrict ingestion to")
+    parser.add_argument("--user-agent", default=os.environ.get("SEC_USER_AGENT", "YourCompanyName yourname@email.com"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-archive", action="store_true", help="Store raw files instead of the compressed archive")
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.since, "%Y-%m-%d").date()
+    end = datetime.strptime(args.until, "%Y-%m-%d").date()
+    index_paths = daily_index_paths(start, end) if args.daily else quarter_index_paths(start, end)
+
+    cik_to_ticker = None
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    if tickers:
+        from utils.ticker_map import get_ticker_map
+        ticker_map = get_ticker_map()
+        cik_to_ticker = {ticker_map.get_cik(t): t for t in tickers if t in ticker_map}
+
+    source = EdgarIndexSource(args.source, user_agent=args.user_agent, pool_size=args.workers)
+    archive = None
+    if not args.no_archive:
+        from utils.filing_archive import get_filing_archive
+        archive = get_filing_archive()
+    ingestor = BulkIndexIngestor(source, cik_to_ticker=cik_to_ticker, max_workers=args.workers, archive=archive)
+    stored = ingestor.ingest(index_paths, since=args.since, until=args.until)
+    print(f"Stored {len(stored)} new filings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# Paragraph-level diffs between consecutive filings
+# agents/filing_diff.py
+import os
+import re
+import zlib
+import pickle
+import hashlib
+import logging
+import difflib
+from collections import Counter, defaultdict, namedtuple
+from agents.retriever import SECRetriever
+from utils.fiscal_periods import identify_fiscal_period
+from utils.sec_utils import split_paragraphs
+
+# Sections compared between filings
+DIFF_SECTIONS = ["risk_factors", "mda", "business"]
+
+# Paragraphs with fewer words (headings, page footers) and table rows are left out of diffs
+MIN_WORDS = 8
+
+# Words per rolling-hash window, and the shingle overlap (Jaccard) above which an
+# unmatched paragraph counts as a modification of an old one rather than an addition
+SHINGLE_SIZE = 3
+MODIFIED_SIMILARITY = 0.5
+
+# Bump when fingerprints change shape or normalization so cached ones are rebuilt
+FINGERPRINT_VERSION = 1
+
+_HASH_BASE = 1000003
+_HASH_MOD = (1 << 61) - 1
+_WORD = re.compile(r"[a-z0-9]+(?:[.,'][a-z0-9]+)*")
+
+# Edits touching only numbers and dates (the usual period roll-forward) are not substantive
+_ROLL_FORWARD = re.compile(
+    r"^[\W\d]*(?:january|february|march|april|may|june|july|august|september|october|november|december)?[\W\d]*$",
+    re.IGNORECASE
+)
+
+Paragraph = namedtuple("Paragraph", ["digest", "shingles", "text"])
+
+
+def normalize_words(paragraph):
+    """Lowercased word tokens, ignoring punctuation and quote style"""
+    return _WORD.findall(paragraph.lower().replace("’", "'"))
+
+
+def shingle_hashes(words, size=SHINGLE_SIZE):
+    """
+    Rabin-Karp rolling hashes of every size-word window.
+
+    Word hashes are CRC32 rather than hash() so fingerprints are stable across
+    processes and can be cached on disk.
+    """
+    word_hashes = [zlib.crc32(word.encode("utf-8")) for word in words]
+    if len(word_hashes) <= size:
+        return frozenset([hash_words(word_hashes)]) if word_hashes else frozenset()
+
+    high = pow(_HASH_BASE, size - 1, _HASH_MOD)
+    h = hash_words(word_hashes[:size])
+    shingles = {h}
+    for out_word, in_word in zip(word_hashes, word_hashes[size:]):
+        h = ((h - out_word * high) * _HASH_BASE + in_word) % _HASH_MOD
+        shingles.add(h)
+    return frozenset(shingles)
+
+
+def hash_words(word_hashes):
+    """Polynomial hash of a run of word hashes (the rolling hash's starting value)"""
+    h = 0
+    for word_hash in word_hashes:
+        h = (h * _HASH_BASE + word_hash) % _HASH_MOD
+    return h
+
+
+def fingerprint_paragraphs(text):
+    """Fingerprint every diffable paragraph of a section"""
+    prints = []
+    for paragraph in split_paragraphs(text):
+        if " | " in paragraph:
+            continue  # Table row
+        words = normalize_words(paragraph)
+        if len(words) < MIN_WORDS:
+            continue
+        digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).hexdigest()
+        prints.append(Paragraph(digest, shingle_hashes(words), paragraph))
+    return prints
+
+
+def word_changes(old_text, new_text):
+    """Inserted, deleted and replaced phrases between two versions of a paragraph"""
+    old_words, new_words = old_text.split(), new_text.split()
+    changes = []
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op != "equal":
+            changes.append({"op": op, "old": " ".join(old_words[i1:i2]), "new": " ".join(new_words[j1:j2])})
+    return changes
+
+
+def align_paragraphs(old, new):
+    """
+    Align two fingerprinted versions of a section.
+
+    Identical paragraphs are matched by digest in one pass, wherever they moved to.
+    The rest are paired through an inverted index of shingle hashes, so only
+    paragraphs sharing at least one shingle are ever compared; pairs are accepted in
+    order of similarity above MODIFIED_SIMILARITY.
+
+    Returns:
+        dict: {"added": [text], "removed": [text],
+            "modified": [{"old", "new", "similarity", "changes", "substantive"}], "unchanged": count}
+    """
+    old_by_digest = defaultdict(list)
+    for i, paragraph in enumerate(old):
+        old_by_digest[paragraph.digest].append(i)
+
+    unmatched_new = []
+    matched_old = set()
+    for j, paragraph in enumerate(new):
+        candidates = old_by_digest.get(paragraph.digest)
+        if candidates:
+            matched_old.add(candidates.pop())
+        else:
+            unmatched_new.append(j)
+    unchanged = len(new) - len(unmatched_new)
+
+    postings = defaultdict(list)
+    for i, paragraph in enumerate(old):
+        if i not in matched_old:
+            for shingle in paragraph.shingles:
+                postings[shingle].append(i)
+
+    pairs = []
+    for j in unmatched_new:
+        shared = Counter(i for shingle in new[j].shingles for i in postings.get(shingle, ()))
+        for i, overlap in shared.items():
+            score = overlap / (len(old[i].shingles) + len(new[j].shingles) - overlap)
+            if score >= MODIFIED_SIMILARITY:
+                pairs.append((score, i, j))
+
+    modified = {}
+    for score, i, j in sorted(pairs, reverse=True):
+        if i in matched_old or j in modified:
+            continue
+        matched_old.add(i)
+        modified[j] = {
+            "old": old[i].text,
+            "new": new[j].text,
+            "similarity": round(score, 3),
+            "changes": word_changes(old[i].text, new[j].text)
+        }
+        modified[j]["substantive"] = not all(
+            _ROLL_FORWARD.match(word) for change in modified[j]["changes"]
+            for word in (change["old"] + " " + change["new"]).split()
+        )
+
+    return {
+        "added": [new[j].text for j in unmatched_new if j not in modified],
+        "removed": [old[i].text for i in range(len(old)) if i not in matched_old],
+        "modified": [modified[j] for j in sorted(modified)],
+        "unchanged": unchanged
+    }
+
+
+def filing_sort_key(filing):
+    """Chronological sort key for a parsed filing: fiscal period, then filing date"""
+    metadata = filing.get("metadata", {})
+    period = identify_fiscal_period(metadata)
+    period_key = (period[0], 4 if period[1] == "FY" else int(period[1][1])) if period else (0, 0)
+    return period_key, metadata.get("filing_date", "Unknown")
+
+
+def format_diff(diff, sections=None, max_chars=300):
+    """
+    Compact change lines for LLM context, most informative first.
+
+    Modifications list only the changed phrases, largest rewrites first; added and
+    removed paragraphs are truncated to max_chars; date and number roll-forwards come
+    last. Suitable as a ranked fact list for PromptBuilder.
+    """
+    if not diff:
+        return []
+
+    def clip(text):
+        return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+    modified, added, removed, roll_forward = [], [], [], []
+    for section, changes in diff["sections"].items():
+        if sections and section not in sections:
+            continue
+        label = section.replace("_", " ").title()
+        for change in sorted(changes["modified"], key=lambda c: c["similarity"]):
+            edits = "; ".join(
+                f'"{c["old"]}" -> "{c["new"]}"' if c["op"] == "replace"
+                else f'removed "{c["old"]}"' if c["op"] == "delete"
+                else f'added "{c["new"]}"'
+                for c in change["changes"]
+            )
+            (modified if change["substantive"] else roll_forward).append(f"[{label}] Revised: {clip(edits)}")
+        added.extend(f"[{label}] New: {clip(text)}" for text in changes["added"])
+        removed.extend(f"[{label}] Dropped: {clip(text)}" for text in changes["removed"])
+    return modified + added + removed + roll_forward
+
+
+class FingerprintCache:
+    """Paragraph fingerprints per filing, persisted so each filing is fingerprinted once"""
+
+    def __init__(self, cache_dir="data/processed/fingerprints"):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._memory = {}
+
+    def get(self, key):
+        if key in self._memory:
+            return self._memory[key]
+        try:
+            with open(self._path(key), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if entry.get("version") != FINGERPRINT_VERSION:
+            return None
+        self._memory[key] = entry["sections"]
+        return entry["sections"]
+
+    def put(self, key, sections):
+        self._memory[key] = sections
+        path = self._path(key)
+        try:
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump({"version": FINGERPRINT_VERSION, "sections": sections}, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            self.logger.error(f"Error caching fingerprints for {key}: {e}")
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.fp.pkl")
+
+
+class FilingDiffer:
+    """Diff the narrative sections of a filing against its predecessor"""
+
+    def __init__(self, cache_dir="data/processed/fingerprints", sections=DIFF_SECTIONS):
+        self.logger = logging.getLogger(__name__)
+        self.cache = FingerprintCache(cache_dir)
+        self.sections = sections
+
+    def fingerprint(self, filing):
+        """Section fingerprints for a parsed filing, from the cache when it has been seen before"""
+        file_path = filing.get("metadata", {}).get("file_path", "")
+        key = SECRetriever.accession_from_path(file_path) if file_path else None
+
+        prints = self.cache.get(key) if key else None
+        if prints is None:
+            sections = filing.get("sections", {})
+            prints = {name: fingerprint_paragraphs(sections[name]) for name in self.sections if sections.get(name)}
+            if key:
+                self.cache.put(key, prints)
+        return prints
+
+    def diff(self, old_filing, new_filing):
+        """
+        Additions, removals and modifications per section between two parsed filings.
+
+        Returns:
+            dict: {"from": filing info, "to": filing info, "sections": {section: changes},
+                "summary": {"added", "removed", "modified"}}
+        """
+        old_prints = self.fingerprint(old_filing)
+        new_prints = self.fingerprint(new_filing)
+
+        sections = {}
+        for name in self.sections:
+            if name in old_prints or name in new_prints:
+                sections[name] = align_paragraphs(old_prints.get(name, []), new_prints.get(name, []))
+
+        summary = {kind: sum(len(s[kind]) for s in sections.values()) for kind in ("added", "removed", "modified")}
+        return {
+            "from": self._describe(old_filing),
+            "to": self._describe(new_filing),
+            "sections": sections,
+            "summary": summary
+        }
+
+    def diff_latest(self, parsed_filings):
+        """
+        Diff the most recent filing against its predecessor: the previous filing of the
+        same form if there is one (10-Q to 10-Q), otherwise the previous filing.
+
+        Returns:
+            dict or None: See diff(); None with fewer than two usable filings.
+        """
+        filings = sorted(
+            (f for f in parsed_filings if f.get("sections") and "error" not in f.get("metadata", {})),
+            key=filing_sort_key
+        )
+        if len(filings) < 2:
+            return None
+
+        latest = filings[-1]
+        earlier = filings[:-1]
+        same_form = [f for f in earlier if f["metadata"].get("doc_type") == latest["metadata"].get("doc_type")]
+        previous = (same_form or earlier)[-1]
+
+        try:
+            return self.diff(previous, latest)
+        except Exception as e:
+            self.logger.error(f"Error diffing filings: {e}")
+            return None
+
+    def _describe(self, filing):
+        metadata = filing.get("metadata", {})
+        period = identify_fiscal_period(metadata)
+        return {
+            "accession": SECRetriever.accession_from_path(metadata.get("file_path", "")),
+            "doc_type": metadata.get("doc_type", "Unknown"),
+            "period": f"{period[1]} {period[0]}" if period else metadata.get("filing_date", "Unknown")
+        }
@@ -0,0 +1,135 @@
+# Concurrent multi-prompt insight generation
+# agents/insight_pipeline.py
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from config.prompts import FINANCIAL_INSIGHTS_PROMPT, FINANCIAL_RATIO_ANALYSIS_PROMPT, RISK_ASSESSMENT_PROMPT
+from utils.prompt_builder import rank_facts, split_metric_key
+from utils.fiscal_periods import identify_fiscal_period
+from agents.filing_diff import format_diff
+
+# Ratio keys passed to the ratio analysis prompt
+RATIO_KEYS = ("profit_margin", "gross_margin", "current_ratio", "debt_to_equity", "asset_turnover", "rd_intensity")
+
+# (result key, display title) in the order they are shown
+ANALYSES = [
+    ("insights", "Key Insights"),
+    ("ratio_analysis", "Ratio Analysis"),
+    ("risk_assessment", "Risk Assessment"),
+]
+
+
+class InsightPipeline:
+    """Run the insight, ratio and risk analyses as concurrent LLM requests"""
+
+    def __init__(self, llm_manager, prompt_builder, max_concurrency=3, timeout=120, max_tokens=800):
+        """
+        Args:
+            llm_manager (LLMManager): Client used for every call.
+            prompt_builder (PromptBuilder): Fits each prompt into the model's budget.
+            max_concurrency (int): Maximum LLM requests in flight at once.
+            timeout (float): Seconds allowed for the whole batch; slower calls are dropped.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.llm_manager = llm_manager
+        self.prompt_builder = prompt_builder
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="insights")
+
+    def build_prompts(self, ticker, analysis_results, parsed_filings=None, filing_diff=None):
+        """
+        Build one prompt per analysis that has enough input data.
+
+        filing_diff, from FilingDiffer.diff_latest, gives the risk assessment the
+        changes since the previous filing.
+        """
+        latest = analysis_results.get("latest", {})
+        trends = analysis_results.get("trends", {})
+        prompts = {}
+
+        if analysis_results.get("financials"):
+            prompts["insights"] = self.prompt_builder.build(FINANCIAL_INSIGHTS_PROMPT, {
+                "ticker": ticker,
+                "financial_metrics": rank_facts(latest),
+                "financial_trends": rank_facts(trends),
+            })
+
+        ratios = {k: v for k, v in latest.items() if k in RATIO_KEYS}
+        ratios.update({
+            k: v for k, v in trends.items()
+            if split_metric_key(k)[0] in RATIO_KEYS and split_metric_key(k)[1] in ("_avg_growth", "_trend", "_cagr")
+        })
+        if ratios:
+            prompts["ratio_analysis"] = self.prompt_builder.build(FINANCIAL_RATIO_ANALYSIS_PROMPT, {
+                "ticker": ticker,
+                "financial_ratios": rank_facts(ratios),
+            })
+
+        risk_text = self._latest_section(parsed_filings or [], "risk_factors")
+        if risk_text:
+            risk_changes = format_diff(filing_diff, sections=["risk_factors", "mda"])
+            prompts["risk_assessment"] = self.prompt_builder.build(RISK_ASSESSMENT_PROMPT, {
+                "ticker": ticker,
+                "risk_factors": risk_text,
+                "risk_changes": risk_changes or "No changes identified against the previous filing.",
+            })
+
+        return prompts
+
+    def iter_results(self, prompts):
+        """
+        Submit all prompts and yield (key, text) as each call finishes.
+
+        Calls still running when the batch timeout expires, or that fail, yield
+        (key, None) so callers can render whatever did complete.
+        """
+        deadline = time.monotonic() + self.timeout
+        futures = {
+            self.executor.submit(self.llm_manager.generate, prompt, max_tokens=self.max_tokens,
+                                 timeout=self.timeout): key
+            for key, prompt in prompts.items()
+        }
+
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+                pending.discard(future)
+                key = futures[future]
+                try:
+                    yield key, future.result() or None
+                except Exception as e:
+                    self.logger.error(f"Error generating {key}: {e}")
+                    yield key, None
+        except TimeoutError:
+            self.logger.warning(f"Timed out waiting for {len(pending)} insight call(s)")
+            for future in pending:
+                future.cancel()
+                yield futures[future], None
+
+    def run(self, ticker, analysis_results, parsed_filings=None):
+        """Generate all analyses concurrently and merge them into titled sections"""
+        prompts = self.build_prompts(ticker, analysis_results, parsed_filings)
+        results = dict(self.iter_results(prompts))
+        return self.merge(results, prompts)
+
+    def merge(self, results, prompts=None):
+        """Order results by section, noting analyses that were skipped or failed"""
+        sections = {}
+        for key, title in ANALYSES:
+            if key in results and results[key]:
+                sections[title] = results[key]
+            elif prompts is None or key in prompts:
+                sections[title] = f"{title} is unavailable: the model did not return a response in time."
+        return sections
+
+    def _latest_section(self, parsed_filings, section):
+        """Text of a section from the most recent filing that has it, annual reports first"""
+        candidates = [f for f in parsed_filings if f.get("sections", {}).get(section)]
+        annual = [f for f in candidates if f.get("metadata", {}).get("doc_type") == "10-K"]
+        ranked = sorted(
+            annual or candidates,
+            key=lambda f: identify_fiscal_period(f.get("metadata", {})) or (0, ""),
+            reverse=True
+        )
+        return ranked[0]["sections"][section] if ranked else None
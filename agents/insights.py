@@ -1,44 +1,94 @@
 # agents/insight.py
+import operator
+import numpy as np
+import pandas as pd
+
+# Declarative rule table. Each rule compares one metric column against a threshold and
+# is evaluated as a single vectorized comparison over every row (period or ticker).
+INSIGHT_RULES = [
+    {"name": "strong_revenue_growth", "column": "revenue_growth", "op": ">", "threshold": 0.1, "severity": "positive",
+     "message": "The company's revenue has grown significantly over the past year, indicating strong sales performance."},
+    {"name": "revenue_decline", "column": "revenue_growth", "op": "<", "threshold": -0.05, "severity": "negative",
+     "message": "Revenue declined year over year, which may signal weakening demand."},
+    {"name": "strong_net_income_growth", "column": "net_income_growth", "op": ">", "threshold": 0.1, "severity": "positive",
+     "message": "Net income has increased substantially, reflecting improved profitability."},
+    {"name": "net_loss", "column": "net_income", "op": "<", "threshold": 0, "severity": "negative",
+     "message": "The company reported a net loss for the latest period."},
+    {"name": "low_asset_coverage", "column": "current_ratio", "op": "<", "threshold": 1, "severity": "negative",
+     "message": "The company may face liquidity issues as its liabilities exceed its assets."},
+    {"name": "high_leverage", "column": "debt_to_equity", "op": ">", "threshold": 2, "severity": "negative",
+     "message": "The company has a high debt-to-equity ratio, indicating significant leverage and potential financial risk."},
+    {"name": "healthy_profit_margin", "column": "profit_margin", "op": ">", "threshold": 0.2, "severity": "positive",
+     "message": "The company has a healthy profit margin, showcasing efficient cost management and profitability."},
+    {"name": "high_gross_margin", "column": "gross_margin", "op": ">", "threshold": 0.4, "severity": "positive",
+     "message": "Gross margin above 40% points to strong pricing power."},
+    {"name": "negative_operating_cash_flow", "column": "operating_cash_flow", "op": "<", "threshold": 0, "severity": "negative",
+     "message": "Operating activities consumed cash in the latest period."},
+    {"name": "high_rd_intensity", "column": "rd_intensity", "op": ">", "threshold": 0.15, "severity": "info",
+     "message": "R&D spending exceeds 15% of revenue, a heavy investment in future products."},
+]
+
+# Messages for the "<metric>_trend" columns produced by FinancialAnalyzer
+TREND_MESSAGES = {
+    "increasing": ("positive", "{metric} is on an upward trend, indicating positive growth."),
+    "decreasing": ("negative", "{metric} is on a downward trend, which may be a cause for concern."),
+    "stable": ("info", "{metric} has remained stable, showing consistency in performance."),
+}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+ALERT_COLUMNS = ["subject", "rule", "severity", "message"]
 
 class InsightAgent:
     """Generate investment insights based on financial metrics and trends."""
 
-    def __init__(self):
-        pass
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else INSIGHT_RULES
 
     def generate_insights(self, metrics, trends):
         """Generate natural language insights based on metrics and trends."""
-        insights = []
+        frame = pd.DataFrame([{**metrics, **trends}])
+        return self.evaluate(frame)["message"].tolist()
 
-        # Revenue growth insight
-        if metrics.get("revenue_growth", 0) > 0.1:
-            insights.append("The company's revenue has grown significantly over the past year, indicating strong sales performance.")
+    def evaluate(self, frame):
+        """
+        Evaluate every rule over every row of a metrics/trends frame.
 
-        # Net income insight
-        if metrics.get("net_income_growth", 0) > 0.1:
-            insights.append("Net income has increased substantially, reflecting improved profitability.")
+        Missing metrics (absent columns or NaN) never fire a rule.
 
-        # Liquidity insight
-        if metrics.get("current_ratio", 0) < 1:
-            insights.append("The company may face liquidity issues as its current liabilities exceed current assets.")
+        Returns:
+            pd.DataFrame: One row per fired rule with the row label as "subject".
+        """
+        fired = []
+        for rule in self.rules:
+            column = rule["column"]
+            if column not in frame.columns:
+                continue
+            values = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=float)
+            mask = OPERATORS[rule["op"]](values, rule["threshold"])
+            for subject in frame.index[mask]:
+                fired.append((subject, rule["name"], rule["severity"], rule["message"]))
 
-        # Debt-to-equity insight
-        if metrics.get("debt_to_equity", 0) > 2:
-            insights.append("The company has a high debt-to-equity ratio, indicating significant leverage and potential financial risk.")
+        # Trend analysis insights
+        for column in [c for c in frame.columns if c.endswith("_trend")]:
+            metric_name = column.replace("_trend", "").replace("_", " ").title()
+            values = frame[column].to_numpy(dtype=object)
+            for direction, (severity, template) in TREND_MESSAGES.items():
+                for subject in frame.index[values == direction]:
+                    fired.append((subject, column, severity, template.format(metric=metric_name)))
 
-        # Profit margin insight
-        if metrics.get("profit_margin", 0) > 0.2:
-            insights.append("The company has a healthy profit margin, showcasing efficient cost management and profitability.")
+        return pd.DataFrame(fired, columns=ALERT_COLUMNS)
 
-        # Trend analysis insights
-        for trend, value in trends.items():
-            if trend.endswith("_trend"):
-                metric_name = trend.replace("_trend", "").replace("_", " ").title()
-                if value == "increasing":
-                    insights.append(f"{metric_name} is on an upward trend, indicating positive growth.")
-                elif value == "decreasing":
-                    insights.append(f"{metric_name} is on a downward trend, which may be a cause for concern.")
-                elif value == "stable":
-                    insights.append(f"{metric_name} has remained stable, showing consistency in performance.")
-
-        return insights
+    def evaluate_universe(self, table, severities=("negative",)):
+        """Bulk-evaluate rules over a ticker-indexed universe table (e.g. UniverseScreener.table)"""
+        if table.empty:
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+        alerts = self.evaluate(table)
+        if severities is not None:
+            alerts = alerts[np.isin(alerts["severity"].to_numpy(), list(severities))]
+        return alerts.rename(columns={"subject": "ticker"}).reset_index(drop=True)
@@ -0,0 +1,175 @@
+# Shared pipeline workers for concurrent UI sessions
+# agents/job_service.py
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """A ticker request shared by every session that asked for it while in flight"""
+
+    def __init__(self, kind, ticker, years=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.ticker = ticker
+        self.years = years
+        self.state = QUEUED
+        self.stage = "Queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.sections = {}  # Narrative sections as they complete (title -> text)
+        self.subscribers = 1
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns whether it did"""
+        return self._done.wait(timeout)
+
+    def _update(self, stage, fraction):
+        self.stage = stage
+        self.progress = fraction
+
+    def _finish(self, state, result=None, error=None):
+        self.state, self.result, self.error = state, result, error
+        self.stage = "Complete" if state == DONE else "Failed"
+        self.progress = 1.0
+        self.finished_at = time.time()
+        self._done.set()
+
+
+class JobService:
+    """
+    Run pipeline requests on a bounded worker pool shared by all sessions.
+
+    Identical requests that arrive while one is queued or running attach to the same
+    Job instead of starting another pipeline. At most max_workers heavy jobs run at
+    once; the rest wait in the executor queue.
+    """
+
+    def __init__(self, orchestrator, max_workers=2, retention=600):
+        """
+        Args:
+            orchestrator (SECAnalysisOrchestrator): Shared pipeline.
+            max_workers (int): Concurrent heavy jobs.
+            retention (float): Seconds finished jobs stay available for polling.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.orchestrator = orchestrator
+        self.retention = retention
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._lock = threading.Lock()
+        self._jobs = {}      # job id -> Job
+        self._inflight = {}  # (kind, cache key) -> Job
+
+    def submit(self, ticker, years=None):
+        """
+        Request the analysis (without LLM narrative) for a ticker, over years of filing
+        history (the orchestrator's configured history when None).
+
+        Cached results complete immediately without using a worker.
+        """
+        ticker = ticker.upper()
+        key = self._cache_key(ticker, years)
+        cache = self.orchestrator.cache
+        if self.orchestrator.use_cache and key in cache:
+            return self._completed("analysis", ticker, cache[key])
+
+        return self._submit("analysis", ticker, self._run_analysis, key=key, years=years)
+
+    def submit_narrative(self, results):
+        """Request the LLM narrative for processed results; sections appear on job.sections as they finish"""
+        if "insight_sections" in results:
+            return self._completed("narrative", results["ticker"], results, sections=results["insight_sections"])
+
+        key = self._cache_key(results["ticker"], results.get("years"))
+        return self._submit("narrative", results["ticker"], lambda job: self._run_narrative(job, results), key=key)
+
+    def get(self, job_id):
+        """Look up a job by id (None once it has expired)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Queued and running job counts"""
+        with self._lock:
+            states = [job.state for job in self._inflight.values()]
+        return {"queued": states.count(QUEUED), "running": states.count(RUNNING)}
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def _cache_key(self, ticker, years):
+        """Runs over a non-default history are cached and coalesced separately"""
+        return self.orchestrator.cache_key(ticker, years) if years else ticker
+
+    def _completed(self, kind, ticker, result, sections=None):
+        """A job that is already finished, for requests served from the cache"""
+        job = Job(kind, ticker)
+        job.sections = dict(sections or {})
+        job._finish(DONE, result=result)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        return job
+
+    def _submit(self, kind, ticker, target, key=None, years=None):
+        key = (kind, key or ticker)
+        with self._lock:
+            self._expire()
+            job = self._inflight.get(key)
+            if job is not None:
+                job.subscribers += 1
+                self.logger.info(f"Coalesced {kind} request for {ticker} ({job.subscribers} subscribers)")
+                return job
+
+            job = Job(kind, ticker, years)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+
+        self.executor.submit(self._execute, key, job, target)
+        return job
+
+    def _execute(self, key, job, target):
+        job.state = RUNNING
+        try:
+            result = target(job)
+            if isinstance(result, dict) and "error" in result:
+                job._finish(FAILED, result=result, error=result["error"])
+            else:
+                job._finish(DONE, result=result)
+        except Exception as e:
+            self.logger.error(f"Job {job.kind} for {job.ticker} failed: {e}")
+            job._finish(FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _run_analysis(self, job):
+        history = {"years": job.years} if job.years else {}
+        return self.orchestrator.process_ticker(job.ticker, generate_narrative=False, progress=job._update, **history)
+
+    def _run_narrative(self, job, results):
+        job._update("Generating narrative", 0.0)
+        total = max(len(results.get("narrative_prompts", {})), 1)
+        for title, text in self.orchestrator.generate_narrative(results):
+            job.sections[title] = text
+            job._update(f"Generated {title}", len(job.sections) / total)
+        job.sections = dict(results.get("insight_sections", job.sections))
+        return results
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,224 @@
+# LLM fallback for statement metrics the table scan misses
+# agents/llm_extractor.py
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import numpy as np
+from utils.numeric_parser import detect_table_scale, parse_table
+from utils.table_classifier import score_table
+
+# Bump when the prompt or validation changes so cached answers are not reused
+EXTRACTION_VERSION = 2
+
+EXTRACTION_PROMPT = """
+Extract financial metrics for the current period from the SEC filing tables below.
+
+{tables}
+
+Metrics (alternative row labels in parentheses):
+{metrics}
+
+Return one JSON object with exactly these keys. Each value is the number exactly as it
+appears in the most recent period's column of a table above, without "$" or commas and
+ignoring the table's units; use null if no table reports the metric.
+"""
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def metrics_schema(metric_names):
+    """JSON schema for a flat {metric: number or null} answer"""
+    return {
+        "type": "object",
+        "properties": {name: {"type": ["number", "null"]} for name in metric_names},
+        "required": list(metric_names),
+        "additionalProperties": False,
+    }
+
+
+def render_table(table, max_rows=60):
+    """Compact text form of a table: one line per row, empty and "$" cells dropped"""
+    lines = []
+    for row in table.to_numpy(dtype=object):
+        cells = [str(cell).strip() for cell in row if cell is not None and str(cell).strip() not in ("", "$")]
+        if cells:
+            lines.append(" | ".join(cells))
+        if len(lines) >= max_rows:
+            break
+    return "\n".join(lines)
+
+
+def table_hash(tables):
+    """Content hash of a list of tables"""
+    digest = hashlib.sha1()
+    for table in tables:
+        digest.update(table.to_csv(index=False, header=False).encode("utf-8"))
+        digest.update(table.attrs.get("caption", "").encode("utf-8"))  # Where the units may be stated
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def parse_answer(text):
+    """The JSON object in a model answer, or None"""
+    match = _JSON_OBJECT.search(text or "")
+    if not match:
+        return None
+    try:
+        answer = json.loads(match.group(0))
+    except ValueError:
+        return None
+    return answer if isinstance(answer, dict) else None
+
+
+class ExtractionCache:
+    """Validated LLM extractions keyed by the hash of the tables they came from"""
+
+    def __init__(self, cache_dir="data/processed/extractions"):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        path = self._path(key)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(entry, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            self.logger.error(f"Error caching extraction {key}: {e}")
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+
+class LLMMetricExtractor:
+    """
+    Ask an LLM for the metrics a filing's table scan could not find.
+
+    All missing metrics go out in one request per filing, containing only the candidate
+    statement tables and constrained to a JSON schema. An answer is kept only if the
+    number appears in one of those tables, and is then scaled by that table's units.
+    Answers are cached by the hash of the tables, so re-analysis costs no calls.
+    """
+
+    def __init__(self, llm_manager, cache_dir="data/processed/extractions", max_tables=4,
+                 max_rows=60, max_tokens=300):
+        """
+        Args:
+            llm_manager (LLMRouter): Called with task="extraction" so the small model answers.
+            max_tables (int): Most tables sent per filing.
+            max_rows (int): Most rows sent per table.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.llm_manager = llm_manager
+        self.cache = ExtractionCache(cache_dir)
+        self.max_tables = max_tables
+        self.max_rows = max_rows
+        self.max_tokens = max_tokens
+
+    def candidate_tables(self, tables, table_index, statements):
+        """
+        Positions of the tables worth sending for the given statement types.
+
+        Tables tagged with a wanted type come first; a statement with no tagged table
+        contributes its best-scoring untagged table instead.
+        """
+        chosen = []
+        for statement in dict.fromkeys(statements):
+            tagged = table_index.get(statement, [])
+            if tagged:
+                chosen.extend(tagged)
+                continue
+            scored = [(score_table(tables[i]).get(statement, 0), i) for i in table_index.get("other", [])]
+            best = max(scored, default=(0, None))
+            if best[0] > 0:
+                chosen.append(best[1])
+        return list(dict.fromkeys(chosen))[:self.max_tables]
+
+    def extract(self, tables, table_index, wanted):
+        """
+        Extract metrics from a filing's tables.
+
+        Args:
+            wanted (dict): {metric: (statement type, [search terms])} for the missing metrics.
+
+        Returns:
+            tuple: ({metric: value}, usage) where usage reports "calls", "cached", "prompt_tokens",
+                "completion_tokens", "seconds" and "route", or (None, usage) if the model gave no answer.
+        """
+        usage = {"calls": 0, "cached": False, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0, "route": None}
+        positions = self.candidate_tables(tables, table_index, [statement for statement, _ in wanted.values()])
+        if not positions:
+            return {}, usage
+
+        candidates = [tables[i] for i in positions]
+        names = sorted(wanted)
+        key = hashlib.sha1(json.dumps([
+            EXTRACTION_VERSION, self.llm_manager.model_name, names, table_hash(candidates)
+        ]).encode("utf-8")).hexdigest()
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            usage["cached"] = True
+            return cached["values"], usage
+
+        prompt = EXTRACTION_PROMPT.format(
+            tables="\n\n".join(f"Table {n + 1}:\n{render_table(table, self.max_rows)}"
+                               for n, table in enumerate(candidates)),
+            metrics="\n".join(f"- {name} ({', '.join(wanted[name][1])})" for name in names)
+        )
+        started = time.perf_counter()
+        try:
+            result = self.llm_manager.complete(prompt, temperature=0.0, max_tokens=self.max_tokens,
+                                               task="extraction", schema=metrics_schema(names))
+        except Exception as e:
+            self.logger.error(f"Error extracting metrics with the LLM: {e}")
+            result = {"text": ""}
+        usage.update({
+            "calls": 1,
+            "prompt_tokens": result.get("prompt_tokens", 0),
+            "completion_tokens": result.get("completion_tokens", 0),
+            "seconds": round(time.perf_counter() - started, 3),
+            "route": result.get("route"),
+        })
+
+        answer = parse_answer(result.get("text"))
+        if answer is None:
+            self.logger.warning("LLM extraction returned no usable JSON")
+            return None, usage
+
+        values = self._validate(answer, names, candidates)
+        self.cache.put(key, {"values": values, "usage": usage})
+        return values, usage
+
+    def _validate(self, answer, names, tables):
+        """Keep answers that match a table cell, signed and scaled as that table reports them"""
+        parsed = []
+        for table in tables:
+            # Only labelled rows, so header years and dates never pass as values
+            labelled = table.iloc[:, 0].astype(str).str.strip().replace("None", "").to_numpy() != ""
+            cells = parse_table(table, scale=1.0).to_numpy()[labelled, 1:].ravel()
+            parsed.append((cells[~np.isnan(cells)], detect_table_scale(table)))
+        values = {}
+        for name in names:
+            value = answer.get(name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+                continue
+            for cells, scale in parsed:
+                hits = cells[np.isclose(np.abs(cells), abs(value), rtol=1e-9, atol=1e-9)]
+                if len(hits):
+                    values[name] = float(hits[0]) * scale
+                    break
+            else:
+                self.logger.debug(f"Discarding LLM value for {name}: {value} is not in the tables")
+        return values
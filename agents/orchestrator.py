@@ -2,35 +2,113 @@
 # agents/orchestrator.py
 import time
 import logging
-from langchain.llms import Ollama
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
 from agents.retriever import SECRetriever
 from agents.parser import FilingParser
 from agents.analyzer import FinancialAnalyzer
+from agents.insights import InsightAgent
+from agents.insight_pipeline import InsightPipeline, ANALYSES
+from agents.filing_diff import FilingDiffer
+from agents.chat import ChatSession
+from agents.llm_extractor import LLMMetricExtractor
+from agents.stages import get_stage
 from models.embeddings import EmbeddingManager
+from models.llm import default_router
+from models.reranker import CrossEncoderReranker
+from models.shard_router import ShardRouter
+from config.settings import PipelineSettings
 from utils.sec_utils import validate_ticker
+from utils.prompt_builder import PromptBuilder
+from utils.result_cache import get_result_cache, cache_key
 
 class SECAnalysisOrchestrator:
     """Orchestrate the entire workflow from ticker to insights"""
     
-    def __init__(self, use_cache=True):
+    def __init__(self, settings=None, use_cache=None, max_llm_concurrency=None, llm_timeout=None, cache_dir=None,
+                 llm_provider=None, llm_model=None, llm_small_model=None, llm_extraction=None, vector_shards=None,
+                 embedding_backend=None):
+        """
+        Args:
+            settings (PipelineSettings): Stages, worker counts, batch sizes, models and cache
+                backend; defaults to the environment's (config/settings.py).
+            The other arguments override single settings and are ignored when None.
+        """
         self.logger = logging.getLogger(__name__)
-        self.retriever = SECRetriever()
-        self.parser = FilingParser()
-        self.analyzer = FinancialAnalyzer()
-        self.embedding_manager = EmbeddingManager()
+        self.settings = settings = (settings or PipelineSettings()).override(
+            llm={"provider": llm_provider, "model": llm_model, "small_model": llm_small_model,
+                 "narrative_concurrency": max_llm_concurrency, "timeout": llm_timeout, "extraction": llm_extraction},
+            embedding={"shards": vector_shards, "backend": embedding_backend},
+            cache={"enabled": use_cache, "dir": cache_dir}
+        )
+        # Resolved up front so a misconfigured stage list fails at startup
+        self.stages = [(name, get_stage(name)) for name in settings.stages]
+        
+        # LLMs: the large model for narrative and chat, the small model for short structured tasks
+        llm = settings.llm
+        self.llm_manager = default_router(
+            provider=llm.provider,
+            model_name=llm.model,
+            small_model=llm.small_model,
+            narrative_concurrency=llm.narrative_concurrency,
+            fast_concurrency=llm.fast_concurrency,
+            timeout=llm.timeout
+        )
         
-        # Initialize LLM for insight generation
-        self.llm = Ollama(model="mistral")
+        self.retriever = SECRetriever(use_archive=settings.retrieval.use_archive)
+        self.parser = FilingParser(max_workers=settings.parse.workers, throttle=settings.parse.throttle)
+        self.analyzer = FinancialAnalyzer(
+            llm_extractor=LLMMetricExtractor(self.llm_manager) if llm.extraction else None
+        )
+        self.insight_agent = InsightAgent()
+        self.differ = FilingDiffer()
+        # Per-ticker collections, plus a sharded cross-company index when embedding.shards > 0
+        embedding = settings.embedding
+        self.embedding_manager = EmbeddingManager(
+            model_name=embedding.model,
+            chunk_size=embedding.chunk_size,
+            chunk_overlap=embedding.chunk_overlap,
+            backend=embedding.backend,
+            batch_size=embedding.batch_size,
+            quantization=embedding.quantization or None,
+            hnsw_params=embedding.hnsw_params(),
+            rerank_candidates=embedding.rerank_candidates,
+            reranker=CrossEncoderReranker(model_name=embedding.reranker, top_n=embedding.rerank_top_n)
+            if embedding.reranker else None,
+            shard_router=ShardRouter(num_shards=embedding.shards, memory_budget=embedding.shard_memory_mb * 1024 * 1024,
+                                     rerank_candidates=embedding.rerank_candidates)
+            if embedding.shards else None
+        )
+        self.prompt_builder = PromptBuilder(model_name=llm.model)
+        self.insight_pipeline = InsightPipeline(
+            self.llm_manager,
+            self.prompt_builder,
+            max_concurrency=llm.narrative_concurrency,
+            timeout=llm.timeout
+        )
         
-        # Set up caching
-        self.use_cache = use_cache
-        self.cache = {}
+        # Set up caching (on disk by default, so results precomputed by the
+        # scheduler are served to the UI)
+        self.use_cache = settings.cache.enabled
+        self.cache = get_result_cache(settings.cache.backend, settings.cache.dir)
+    
+    def cache_key(self, ticker, years=None):
+        """Results cache key; the configured history shares the precomputed entry"""
+        return cache_key(ticker, None if years in (None, self.settings.retrieval.years) else years)
     
-    def process_ticker(self, ticker):
-        """Process a ticker symbol to generate investment insights"""
+    def process_ticker(self, ticker, generate_narrative=True, refresh=False, progress=None, years=None):
+        """
+        Process a ticker symbol to generate investment insights.
+        
+        Rule-based insights are always computed. With generate_narrative=False the
+        LLM prompts are prepared but not run, so callers can render the analysis
+        immediately and stream the narrative in with generate_narrative().
+        With refresh=True cached results are ignored and replaced.
+        progress, if given, is called as progress(stage, fraction) as each step starts.
+        years overrides the configured years of filing history.
+        """
         ticker = ticker.upper()
+        years = years or self.settings.retrieval.years
+        key = self.cache_key(ticker, years)
+        report = progress or (lambda stage, fraction: None)
         self.logger.info(f"Processing ticker: {ticker}")
         
         # Validate ticker
@@ -38,44 +116,57 @@ class SECAnalysisOrchestrator:
             return {"error": f"Invalid ticker symbol: {ticker}"}
         
         # Check cache
-        if self.use_cache and ticker in self.cache:
-            self.logger.info(f"Using cached results for {ticker}")
-            return self.cache[ticker]
+        if self.use_cache and not refresh and key in self.cache:
+            self.logger.info(f"Using cached results for {key}")
+            results = self.cache[key]
+            if generate_narrative and "insight_sections" not in results:
+                for _ in self.generate_narrative(results):
+                    pass
+            return results
         
         try:
-            # Step 1: Retrieve SEC filings
-            filings = self.retriever.get_filings(ticker)
-            if not filings:
-                return {"error": f"No SEC filings found for {ticker}"}
-            
-            # Step 2: Parse the filings
-            parsed_filings = []
-            for filing in filings:
-                result = self.parser.parse_filing(filing)
-                parsed_filings.append(result)
-                time.sleep(0.1)  # Prevent resource overload
+            # Retrieve, parse, analyze, diff and index, as configured (agents/stages.py)
+            context = {"ticker": ticker, "years": years, "report": report}
+            for name, stage in self.stages:
+                outcome = stage(self, context)
+                if outcome and "error" in outcome:
+                    return outcome
             
-            # Step 3: Analyze the financial data
-            analysis_results = self.analyzer.analyze(parsed_filings)
-            
-            # Step 4: Index the documents for retrieval (if needed)
-            collection_name = f"{ticker}_filings"
-            self.embedding_manager.index_documents(parsed_filings, collection_name)
-            
-            # Step 5: Generate investment insights
-            insights = self._generate_insights(analysis_results, ticker)
+            filings = context.get("filings", [])
+            analysis_results = context.get("analysis", {})
+            filing_diff = context.get("filing_diff")
             
             # Combine results
             results = {
                 "ticker": ticker,
                 "analysis": analysis_results,
-                "insights": insights,
-                "filing_count": len(filings)
+                "quick_insights": context.get("quick_insights", []),
+                "insights": "",
+                "filing_count": len(filings),
+                "accessions": [self.retriever.accession_from_path(f) for f in filings],
+                "filing_diff": filing_diff,
+                "processed_at": time.time()
             }
+            if key != ticker:
+                results["years"] = years
+            
+            # Prepare (and optionally run) the LLM narrative
+            if analysis_results.get('financials'):
+                results["narrative_prompts"] = self.insight_pipeline.build_prompts(
+                    ticker, analysis_results, context.get("parsed_filings", []), filing_diff
+                )
+            else:
+                results["insights"] = "Insufficient financial data to generate insights."
+                results["insight_sections"] = {"Key Insights": results["insights"]}
+            
+            if generate_narrative and "insight_sections" not in results:
+                report("Generating narrative", 0.9)
+                for _ in self.generate_narrative(results):
+                    pass
             
             # Cache the results
             if self.use_cache:
-                self.cache[ticker] = results
+                self.cache[key] = results
             
             return results
             
@@ -83,51 +174,35 @@ class SECAnalysisOrchestrator:
             self.logger.error(f"Error processing ticker {ticker}: {e}")
             return {"error": f"Error analyzing {ticker}: {str(e)}"}
     
-    def _generate_insights(self, analysis_results, ticker):
-        """Generate investment insights using LLM"""
-        if not analysis_results.get('financials'):
-            return "Insufficient financial data to generate insights."
-        
-        # Create prompt for financial analysis
-        template = """
-        You are a financial analyst reviewing SEC filings for {ticker}.
-        
-        Based on the following financial data, provide 5 key investment insights:
-        
-        FINANCIAL METRICS:
-        {financials}
-        
-        FINANCIAL TRENDS:
-        {trends}
-        
-        For each insight:
-        1. Focus on the most significant metrics and trends
-        2. Explain what they indicate about the company's financial health
-        3. Highlight any potential risks or opportunities
-        4. Provide context on how these compare to industry standards
-        
-        Format your response as 5 numbered insights with explanations.
+    def create_chat_session(self, ticker, results=None):
+        """Follow-up Q&A over a processed ticker's indexed filings, sharing this pipeline's models"""
+        ticker = ticker.upper()
+        if results is None and ticker in self.cache:
+            results = self.cache[ticker]
+        return ChatSession(ticker, self.embedding_manager, self.llm_manager, self.prompt_builder, results=results)
+    
+    def generate_narrative(self, results):
         """
+        Run the LLM analyses for a processed ticker, yielding (title, text) as each finishes.
         
-        # Format the data for the prompt
-        latest = analysis_results.get('latest', {})
-        trends = analysis_results.get('trends', {})
-        
-        # Convert dictionaries to formatted strings
-        financials_str = "\n".join([f"{k}: {v}" for k, v in latest.items()]) 
-        trends_str = "\n".join([f"{k}: {v}" for k, v in trends.items()])
-        
-        prompt = PromptTemplate(
-            input_variables=["ticker", "financials", "trends"],
-            template=template
-        )
-        
-        chain = LLMChain(llm=self.llm, prompt=prompt)
+        The sections are stored back on results (and so in the cache) once all calls return.
+        """
+        prompts = results.get("narrative_prompts", {})
+        titles = dict(ANALYSES)
+        completed = {}
         
         try:
-            # Run the chain
-            result = chain.run(ticker=ticker, financials=financials_str, trends=trends_str)
-            return result
+            for key, text in self.insight_pipeline.iter_results(prompts):
+                completed[key] = text
+                if text:
+                    yield titles[key], text
         except Exception as e:
             self.logger.error(f"Error generating insights: {e}")
-            return "Unable to generate insights due to an error."
+        
+        results["insight_sections"] = self.insight_pipeline.merge(completed, prompts)
+        results["insights"] = results["insight_sections"].get("Key Insights", "")
+        
+        if self.use_cache and results.get("ticker"):
+            entry_key = self.cache_key(results["ticker"], results.get("years"))
+            if entry_key in self.cache:
+                self.cache[entry_key] = results
@@ -1,15 +1,34 @@
 # agents/parser.py
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
 import re
+import time
 import pandas as pd
 import logging
-from utils.sec_utils import clean_text, extract_tables
+from concurrent.futures import ThreadPoolExecutor
+from utils.sec_utils import extract_tables, primary_document, split_paragraphs
+from utils.filing_archive import read_filing
+from utils.table_classifier import classify_tables
+
+# Block-level elements that delimit paragraphs in filing HTML
+BLOCK_TAGS = ["p", "div", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"]
+# Strings that are page text (not comments, doctypes, scripts or styles), as in get_text()
+TEXT_TYPES = (NavigableString, CData)
+# Name of an inline XBRL cover page fact, e.g. dei:DocumentPeriodEndDate
+DEI_FACT = re.compile(r"^dei:\w+$")
 
 class FilingParser:
     """Extract structured data from SEC filings"""
     
-    def __init__(self):
+    def __init__(self, archive=None, max_workers=1, throttle=0.0):
+        """
+        Args:
+            max_workers (int): Filings parse_filings() parses at once.
+            throttle (float): Seconds to pause between filings when parsing one at a time.
+        """
         self.logger = logging.getLogger(__name__)
+        self.archive = archive
+        self.max_workers = max_workers
+        self.throttle = throttle
         
         # Patterns to identify key sections in 10-K/Q filings
         self.section_patterns = {
@@ -31,31 +50,69 @@ class FilingParser:
             ]
         }
     
+    def parse_filings(self, file_paths, progress=None):
+        """
+        Parse several filings, max_workers at a time, returning results in input order.
+        
+        progress, if given, is called as progress(index, total) before each filing starts.
+        """
+        report = progress or (lambda index, total: None)
+        total = len(file_paths)
+        if self.max_workers <= 1 or total <= 1:
+            parsed = []
+            for i, file_path in enumerate(file_paths):
+                report(i, total)
+                parsed.append(self.parse_filing(file_path))
+                if self.throttle:
+                    time.sleep(self.throttle)  # Prevent resource overload
+            return parsed
+        
+        def parse(indexed):
+            i, file_path = indexed
+            report(i, total)
+            return self.parse_filing(file_path)
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total), thread_name_prefix="parse") as executor:
+            return list(executor.map(parse, enumerate(file_paths)))
+    
     def parse_filing(self, file_path):
-        """Parse an SEC filing into structured sections and tables"""
+        """Parse an SEC filing (a file path or archive:// reference) into structured sections and tables"""
         self.logger.info(f"Parsing filing: {file_path}")
         
         try:
             # Read the file
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            content = read_filing(file_path, self.archive)
+            
+            # Full submissions (bulk-ingested filings) embed the filing's HTML document
+            is_html = file_path.endswith('.htm') or file_path.endswith('.html')
+            document = primary_document(content) if file_path.endswith('.txt') else None
+            if document is not None:
+                is_html = True
+            else:
+                document = content
+            
+            # HTML filings are reduced to plain text with one paragraph per block element
+            soup = BeautifulSoup(document, 'html.parser') if is_html else None
+            text = self._html_to_text(soup) if is_html else document
+            
+            # Extract cover page facts tagged in inline XBRL filings
+            dei = self._extract_dei_facts(soup) if is_html else {}
             
             # Extract document type and filing date
-            doc_type = self._extract_document_type(content)
+            doc_type = dei.get("DocumentType") or self._extract_document_type(content)
             filing_date = self._extract_filing_date(content)
             
             # Extract sections based on patterns
             sections = {}
             for section_name, patterns in self.section_patterns.items():
-                section_text = self._extract_section(content, patterns)
+                section_text = self._extract_section(text, patterns)
                 if section_text:
-                    # Clean up the text
-                    sections[section_name] = clean_text(section_text)
+                    # Clean up the text, keeping paragraph breaks for diffing and chunking
+                    sections[section_name] = "\n\n".join(split_paragraphs(section_text))
             
             # Extract tables from HTML if available
             tables = []
-            if file_path.endswith('.htm') or file_path.endswith('.html'):
-                soup = BeautifulSoup(content, 'html.parser')
+            if is_html:
                 tables = extract_tables(soup)
             
             # Extract tables from text using regex for TXT files
@@ -66,10 +123,17 @@ class FilingParser:
                 "metadata": {
                     "file_path": file_path,
                     "doc_type": doc_type,
-                    "filing_date": filing_date
+                    "filing_date": filing_date,
+                    "ticker": dei.get("TradingSymbol"),
+                    "fiscal_year": dei.get("DocumentFiscalYearFocus"),
+                    "fiscal_period": dei.get("DocumentFiscalPeriodFocus"),
+                    "period_end_date": dei.get("DocumentPeriodEndDate"),
+                    "fiscal_year_end": dei.get("CurrentFiscalYearEndDate")
                 },
                 "sections": sections,
-                "tables": tables
+                "tables": tables,
+                # Statement type per table, so the analyzer only searches the relevant few
+                "table_types": classify_tables(tables)
             }
             
         except Exception as e:
@@ -77,7 +141,8 @@ class FilingParser:
             return {
                 "metadata": {"file_path": file_path, "error": str(e)},
                 "sections": {},
-                "tables": []
+                "tables": [],
+                "table_types": []
             }
     
     def _extract_document_type(self, text):
@@ -88,6 +153,22 @@ class FilingParser:
             return "10-Q"
         return "Unknown"
     
+    def _extract_dei_facts(self, soup):
+        """
+        Extract the dei: cover page facts (fiscal period, period end, symbol), e.g.
+        <ix:nonNumeric name="dei:DocumentFiscalPeriodFocus">Q3</ix:nonNumeric>.
+        
+        A fact's text can be split across nested ix:nonNumeric elements (a date whose
+        month and day are tagged separately), so the whole outer element is read.
+        """
+        facts = {}
+        for element in soup.find_all("ix:nonnumeric", attrs={"name": DEI_FACT}):
+            name = element["name"].split(":", 1)[1]
+            value = " ".join(element.get_text().split())
+            if value and name not in facts:
+                facts[name] = value
+        return facts
+    
     def _extract_filing_date(self, text):
         """Extract the filing date"""
         date_pattern = r'FILED AS OF DATE:\s*(\d{8})'
@@ -97,26 +178,68 @@ class FilingParser:
             return f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"
         return "Unknown"
     
+    def _html_to_text(self, soup):
+        """
+        Plain text of an HTML filing, blank-line separated: one paragraph per table row and
+        per run of text between block element boundaries, so text placed directly inside a
+        block that also holds child blocks is kept around their paragraphs, in document order
+        """
+        paragraphs = []
+        run = []
+        
+        def flush():
+            paragraph = " ".join("".join(run).split())
+            run.clear()
+            if paragraph:
+                paragraphs.append(paragraph)
+        
+        stack = [(iter(soup.contents), False)]  # (children left to visit, whether the parent is a block)
+        while stack:
+            children, in_block = stack[-1]
+            node = next(children, None)
+            if node is None:
+                stack.pop()
+                if in_block:
+                    flush()
+            elif isinstance(node, Tag):
+                if node.name == "tr":
+                    flush()
+                    cells = (cell.get_text() for cell in node.find_all(["td", "th"]))
+                    run.append(" | ".join(cell.strip() for cell in cells if cell.strip()))
+                    flush()
+                else:
+                    if node.name in BLOCK_TAGS:
+                        flush()
+                    stack.append((iter(node.contents), node.name in BLOCK_TAGS))
+            elif type(node) in TEXT_TYPES:
+                run.append(str(node))
+        flush()
+        return "\n\n".join(paragraphs)
+    
     def _extract_section(self, text, patterns):
-        """Extract a section based on patterns"""
+        """
+        Extract a section based on patterns.
+        
+        A heading can match more than once (the table of contents, cross-references);
+        the longest candidate running to the next "Item N" heading is the section body.
+        """
         text_lower = text.lower()
+        # Item headings start a paragraph; "see Item 7" in running text does not end a section
+        next_pattern = re.compile(r'(?:^|\n)\s*item\s*\d+[a-z]?\.?')
         
         for pattern in patterns:
-            matches = list(re.finditer(pattern, text_lower))
-            if matches:
-                # Get position of the match
-                start_pos = matches[0].end()
+            candidates = []
+            for match in re.finditer(pattern, text_lower):
+                start_pos = match.end()
                 
                 # Look for the next item section
-                next_pattern = r'item\s*\d+[A-Za-z]?\.?'
-                next_matches = list(re.finditer(next_pattern, text_lower[start_pos:]))
-                
-                if next_matches:
-                    end_pos = start_pos + next_matches[0].start()
-                    return text[start_pos:end_pos].strip()
-                else:
-                    # If no next section, take a reasonable chunk
-                    return text[start_pos:start_pos + 50000].strip()
+                next_match = next_pattern.search(text_lower, start_pos)
+                # If no next section, take a reasonable chunk
+                end_pos = next_match.start() if next_match else start_pos + 50000
+                candidates.append(text[start_pos:end_pos].strip())
+            
+            if candidates:
+                return max(candidates, key=len)
         
         return None
     
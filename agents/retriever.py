@@ -1,23 +1,46 @@
 # agents/retriever.py
 import os
 import logging
+import requests
 from datetime import datetime, timedelta
 from sec_edgar_downloader import Downloader
 import shutil
+from utils.ticker_map import get_ticker_map
+from utils.filing_archive import get_filing_archive
+
+SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK{cik}.json"
 
 class SECRetriever:
     """Agent responsible for retrieving SEC filings using sec-edgar-downloader."""
 
-    def __init__(self, company_name="YourCompanyName", email="your.email@example.com", output_dir="data/filings"):
+    def __init__(self, company_name="YourCompanyName", email="your.email@example.com", output_dir="data/filings",
+                 ticker_map=None, archive=None, use_archive=True, as_of=None):
         self.output_dir = output_dir
         self.company_name = company_name
         self.email = email
-        # Initialize the downloader, specifying the root download location
-        self.dl = Downloader(self.company_name, self.email, self.output_dir)
+        self.ticker_map = ticker_map if ticker_map is not None else get_ticker_map()
+        self._dl = None
+        # Downloads are staged in output_dir and moved into the compressed archive
+        self.use_archive = use_archive
+        self.archive = archive if archive is not None else (get_filing_archive() if use_archive else None)
+        # Day the look-back window ends on (today when None); replays pin it to the recording date
+        self.as_of = as_of
         self.logger = logging.getLogger(__name__)
         os.makedirs(self.output_dir, exist_ok=True) # Ensure base directory exists
 
-    def get_filings(self, ticker, years=1, forms=["10-K", "10-Q"], limit=10):
+    @property
+    def dl(self):
+        """Downloader, created on first download (its constructor fetches EDGAR's ticker list)"""
+        if self._dl is None:
+            # Initialize the downloader, specifying the root download location
+            self._dl = Downloader(self.company_name, self.email, self.output_dir)
+        return self._dl
+
+    def _get_cik(self, ticker):
+        """Return the 10-digit CIK for a ticker from the local ticker map, or None"""
+        return self.ticker_map.get_cik(ticker)
+
+    def get_filings(self, ticker, years=1, forms=["10-K", "10-Q"], limit=10, download=True):
         """
         Retrieve recent filings for a company using sec-edgar-downloader.
 
@@ -26,15 +49,18 @@ class SECRetriever:
             years (int): How many years of history to retrieve.
             forms (list): List of SEC form types to download (e.g., ["10-K", "10-Q"]).
             limit (int): The maximum total number of filings to return.
+            download (bool): If False, skip downloading and return filings already stored
+                (e.g. by the bulk index ingestor in agents/edgar_index.py).
 
         Returns:
-            list: A list of file paths to the primary HTML document for each downloaded filing.
+            list: A list of file paths to the primary HTML document for each downloaded filing,
+                or archive:// references when the archive is enabled.
                 Returns an empty list if no filings are found or an error occurs.
         """
         ticker = ticker.upper()
         self.logger.info(f"Retrieving latest {limit} {forms} filings for {ticker} from past {years} years.")
 
-        end_date = datetime.now()
+        end_date = self.as_of or datetime.now()
         start_date = end_date - timedelta(days=365 * years)
         after_date_str = start_date.strftime("%Y-%m-%d")
         before_date_str = end_date.strftime("%Y-%m-%d")
@@ -42,8 +68,19 @@ class SECRetriever:
         download_count = 0
         max_per_form = limit # Aim to download up to 'limit' for each form initially
 
-        # Clear previous downloads for this ticker to ensure freshness (optional)
         ticker_download_path = os.path.join(self.output_dir, "sec-edgar-filings", ticker)
+        if not download:
+            if self.use_archive:
+                self.archive.import_directory(self.output_dir, ticker=ticker)
+                return self._archived_filings(ticker, forms, after_date_str, limit)
+            primary_doc_paths = [
+                path for path in self._find_primary_document_paths(ticker_download_path)
+                if os.path.basename(os.path.dirname(os.path.dirname(path))) in forms
+            ]
+            primary_doc_paths.sort(reverse=True)
+            return primary_doc_paths[:limit]
+
+        # Clear previous downloads for this ticker to ensure freshness (optional)
         if os.path.exists(ticker_download_path):
             self.logger.info(f"Removing previous downloads for {ticker} at {ticker_download_path}")
             try:
@@ -71,7 +108,10 @@ class SECRetriever:
                 # Continue to the next form type even if one fails
 
         # After downloads, find the paths to the actual primary documents
-        if download_count > 0:
+        if download_count > 0 and self.use_archive:
+            self.archive.import_directory(self.output_dir, ticker=ticker, remove=True)
+            return self._archived_filings(ticker, forms, after_date_str, limit)
+        elif download_count > 0:
             primary_doc_paths = self._find_primary_document_paths(ticker_download_path)
             self.logger.info(f"Found {len(primary_doc_paths)} primary document paths for {ticker}.")
             # Sort paths (descending seems reasonable, hoping structure implies date)
@@ -82,14 +122,67 @@ class SECRetriever:
             self.logger.warning(f"No filings were successfully downloaded for {ticker}.")
             return []
 
+    def _archived_filings(self, ticker, forms, after_date_str, limit):
+        """Archive references for a ticker's stored filings, newest first (an index lookup)"""
+        records = self.archive.list_filings(ticker, forms=forms, after=after_date_str)
+        self.logger.info(f"Found {len(records)} archived filings for {ticker}.")
+        return [self.archive.ref(record) for record in records[:limit]]
+
+    def get_latest_accessions(self, ticker, forms=["10-K", "10-Q"], limit=1):
+        """
+        Look up the most recent accession numbers for a company without downloading anything.
+
+        Args:
+            ticker (str): The company ticker symbol.
+            forms (list): Form types to consider.
+            limit (int): Number of accessions to return per form.
+
+        Returns:
+            list: Accession numbers (e.g. "0000320193-24-000123"), newest first.
+                Returns an empty list if the lookup fails.
+        """
+        ticker = ticker.upper()
+        try:
+            cik = self._get_cik(ticker)
+            if cik is None:
+                self.logger.warning(f"No CIK found for {ticker}")
+                return []
+
+            response = requests.get(
+                SUBMISSIONS_URL.format(cik=cik),
+                headers={"User-Agent": f"{self.company_name} {self.email}"},
+                timeout=30
+            )
+            response.raise_for_status()
+            recent = response.json()["filings"]["recent"]
+
+            counts = {form: 0 for form in forms}
+            accessions = []
+            # The "recent" arrays are ordered newest first
+            for accession, form in zip(recent["accessionNumber"], recent["form"]):
+                if form in counts and counts[form] < limit:
+                    accessions.append(accession)
+                    counts[form] += 1
+            return accessions
+
+        except Exception as e:
+            self.logger.error(f"Error checking latest filings for {ticker}: {e}")
+            return []
+
+    @staticmethod
+    def accession_from_path(file_path):
+        """Accession number of a downloaded filing (the name of its directory)"""
+        return os.path.basename(os.path.dirname(file_path))
+
     def _find_primary_document_paths(self, ticker_path):
         """
         Recursively finds paths to the primary HTML document within the download structure.
         sec-edgar-downloader usually saves it as 'primary-document.html' or 'filing-details.html'.
+        Falls back to 'full-submission.txt' (the only file bulk-ingested filings have).
         """
         primary_docs = []
         # Expected filenames used by sec-edgar-downloader with download_details=True
-        expected_filenames = ["primary-document.html", "filing-details.html"]
+        expected_filenames = ["primary-document.html", "filing-details.html", "full-submission.txt"]
 
         if not os.path.exists(ticker_path):
             self.logger.warning(f"Ticker download path does not exist: {ticker_path}")
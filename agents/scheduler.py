@@ -0,0 +1,125 @@
+# Background precomputation for watchlist tickers
+# agents/scheduler.py
+import time
+import logging
+import argparse
+import threading
+
+class PrecomputeWorker:
+    """Poll EDGAR for new filings on a watchlist and warm the result cache off-request"""
+
+    def __init__(self, orchestrator, watchlist, poll_interval=900, forms=["10-K", "10-Q"]):
+        """
+        Args:
+            orchestrator (SECAnalysisOrchestrator): Pipeline used to process tickers; its
+                cache is the one the UI reads.
+            watchlist (list): Ticker symbols to keep warm.
+            poll_interval (float): Seconds between polls.
+            forms (list): Form types whose new filings trigger a refresh.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.orchestrator = orchestrator
+        self.cache = orchestrator.cache
+        self.watchlist = [ticker.upper() for ticker in watchlist]
+        self.poll_interval = poll_interval
+        self.forms = forms
+        self._stop = threading.Event()
+        self._thread = None
+
+    def pending_accession(self, ticker):
+        """
+        Return the newest accession not covered by the cached results.
+
+        Returns "" when nothing is cached and EDGAR could not be reached (the ticker
+        should still be processed), or None when the cache is up to date.
+        """
+        latest = self.orchestrator.retriever.get_latest_accessions(ticker, self.forms)
+        entry = self.cache.get(ticker)
+        if entry is None:
+            return latest[0] if latest else ""
+
+        cached = set(entry["accessions"])
+        new = [accession for accession in latest if accession not in cached]
+        return new[0] if new else None
+
+    def warm(self, ticker, accession=""):
+        """Run the full pipeline (including the LLM narrative) and cache the results"""
+        self.cache.set_status(ticker, "processing", accession=accession)
+        try:
+            results = self.orchestrator.process_ticker(ticker, generate_narrative=True, refresh=True)
+        except Exception as e:
+            results = {"error": str(e)}
+
+        if "error" in results:
+            self.logger.error(f"Precompute failed for {ticker}: {results['error']}")
+            self.cache.set_status(ticker, "failed", accession=accession, error=results["error"])
+            return False
+
+        self.cache.set_status(ticker, "ready", accession=accession)
+        self.logger.info(f"Precomputed {ticker} ({results['filing_count']} filings)")
+        return True
+
+    def run_once(self):
+        """Check every watchlist ticker once, processing those with new filings"""
+        warmed = []
+        for ticker in self.watchlist:
+            if self._stop.is_set():
+                break
+            try:
+                accession = self.pending_accession(ticker)
+                if accession is None:
+                    self.logger.info(f"{ticker} is up to date")
+                    continue
+                if self.warm(ticker, accession):
+                    warmed.append(ticker)
+            except Exception as e:
+                self.logger.error(f"Error precomputing {ticker}: {e}")
+        return warmed
+
+    def run_forever(self):
+        """Poll until stop() is called"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_once()
+            self._stop.wait(max(self.poll_interval - (time.monotonic() - started), 0))
+
+    def start(self):
+        """Run the polling loop on a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="precompute", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        """Stop polling; a ticker being processed is allowed to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def main(argv=None):
+    from config import settings
+    from agents.orchestrator import SECAnalysisOrchestrator
+
+    parser = argparse.ArgumentParser(description="Precompute analyses for watchlist tickers")
+    parser.add_argument("--watchlist", default=",".join(settings.WATCHLIST),
+                        help="Comma-separated ticker symbols")
+    parser.add_argument("--interval", type=int, default=settings.PRECOMPUTE_INTERVAL,
+                        help="Seconds between EDGAR polls")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    args = parser.parse_args(argv)
+
+    watchlist = [ticker.strip() for ticker in args.watchlist.split(",") if ticker.strip()]
+    worker = PrecomputeWorker(SECAnalysisOrchestrator(use_cache=True), watchlist, poll_interval=args.interval)
+    if args.once:
+        worker.run_once()
+    else:
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Cross-sectional screening over many tickers
+# agents/screener.py
+import os
+import re
+import operator
+import logging
+import numpy as np
+import pandas as pd
+
+# Comparison operators accepted in screen filters
+FILTER_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+FILTER_PATTERN = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(>=|<=|==|!=|>|<)\s*(-?[\d.]+%?)\s*$")
+
+# Suffixes of the trend keys produced by FinancialAnalyzer that are carried into the table
+TREND_SUFFIXES = ("_cagr", "_avg_growth", "_volatility")
+
+PERCENTILE_SUFFIX = "_sector_pct"
+
+
+def parse_filter(expression):
+    """Parse a filter such as 'gross_margin > 40%' into (column, op, value)"""
+    match = FILTER_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Invalid screen filter: {expression!r}")
+
+    column, op, raw_value = match.groups()
+    if raw_value.endswith("%"):
+        value = float(raw_value[:-1]) / 100
+    else:
+        value = float(raw_value)
+    return column, op, value
+
+
+class UniverseScreener:
+    """Precomputed metrics table for screening and ranking a universe of tickers"""
+
+    def __init__(self, table_path="data/processed/universe_metrics.pkl"):
+        self.logger = logging.getLogger(__name__)
+        self.table_path = table_path
+        self.table = pd.DataFrame()
+        self.load()
+
+    def load(self):
+        """Load the precomputed table from disk if it exists"""
+        if os.path.exists(self.table_path):
+            try:
+                self.table = pd.read_pickle(self.table_path)
+                self.logger.info(f"Loaded universe table with {len(self.table)} tickers")
+            except Exception as e:
+                self.logger.error(f"Error loading universe table {self.table_path}: {e}")
+                self.table = pd.DataFrame()
+        return self.table
+
+    def save(self):
+        """Persist the precomputed table"""
+        os.makedirs(os.path.dirname(self.table_path) or ".", exist_ok=True)
+        self.table.to_pickle(self.table_path)
+
+    def build(self, analyses, sectors=None):
+        """Build the universe table from {ticker: FinancialAnalyzer.analyze() output}"""
+        sectors = sectors or {}
+        rows = [self._to_row(ticker, analysis, sectors.get(ticker)) for ticker, analysis in analyses.items()]
+        self.table = self._rank(pd.DataFrame(rows).set_index("ticker") if rows else pd.DataFrame())
+        self.save()
+        return self.table
+
+    def update(self, ticker, analysis, sector=None):
+        """Insert or replace a single ticker and refresh the sector percentiles"""
+        ticker = ticker.upper()
+        if sector is None and not self.table.empty and ticker in self.table.index:
+            sector = self.table.at[ticker, "sector"]
+
+        row = pd.DataFrame([self._to_row(ticker, analysis, sector)]).set_index("ticker")
+        base = self._strip_percentiles(self.table.drop(index=ticker, errors="ignore"))
+        self.table = self._rank(pd.concat([base, row]))
+        self.save()
+        return self.table.loc[ticker]
+
+    def add_results(self, results, sector=None):
+        """Add an orchestrator result for one ticker to the universe"""
+        if "error" in results:
+            return None
+        return self.update(results["ticker"], results["analysis"], sector=sector)
+
+    def screen(self, filters=None, rank_by=None, ascending=False, sector=None, limit=None, columns=None):
+        """
+        Filter and rank the universe.
+
+        Args:
+            filters (list): Filter expressions ('gross_margin > 0.4') or (column, op, value) tuples.
+            rank_by (str): Column to sort the matches by.
+            ascending (bool): Sort order for rank_by.
+            sector (str): Restrict the screen to a single sector.
+            limit (int): Maximum number of rows to return.
+            columns (list): Columns to include in the output.
+
+        Returns:
+            pd.DataFrame: Matching tickers, ranked.
+        """
+        table = self.table
+        if table.empty:
+            return table
+
+        mask = np.ones(len(table), dtype=bool)
+        if sector is not None:
+            mask &= (table["sector"] == sector).to_numpy()
+
+        for spec in filters or []:
+            column, op, value = parse_filter(spec) if isinstance(spec, str) else spec
+            if column not in table.columns:
+                raise KeyError(f"Unknown screen column: {column}")
+            if op not in FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            # NaN compares False, so tickers missing a metric never pass a filter on it
+            mask &= FILTER_OPERATORS[op](table[column].to_numpy(dtype=float), value)
+
+        result = table[mask]
+        if rank_by is not None:
+            if rank_by not in result.columns:
+                raise KeyError(f"Unknown rank column: {rank_by}")
+            result = result.sort_values(rank_by, ascending=ascending, na_position="last")
+
+        if columns is not None:
+            result = result[[c for c in columns if c in result.columns]]
+        if limit is not None:
+            result = result.head(limit)
+        return result
+
+    def numeric_columns(self):
+        """Return the metric columns available for filtering and ranking"""
+        if self.table.empty:
+            return []
+        return [c for c in self.table.select_dtypes(include=[np.number]).columns]
+
+    def _to_row(self, ticker, analysis, sector):
+        """Flatten an analysis result into a single table row"""
+        row = {"ticker": ticker.upper(), "sector": sector or "Unknown"}
+
+        for key, value in analysis.get("latest", {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                row[key] = float(value)
+
+        for key, value in analysis.get("trends", {}).items():
+            if key.endswith(TREND_SUFFIXES) and isinstance(value, (int, float)):
+                row[key] = float(value)
+
+        row["filing_date"] = analysis.get("latest", {}).get("filing_date", "Unknown")
+        return row
+
+    def _strip_percentiles(self, table):
+        """Drop previously computed percentile columns"""
+        return table.drop(columns=[c for c in table.columns if c.endswith(PERCENTILE_SUFFIX)])
+
+    def _rank(self, table):
+        """Precompute percentile ranks of every metric within its sector"""
+        if table.empty:
+            return table
+
+        metrics = table.select_dtypes(include=[np.number])
+        ranks = metrics.groupby(table["sector"]).rank(pct=True)
+        ranks.columns = [f"{c}{PERCENTILE_SUFFIX}" for c in ranks.columns]
+        return pd.concat([table, ranks], axis=1)
@@ -0,0 +1,76 @@
+# Registry of the per-ticker pipeline stages
+# agents/stages.py
+#
+# A stage is a function stage(orchestrator, context) that reads what earlier stages
+# left in the context dict and adds its own output. It can return {"error": ...} to
+# stop the pipeline. SECAnalysisOrchestrator runs the stages named in
+# PipelineSettings.stages, in order. Deployments can drop a stage (e.g. "index" when
+# retrieval is not used) or register their own:
+#
+#   @register_stage("segments")
+#   def segments(orchestrator, context):
+#       context["segments"] = extract_segments(context["parsed_filings"])
+
+STAGES = {}  # name -> stage function
+
+
+def register_stage(name):
+    """Decorator registering a stage function under name (replacing any stage of that name)"""
+    def decorator(func):
+        STAGES[name] = func
+        return func
+    return decorator
+
+
+def get_stage(name):
+    if name not in STAGES:
+        raise ValueError(f"Unknown pipeline stage: {name} (registered: {sorted(STAGES)})")
+    return STAGES[name]
+
+
+@register_stage("retrieve")
+def retrieve(orchestrator, context):
+    """Download (or look up) the ticker's filings within the configured history"""
+    context["report"]("Retrieving filings", 0.05)
+    retrieval = orchestrator.settings.retrieval
+    filings = orchestrator.retriever.get_filings(
+        context["ticker"], years=context["years"], forms=list(retrieval.forms), limit=retrieval.max_filings
+    )
+    if not filings:
+        return {"error": f"No SEC filings found for {context['ticker']}"}
+    context["filings"] = filings
+
+
+@register_stage("parse")
+def parse(orchestrator, context):
+    report = context["report"]
+    context["parsed_filings"] = orchestrator.parser.parse_filings(
+        context["filings"],
+        progress=lambda i, total: report(f"Parsing filing {i + 1} of {total}", 0.2 + 0.4 * i / total)
+    )
+
+
+@register_stage("analyze")
+def analyze(orchestrator, context):
+    """Financial metrics and trends, plus the rule-based insights drawn from them"""
+    context["report"]("Analyzing financials", 0.6)
+    analysis = orchestrator.analyzer.analyze(context["parsed_filings"])
+    context["analysis"] = analysis
+    context["quick_insights"] = orchestrator.insight_agent.generate_insights(
+        analysis.get('latest', {}),
+        analysis.get('trends', {})
+    )
+
+
+@register_stage("diff")
+def diff(orchestrator, context):
+    """What changed in the latest filing's narrative since its predecessor"""
+    context["filing_diff"] = orchestrator.differ.diff_latest(context["parsed_filings"])
+
+
+@register_stage("index")
+def index(orchestrator, context):
+    """Index the filings for search and chat"""
+    context["report"]("Indexing documents", 0.7)
+    ticker = context["ticker"]
+    orchestrator.embedding_manager.index_documents(context["parsed_filings"], f"{ticker}_filings", ticker=ticker)
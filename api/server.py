@@ -0,0 +1,297 @@
+# Headless HTTP/JSON API for the analysis pipeline
+# api/server.py
+import os
+import sys
+import math
+import json
+import asyncio
+import logging
+import argparse
+# Add the parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from aiohttp import web
+from agents.job_service import DONE
+from utils.result_cache import results_version
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+SERVICE_KEY = web.AppKey("job_service", object)
+LIMITER_KEY = web.AppKey("limiter", object)
+
+
+def to_json(value):
+    """Recursively convert results to JSON-safe values (numpy scalars, NaN -> null)"""
+    if isinstance(value, dict):
+        return {str(k): to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, np.ndarray):
+        if np.issubdtype(value.dtype, np.datetime64):
+            return np.datetime_as_string(value).tolist()
+        return to_json(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def error_status(error):
+    """HTTP status for a pipeline error: bad ticker 400, no filings 404, anything else 500"""
+    if error.startswith("Invalid ticker symbol"):
+        return 400
+    if error.startswith("No SEC filings found"):
+        return 404
+    return 500
+
+
+def results_etag(results, view):
+    """Strong validator for one view of a ticker's results"""
+    return f'"{view}-{results_version(results)}"'
+
+
+class ConcurrencyLimiter:
+    """Cap in-flight heavy requests and shed load once the wait queue is full"""
+
+    def __init__(self, max_concurrency=4, max_pending=32):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def __aenter__(self):
+        if self.pending >= self.max_pending:
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"error": "Server busy, retry shortly"}),
+                content_type="application/json",
+                headers={"Retry-After": "5"}
+            )
+        self.pending += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.pending -= 1
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+@web.middleware
+async def compression_middleware(request, handler):
+    """gzip JSON responses for clients that accept it"""
+    response = await handler(request)
+    if isinstance(response, web.Response) and response.body is not None and len(response.body) >= GZIP_MIN_BYTES:
+        response.enable_compression()
+    return response
+
+
+def json_response(request, payload, etag=None, status=200):
+    """JSON response with conditional-request support"""
+    headers = {"Cache-Control": "no-cache"}
+    if etag is not None:
+        headers["ETag"] = etag
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+    body = json.dumps(to_json(payload), separators=(",", ":"))
+    return web.Response(text=body, status=status, content_type="application/json", headers=headers)
+
+
+async def get_results(request):
+    """
+    Results for the requested ticker, computing them on a shared worker if needed.
+
+    Returns (results, None) or (None, error response). ?years=N analyzes N years of
+    filings instead of the configured history. With ?wait=false a request that needs
+    computing returns 202 with a job to poll instead of waiting.
+    """
+    service = request.app[SERVICE_KEY]
+    ticker = request.match_info["ticker"].upper()
+    try:
+        years = int(request.query["years"]) if "years" in request.query else None
+    except ValueError:
+        return None, json_response(request, {"error": "years must be an integer"}, status=400)
+    if years is not None and not 1 <= years <= 20:
+        return None, json_response(request, {"error": "years must be between 1 and 20"}, status=400)
+    job = service.submit(ticker, years=years)
+
+    if not job.done:
+        if request.query.get("wait", "true").lower() == "false":
+            return None, json_response(request, {"job_id": job.id, "state": job.state, "stage": job.stage},
+                                       status=202)
+        async with request.app[LIMITER_KEY]:
+            await asyncio.to_thread(job.wait)
+
+    results = job.result or {"error": job.error or "Unknown error"}
+    if "error" in results:
+        return None, json_response(request, {"error": results["error"]}, status=error_status(results["error"]))
+    return results, None
+
+
+async def health(request):
+    service = request.app[SERVICE_KEY]
+    payload = {"status": "ok", "jobs": service.stats()}
+    # Per-route LLM latency and throughput when the pipeline uses an LLMRouter
+    llm_stats = getattr(getattr(service.orchestrator, "llm_manager", None), "stats", None)
+    if callable(llm_stats):
+        payload["llm"] = llm_stats()
+    return json_response(request, payload)
+
+
+async def analysis(request):
+    results, error = await get_results(request)
+    if error is not None:
+        return error
+    payload = {k: v for k, v in results.items() if k != "narrative_prompts"}
+    return json_response(request, payload, etag=results_etag(results, "analysis"))
+
+
+async def metrics(request):
+    results, error = await get_results(request)
+    if error is not None:
+        return error
+    payload = {"ticker": results["ticker"], "metrics": results["analysis"].get("latest", {})}
+    return json_response(request, payload, etag=results_etag(results, "metrics"))
+
+
+async def trends(request):
+    results, error = await get_results(request)
+    if error is not None:
+        return error
+    payload = {
+        "ticker": results["ticker"],
+        "basis": results["analysis"].get("trend_basis"),
+        "trends": results["analysis"].get("trends", {}),
+        "financials": results["analysis"].get("financials", []),
+    }
+    return json_response(request, payload, etag=results_etag(results, "trends"))
+
+
+async def insights(request):
+    """Rule-based insights, plus the LLM narrative with ?narrative=true"""
+    results, error = await get_results(request)
+    if error is not None:
+        return error
+
+    if request.query.get("narrative", "false").lower() == "true" and "insight_sections" not in results:
+        job = request.app[SERVICE_KEY].submit_narrative(results)
+        async with request.app[LIMITER_KEY]:
+            await asyncio.to_thread(job.wait)
+        if job.state == DONE:
+            results = job.result
+
+    payload = {
+        "ticker": results["ticker"],
+        "quick_insights": results.get("quick_insights", []),
+        "insight_sections": results.get("insight_sections"),
+    }
+    return json_response(request, payload, etag=results_etag(results, "insights"))
+
+
+async def search(request):
+    """Hybrid retrieval over a ticker's indexed filings: ?q=...&k=5"""
+    ticker = request.match_info["ticker"].upper()
+    query = request.query.get("q", "").strip()
+    if not query:
+        return json_response(request, {"error": "Missing query parameter q"}, status=400)
+    try:
+        k = min(int(request.query.get("k", 5)), 50)
+    except ValueError:
+        return json_response(request, {"error": "k must be an integer"}, status=400)
+
+    embedding_manager = request.app[SERVICE_KEY].orchestrator.embedding_manager
+    async with request.app[LIMITER_KEY]:
+        hits = await asyncio.to_thread(embedding_manager.hybrid_search, query, f"{ticker}_filings", k)
+    return json_response(request, {"ticker": ticker, "query": query, "results": hits})
+
+
+async def search_companies(request):
+    """Dense retrieval across every indexed company: ?q=...&k=10&tickers=AAPL,MSFT"""
+    query = request.query.get("q", "").strip()
+    if not query:
+        return json_response(request, {"error": "Missing query parameter q"}, status=400)
+    try:
+        k = min(int(request.query.get("k", 10)), 50)
+    except ValueError:
+        return json_response(request, {"error": "k must be an integer"}, status=400)
+    tickers = [t.strip().upper() for t in request.query.get("tickers", "").split(",") if t.strip()] or None
+
+    embedding_manager = request.app[SERVICE_KEY].orchestrator.embedding_manager
+    if getattr(embedding_manager, "shard_router", None) is None:
+        return json_response(request, {"error": "Cross-company search is not enabled (set VECTOR_SHARDS)"}, status=501)
+    async with request.app[LIMITER_KEY]:
+        hits = await asyncio.to_thread(embedding_manager.search_companies, query, k, tickers)
+    return json_response(request, {"query": query, "tickers": tickers, "results": hits})
+
+
+async def job_status(request):
+    job = request.app[SERVICE_KEY].get(request.match_info["job_id"])
+    if job is None:
+        return json_response(request, {"error": "Unknown or expired job"}, status=404)
+    return json_response(request, {
+        "job_id": job.id,
+        "ticker": job.ticker,
+        "state": job.state,
+        "stage": job.stage,
+        "progress": job.progress,
+        "error": job.error,
+    })
+
+
+def create_app(job_service, max_concurrency=4, max_pending=32):
+    """
+    Build the API application.
+
+    Args:
+        job_service (JobService): Shared, coalescing pipeline workers.
+        max_concurrency (int): Requests allowed to wait on pipeline or retrieval work at once.
+        max_pending (int): Further requests queued before responding 503.
+    """
+    app = web.Application(middlewares=[compression_middleware])
+    app[SERVICE_KEY] = job_service
+
+    async def on_startup(app):
+        # The semaphore must be created on the server's event loop
+        app[LIMITER_KEY] = ConcurrencyLimiter(max_concurrency, max_pending)
+
+    app.on_startup.append(on_startup)
+    app.router.add_get("/health", health)
+    app.router.add_get("/v1/tickers/{ticker}/analysis", analysis)
+    app.router.add_get("/v1/tickers/{ticker}/metrics", metrics)
+    app.router.add_get("/v1/tickers/{ticker}/trends", trends)
+    app.router.add_get("/v1/tickers/{ticker}/insights", insights)
+    app.router.add_get("/v1/tickers/{ticker}/search", search)
+    app.router.add_get("/v1/search", search_companies)
+    app.router.add_get("/v1/jobs/{job_id}", job_status)
+    return app
+
+
+def main(argv=None):
+    from agents.orchestrator import SECAnalysisOrchestrator
+    from agents.job_service import JobService
+    from config.settings import LLM_PROVIDER, LLM_MODEL, LLM_SMALL_MODEL, LLM_EXTRACTION, JOB_WORKERS
+
+    parser = argparse.ArgumentParser(description="Serve the analysis pipeline as a JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="Concurrent pipeline jobs")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--llm-provider", default=LLM_PROVIDER,
+                        help="ollama, openai or stub (canned responses for load tests)")
+    parser.add_argument("--llm-model", default=LLM_MODEL)
+    parser.add_argument("--llm-small-model", default=LLM_SMALL_MODEL,
+                        help="Model for short structured tasks; empty to use --llm-model for everything")
+    parser.add_argument("--llm-extraction", action="store_true", default=LLM_EXTRACTION,
+                        help="Ask the LLM for metrics a filing's tables do not yield")
+    args = parser.parse_args(argv)
+
+    orchestrator = SECAnalysisOrchestrator(use_cache=True, llm_provider=args.llm_provider, llm_model=args.llm_model,
+                                           llm_small_model=args.llm_small_model, llm_extraction=args.llm_extraction)
+    app = create_app(JobService(orchestrator, max_workers=args.workers), max_concurrency=args.max_concurrency)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Load test for the JSON API
+# benchmarks/api_load_test.py
+#
+# Usage:
+#   python -m api.server --llm-provider stub &
+#   python benchmarks/api_load_test.py --url http://localhost:8080 --tickers AAPL,MSFT --requests 2000 --concurrency 50
+#
+#   # Or start the server in-process (stub LLM) and warm the tickers first
+#   python benchmarks/api_load_test.py --in-process --tickers AAPL --requests 2000
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+import aiohttp
+from aiohttp import web
+# Add the project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = ["metrics", "trends", "insights", "analysis"]
+
+
+async def worker(session, base_url, paths, counter, latencies, statuses, etags, conditional):
+    while True:
+        index = counter[0]
+        if index >= len(paths):
+            return
+        counter[0] += 1
+
+        path = paths[index]
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional and path in etags:
+            headers["If-None-Match"] = etags[path]
+
+        start = time.perf_counter()
+        try:
+            async with session.get(base_url + path, headers=headers) as response:
+                await response.read()
+                if "ETag" in response.headers:
+                    etags[path] = response.headers["ETag"]
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+        except aiohttp.ClientError:
+            statuses["error"] = statuses.get("error", 0) + 1
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_load(base_url, tickers, total, concurrency, conditional):
+    rng = np.random.default_rng(0)
+    paths = [
+        f"/v1/tickers/{tickers[rng.integers(len(tickers))]}/{ENDPOINTS[rng.integers(len(ENDPOINTS))]}"
+        for _ in range(total)
+    ]
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=600)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Warm every ticker once so the measured requests hit the result cache
+        for ticker in tickers:
+            async with session.get(f"{base_url}/v1/tickers/{ticker}/analysis") as response:
+                await response.read()
+                print(f"Warmed {ticker}: HTTP {response.status}")
+
+        counter, latencies, statuses, etags = [0], [], {}, {}
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            worker(session, base_url, paths, counter, latencies, statuses, etags, conditional)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{total} requests, concurrency {concurrency}, conditional={conditional}")
+    print(f"  throughput: {total / elapsed:8.1f} req/s")
+    print(f"  latency ms: p50 {np.percentile(latencies_ms, 50):.1f}  "
+          f"p95 {np.percentile(latencies_ms, 95):.1f}  p99 {np.percentile(latencies_ms, 99):.1f}")
+    print(f"  statuses:   {statuses}")
+
+
+async def main_async(args):
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    runner = None
+    base_url = args.url.rstrip("/")
+
+    if args.in_process:
+        from agents.orchestrator import SECAnalysisOrchestrator
+        from agents.job_service import JobService
+        from api.server import create_app
+
+        orchestrator = SECAnalysisOrchestrator(use_cache=True, llm_provider="stub")
+        runner = web.AppRunner(create_app(JobService(orchestrator), max_concurrency=args.concurrency))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.port).start()
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        for conditional in (False, True):
+            await run_load(base_url, tickers, args.requests, args.concurrency, conditional)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests per second against the JSON API")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--in-process", action="store_true", help="Start the API in this process with a stub LLM")
+    parser.add_argument("--port", type=int, default=8089, help="Port for --in-process")
+    parser.add_argument("--tickers", default="AAPL")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Import time, memory and throughput of the embedding backends on CPU
+# benchmarks/embedding_backends.py
+#
+# Usage:
+#   python benchmarks/embedding_backends.py
+#   python benchmarks/embedding_backends.py --backends onnx --texts 2000 --threads 4
+#
+# Each backend runs in a fresh interpreter, so its import time and peak RSS are what a
+# new Streamlit or API worker pays. Paragraphs from the sample filings are embedded by
+# every backend and compared with the sentence-transformers output (cosine similarity).
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import numpy as np
+# Add the project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+BACKENDS = ["sentence-transformers", "onnx"]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def filing_paragraphs(pattern, limit):
+    """Section paragraphs of the downloaded filings, the text that actually gets embedded"""
+    from agents.parser import FilingParser
+    parser = FilingParser()
+    paragraphs = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        for text in parser.parse_filing(path)["sections"].values():
+            paragraphs.extend(p for p in text.split("\n\n") if len(p) > 40)
+        if len(paragraphs) >= limit:
+            break
+    return paragraphs[:limit]
+
+
+def run_child(backend, model_name, texts_path, out_path, batch_size, threads):
+    """Measure one backend in this (fresh) process and print the numbers as JSON"""
+    with open(texts_path) as f:
+        texts = json.load(f)
+    baseline_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    if backend == "onnx":
+        from models.onnx_embeddings import OnnxEmbedder
+        import onnxruntime  # noqa: F401
+        import_s = time.perf_counter() - start
+        model = OnnxEmbedder(model_name, batch_size=batch_size, threads=threads)
+        model.encode(["warm up"])
+    else:
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+        import_s = time.perf_counter() - start
+        model = SentenceTransformer(model_name, device="cpu")
+        model.encode(["warm up"])
+    load_s = time.perf_counter() - start - import_s
+
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    encode_s = time.perf_counter() - start
+    np.save(out_path, embeddings)
+
+    print(json.dumps({
+        "import_s": import_s,
+        "load_s": load_s,
+        "sentences_per_s": len(texts) / encode_s,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends on CPU")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--filings", default="data/filings/**/*.htm*")
+    parser.add_argument("--texts", type=int, default=1000, help="Paragraphs to embed")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--texts-path", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.model, args.texts_path, args.out, args.batch_size, args.threads or None)
+        return
+
+    texts = filing_paragraphs(args.filings, args.texts)
+    if not texts:
+        sys.exit(f"No filing text found under {args.filings}")
+    print(f"{len(texts)} paragraphs, model {args.model}, batch size {args.batch_size}, "
+          f"threads {args.threads or 'default'}\n")
+    print(f"{'backend':<22} {'import':>9} {'load':>9} {'RSS':>9} {'sent/s':>9} {'cos mean':>9} {'cos min':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        with open(texts_path, "w") as f:
+            json.dump(texts, f)
+
+        reference = None
+        for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+            out_path = os.path.join(tmp, f"{backend}.npy")
+            command = [sys.executable, os.path.abspath(__file__), "--child", backend, "--model", args.model,
+                       "--texts-path", texts_path, "--out", out_path,
+                       "--batch-size", str(args.batch_size), "--threads", str(args.threads)]
+            child = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+            if child.returncode != 0:
+                print(f"{backend:<22} failed: {child.stderr.strip().splitlines()[-1:]}")
+                continue
+            stats = json.loads(child.stdout.strip().splitlines()[-1])
+
+            embeddings = np.load(out_path)
+            if backend == "sentence-transformers":
+                reference = embeddings
+            if reference is not None:
+                cosine = np.sum(embeddings * reference, axis=1) / (
+                    np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1))
+                agreement = f"{cosine.mean():9.4f} {cosine.min():9.4f}"
+            else:
+                agreement = f"{'-':>9} {'-':>9}"
+
+            print(f"{backend:<22} {stats['import_s']:8.2f}s {stats['load_s']:8.2f}s "
+                  f"{stats['peak_rss_mb'] - stats['baseline_rss_mb']:7.0f}MB "
+                  f"{stats['sentences_per_s']:9.1f} {agreement}")
+
+
+if __name__ == "__main__":
+    main()
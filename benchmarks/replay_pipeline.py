@@ -0,0 +1,140 @@
+# Offline end-to-end runs and per-stage profiles from recorded fixtures
+# benchmarks/replay_pipeline.py
+#
+# Usage:
+#   # Record EDGAR downloads, LLM and embedding calls once (needs network and Ollama)
+#   python benchmarks/replay_pipeline.py --record --tickers AAPL,MSFT
+#
+#   # Replay offline: checks each ticker's results match the recording and times every stage
+#   python benchmarks/replay_pipeline.py --tickers AAPL,MSFT --repeat 5
+#
+#   # Profile one CPU-bound stage in isolation
+#   python benchmarks/replay_pipeline.py --tickers AAPL --profile parse
+import os
+import sys
+import time
+import pstats
+import cProfile
+import argparse
+import tempfile
+import itertools
+import numpy as np
+# Add the project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.replay import FixtureStore, install_replay, results_digest, RECORD, REPLAY
+
+STAGES = ["parse", "analyze", "diff", "chunk", "prompts"]
+
+
+def timed_pipeline(orchestrator, ticker):
+    """process_ticker with the wall time of each reported stage"""
+    marks = []
+    def progress(stage, fraction):
+        # "Parsing filing 3 of 8" and its siblings count as one stage
+        marks.append((stage.split(" filing ")[0], time.perf_counter()))
+
+    started = time.perf_counter()
+    results = orchestrator.process_ticker(ticker, progress=progress)
+    marks.append(("end", time.perf_counter()))
+
+    stages = {"setup": marks[0][1] - started if marks else 0.0}
+    for (stage, start), (_, end) in zip(marks, marks[1:]):
+        stages[stage] = stages.get(stage, 0.0) + end - start
+    return results, stages
+
+
+def stage_runners(orchestrator, ticker, work_dir):
+    """Zero-argument callables for each CPU-bound stage, fed from the replayed run"""
+    from agents.analyzer import FinancialAnalyzer
+    from agents.filing_diff import FilingDiffer
+
+    filings = orchestrator.retriever.get_filings(ticker, download=False)
+    parsed = [orchestrator.parser.parse_filing(filing) for filing in filings]
+    analysis = orchestrator.analyzer.analyze(parsed)
+    diff_dirs = itertools.count()
+
+    return {
+        "parse": lambda: [orchestrator.parser.parse_filing(filing) for filing in filings],
+        # Fresh analyzer and fingerprint cache, so nothing is served from a previous repeat
+        "analyze": lambda: FinancialAnalyzer(llm_extractor=orchestrator.analyzer.llm_extractor).analyze(parsed),
+        "diff": lambda: FilingDiffer(cache_dir=os.path.join(work_dir, "fp", str(next(diff_dirs)))).diff_latest(parsed),
+        "chunk": lambda: [orchestrator.embedding_manager._chunk_document(doc) for doc in parsed],
+        "prompts": lambda: orchestrator.insight_pipeline.build_prompts(ticker, analysis, parsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the pipeline from recorded fixtures")
+    parser.add_argument("--fixtures", default="data/fixtures/replay")
+    parser.add_argument("--tickers", default="AAPL")
+    parser.add_argument("--record", action="store_true", help="Make live calls and save them as fixtures")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each isolated stage")
+    parser.add_argument("--profile", choices=STAGES, help="cProfile one stage instead of timing all of them")
+    parser.add_argument("--llm-provider", default="ollama")
+    parser.add_argument("--llm-model", default="mistral")
+    parser.add_argument("--llm-small-model", default="phi3")
+    parser.add_argument("--llm-extraction", action="store_true")
+    args = parser.parse_args()
+
+    from agents.orchestrator import SECAnalysisOrchestrator
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    store = FixtureStore(args.fixtures, mode=RECORD if args.record else REPLAY)
+    failed = False
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        orchestrator = SECAnalysisOrchestrator(
+            use_cache=False, llm_provider=args.llm_provider, llm_model=args.llm_model,
+            llm_small_model=args.llm_small_model, llm_extraction=args.llm_extraction
+        )
+        install_replay(orchestrator, store, work_dir=work_dir)
+
+        for ticker in tickers:
+            results, stages = timed_pipeline(orchestrator, ticker)
+            if "error" in results:
+                print(f"{ticker}: {results['error']}")
+                failed = True
+                continue
+
+            digest = results_digest(results)
+            expected = store.manifest.setdefault("digests", {})
+            if args.record:
+                expected[ticker] = digest
+                store.save_manifest()
+                status = "recorded"
+            elif expected.get(ticker) == digest:
+                status = "matches recording"
+            else:
+                status = "DIFFERS from recording" if ticker in expected else "no recorded digest"
+                failed = failed or ticker in expected
+
+            print(f"\n{ticker}: {results['filing_count']} filings, results {digest[:12]} {status}")
+            for stage, seconds in stages.items():
+                print(f"  {stage:<24} {seconds * 1000:9.1f}ms")
+
+            if args.record:
+                continue
+            runners = stage_runners(orchestrator, ticker, work_dir)
+            if args.profile:
+                profiler = cProfile.Profile()
+                profiler.runcall(runners[args.profile])
+                pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+                continue
+
+            print(f"  isolated stages, best of {args.repeat}:")
+            for stage in STAGES:
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    runners[stage]()
+                    times.append(time.perf_counter() - start)
+                print(f"  {stage:<24} {min(times) * 1000:9.1f}ms  (median {np.median(times) * 1000:.1f}ms)")
+
+    if store.misses:
+        print(f"\n{len(store.misses)} calls had no recorded fixture; re-record with --record")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
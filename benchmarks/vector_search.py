@@ -0,0 +1,127 @@
+# Recall vs latency benchmark for the vector store configurations
+# benchmarks/vector_search.py
+#
+# Usage:
+#   python benchmarks/vector_search.py --vectors 50000 --queries 200
+#   python benchmarks/vector_search.py --collection AAPL_filings
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+# Add the project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.vector_store import QuantizedVectorStore, normalize
+
+
+def synthetic_vectors(n, dim, clusters=64, seed=0):
+    """Clustered random vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    return normalize(centers[labels] + 0.35 * rng.normal(size=(n, dim)))
+
+
+def collection_vectors(persist_dir, collection_name):
+    """Load the stored embeddings of a Chroma collection"""
+    import chromadb
+    client = chromadb.PersistentClient(path=persist_dir)
+    response = client.get_collection(collection_name).get(include=["embeddings"])
+    return normalize(np.array(response["embeddings"], dtype=np.float32))
+
+
+def exact_top_k(vectors, queries, k):
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def summarize(name, found, truth, latencies, bytes_per_vector):
+    recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+    latencies = np.array(latencies) * 1000
+    print(f"{name:<34} recall@k={recall:6.3f}  p50={np.percentile(latencies, 50):7.2f}ms  "
+          f"p95={np.percentile(latencies, 95):7.2f}ms  mem/vector={bytes_per_vector:6.0f}B")
+
+
+def bench_quantized(vectors, queries, truth, k, dtype, candidates):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = QuantizedVectorStore(tmp, dim=vectors.shape[1], dtype=dtype, rerank_candidates=candidates)
+        ids = [str(i) for i in range(len(vectors))]
+        store.add(ids, vectors, [""] * len(ids), [{} for _ in ids])
+        store.save()
+
+        found, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = store.query(query, k=k)
+            latencies.append(time.perf_counter() - start)
+            found.append([int(hit["id"]) for hit in hits])
+
+        summarize(f"{dtype} rerank={candidates}", found, truth, latencies, store.memory_bytes / len(vectors))
+
+
+def bench_hnsw(vectors, queries, truth, k, m, construction_ef, search_ef):
+    import chromadb
+    client = chromadb.EphemeralClient()
+    name = f"bench_m{m}_c{construction_ef}_s{search_ef}"
+    collection = client.create_collection(name, metadata={
+        "hnsw:space": "cosine", "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef
+    })
+    for start in range(0, len(vectors), 5000):
+        batch = vectors[start:start + 5000]
+        collection.add(ids=[str(i) for i in range(start, start + len(batch))], embeddings=batch.tolist())
+
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found.append([int(doc_id) for doc_id in response["ids"][0]])
+
+    # float32 vector plus roughly 2*M 4-byte neighbour links per node on the base layer
+    bytes_per_vector = vectors.shape[1] * 4 + 2 * m * 4
+    summarize(f"hnsw M={m} ef_c={construction_ef} ef_s={search_ef}", found, truth, latencies, bytes_per_vector)
+    client.delete_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency for vector search configurations")
+    parser.add_argument("--vectors", type=int, default=20000, help="Number of synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--collection", help="Benchmark the embeddings of an existing Chroma collection")
+    parser.add_argument("--persist-dir", default="data/vector_store")
+    parser.add_argument("--skip-hnsw", action="store_true", help="Only benchmark the quantized store")
+    args = parser.parse_args()
+
+    if args.collection:
+        vectors = collection_vectors(args.persist_dir, args.collection)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim)
+
+    rng = np.random.default_rng(1)
+    queries = normalize(vectors[rng.integers(0, len(vectors), size=args.queries)]
+                        + 0.1 * rng.normal(size=(args.queries, vectors.shape[1])))
+    truth = exact_top_k(vectors, queries, args.k)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    for dtype in ("float16", "int8"):
+        for candidates in (args.k, 2 * args.k, 5 * args.k, 10 * args.k):
+            bench_quantized(vectors, queries, truth, args.k, dtype, candidates)
+
+    if args.skip_hnsw:
+        return
+    try:
+        import chromadb  # noqa: F401
+    except ImportError:
+        print("chromadb is not installed; skipping HNSW configurations")
+        return
+    for m in (8, 16, 32):
+        for search_ef in (10, 50, 100):
+            bench_hnsw(vectors, queries, truth, args.k, m, 100, search_ef)
+
+
+if __name__ == "__main__":
+    main()
@@ -41,11 +41,35 @@ Based on the Risk Factors section of the SEC filings for {ticker}, provide a str
 Risk Factor Text:
 {risk_factors}
 
+Changes Since the Previous Filing:
+{risk_changes}
+
 Your assessment should:
 1. Identify the 3-5 most significant risks that could materially impact the business
 2. Classify each risk (operational, financial, regulatory, competitive, etc.)
 3. Assess the potential severity and likelihood of each risk
-4. Note any changes in risk profile compared to previous filings
+4. Note any changes in risk profile compared to previous filings, using the changes listed above
 
 Present your analysis in a clear, structured format that would help investors understand the risk landscape.
 """
+
+CHAT_PROMPT = """
+You are a financial analyst answering follow-up questions about {ticker}'s SEC filings.
+Answer from the filing excerpts and metrics below; say so if they do not contain the answer.
+
+Key Metrics:
+{financial_metrics}
+
+Earlier in this conversation:
+{conversation_summary}
+
+Recent exchanges:
+{recent_turns}
+
+Filing Excerpts:
+{context}
+
+Question: {question}
+
+Answer concisely, citing the filing section an answer comes from.
+"""
@@ -1,13 +1,15 @@
 # API credentials
 import os
+from dataclasses import dataclass, field, asdict, replace
 from pathlib import Path
+from typing import Tuple
 import logging
 import logging.config
 
 # Base directories
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
-LOG_DIR = BASE_DIR / "logs"
+LOG_DIR = Path(os.environ.get("LOG_DIR", BASE_DIR / "logs"))
 
 # Create necessary directories
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -66,8 +68,145 @@ SEC_RATE_LIMIT_SLEEP = 0.1  # Time to sleep between SEC API calls in seconds
 # LLM settings
 LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "ollama")
 LLM_MODEL = os.environ.get("LLM_MODEL", "mistral")
+# Small local model for extraction, classification and query rewriting; "" sends everything to LLM_MODEL
+LLM_SMALL_MODEL = os.environ.get("LLM_SMALL_MODEL", "phi3")
+# Ask the LLM for metrics a filing's tables do not yield (one cached request per filing)
+LLM_EXTRACTION = os.environ.get("LLM_EXTRACTION", "false").lower() in ("1", "true", "yes")
+
+# Embedding backend: "sentence-transformers" (PyTorch) or "onnx" (int8 ONNX Runtime, no PyTorch import)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "sentence-transformers")
+
+# Cross-company vector index: number of hash shards (0 disables it; see models/shard_router.py)
+VECTOR_SHARDS = int(os.environ.get("VECTOR_SHARDS", 0))
+VECTOR_SHARD_MEMORY_MB = int(os.environ.get("VECTOR_SHARD_MEMORY_MB", 256))  # Loaded shard codes kept in memory
+
+# Per-ticker vector index: "int8" or "float16" keeps quantized vectors (models/vector_store.py) instead of
+# float32 vectors in Chroma's HNSW index; RERANK_CANDIDATES are then re-scored exactly
+VECTOR_QUANTIZATION = os.environ.get("VECTOR_QUANTIZATION", "")
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", 50))
+# HNSW parameters for new Chroma collections; 0 keeps Chroma's default
+HNSW_M = int(os.environ.get("HNSW_M", 0))
+HNSW_CONSTRUCTION_EF = int(os.environ.get("HNSW_CONSTRUCTION_EF", 0))
+HNSW_SEARCH_EF = int(os.environ.get("HNSW_SEARCH_EF", 0))
+# Cross-encoder that re-ranks the top RERANK_TOP_N search results (models/reranker.py); "" disables it
+RERANKER_MODEL = os.environ.get("RERANKER_MODEL", "")
+RERANK_TOP_N = int(os.environ.get("RERANK_TOP_N", 20))
 
 # Analysis settings
-DEFAULT_YEARS_HISTORY = 5
-MAX_DOCUMENTS_TO_PROCESS = 10
-CACHE_ENABLED = True
+DEFAULT_YEARS_HISTORY = int(os.environ.get("YEARS_HISTORY", 5))
+MAX_DOCUMENTS_TO_PROCESS = int(os.environ.get("MAX_DOCUMENTS_TO_PROCESS", 10))
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "disk")  # "disk" (shared across processes) or "memory"
+FILING_FORMS = tuple(f.strip() for f in os.environ.get("FILING_FORMS", "10-K,10-Q").split(",") if f.strip())
+
+# Throughput settings
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))  # Tickers processed at once by the UI and API
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", 1))  # Filings parsed at once
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))  # Chunks per encoder call
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", 3))  # Narrative requests in flight
+LLM_FAST_CONCURRENCY = int(os.environ.get("LLM_FAST_CONCURRENCY", 4))  # Small-model requests in flight
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 120))
+# Pipeline stages run per ticker, in order (see agents/stages.py)
+PIPELINE_STAGES = tuple(s.strip() for s in os.environ.get(
+    "PIPELINE_STAGES", "retrieve,parse,analyze,diff,index").split(",") if s.strip())
+
+# Precompute settings (see agents/scheduler.py)
+WATCHLIST = [t.strip().upper() for t in os.environ.get("WATCHLIST", "AAPL,MSFT,GOOGL,AMZN").split(",") if t.strip()]
+PRECOMPUTE_INTERVAL = int(os.environ.get("PRECOMPUTE_INTERVAL", 900))  # Seconds between EDGAR polls
+
+
+# Typed pipeline settings, one section per stage. SECAnalysisOrchestrator reads them and
+# hands each section to the component that runs the stage; defaults are the values above.
+
+@dataclass(frozen=True)
+class RetrievalSettings:
+    """SECRetriever: which filings are fetched for a ticker"""
+    years: int = DEFAULT_YEARS_HISTORY
+    max_filings: int = MAX_DOCUMENTS_TO_PROCESS
+    forms: Tuple[str, ...] = FILING_FORMS
+    use_archive: bool = True
+
+
+@dataclass(frozen=True)
+class ParseSettings:
+    """FilingParser: filings parsed at once, and the pause between filings when parsing one at a time"""
+    workers: int = PARSE_WORKERS
+    throttle: float = 0.1
+
+
+@dataclass(frozen=True)
+class EmbeddingSettings:
+    """EmbeddingManager: encoder, chunking and the optional cross-company index"""
+    model: str = "all-MiniLM-L6-v2"
+    backend: str = EMBEDDING_BACKEND
+    batch_size: int = EMBEDDING_BATCH_SIZE
+    chunk_size: int = 1500
+    chunk_overlap: int = 200
+    shards: int = VECTOR_SHARDS
+    shard_memory_mb: int = VECTOR_SHARD_MEMORY_MB
+    quantization: str = VECTOR_QUANTIZATION
+    rerank_candidates: int = RERANK_CANDIDATES
+    hnsw_m: int = HNSW_M
+    hnsw_construction_ef: int = HNSW_CONSTRUCTION_EF
+    hnsw_search_ef: int = HNSW_SEARCH_EF
+    reranker: str = RERANKER_MODEL
+    rerank_top_n: int = RERANK_TOP_N
+
+    def __post_init__(self):
+        if not 0 <= self.chunk_overlap < self.chunk_size:
+            raise ValueError(f"chunk_overlap must be at least 0 and below chunk_size "
+                             f"(got {self.chunk_overlap} and {self.chunk_size})")
+
+    def hnsw_params(self):
+        """The HNSW parameters that are set, as EmbeddingManager takes them"""
+        params = {"M": self.hnsw_m, "construction_ef": self.hnsw_construction_ef, "search_ef": self.hnsw_search_ef}
+        return {key: value for key, value in params.items() if value}
+
+
+@dataclass(frozen=True)
+class LLMSettings:
+    """LLM router: models, per-route concurrency and timeout"""
+    provider: str = LLM_PROVIDER
+    model: str = LLM_MODEL
+    small_model: str = LLM_SMALL_MODEL
+    narrative_concurrency: int = LLM_CONCURRENCY
+    fast_concurrency: int = LLM_FAST_CONCURRENCY
+    timeout: float = LLM_TIMEOUT
+    extraction: bool = LLM_EXTRACTION
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    """Result cache"""
+    enabled: bool = CACHE_ENABLED
+    backend: str = CACHE_BACKEND
+    dir: str = "data/processed/results"
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    """Every tunable of the analysis pipeline, including which stages run"""
+    retrieval: RetrievalSettings = field(default_factory=RetrievalSettings)
+    parse: ParseSettings = field(default_factory=ParseSettings)
+    embedding: EmbeddingSettings = field(default_factory=EmbeddingSettings)
+    llm: LLMSettings = field(default_factory=LLMSettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    stages: Tuple[str, ...] = PIPELINE_STAGES
+
+    def override(self, **sections):
+        """
+        Copy with some values replaced, e.g. override(llm={"model": "llama3"}, stages=["retrieve", "parse"]).
+
+        None values are ignored, so optional arguments can be passed straight through.
+        """
+        changes = {}
+        for name, values in sections.items():
+            if isinstance(values, dict):
+                values = {key: value for key, value in values.items() if value is not None}
+                changes[name] = replace(getattr(self, name), **values)
+            elif values is not None:
+                changes[name] = tuple(values) if name == "stages" else values
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return asdict(self)
@@ -1,82 +1,383 @@
 import chromadb
 import os
+import re
+import hashlib
 import numpy as np
 import logging
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from models.lexical_index import BM25Index, reciprocal_rank_fusion
+from models.vector_store import QuantizedVectorStore
+
+# Chroma collection metadata keys for the HNSW index parameters
+HNSW_PARAM_KEYS = {
+    "M": "hnsw:M",
+    "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef",
+}
+
+# Embedding backends: PyTorch via sentence-transformers, or int8 ONNX Runtime (models/onnx_embeddings.py)
+EMBEDDING_BACKENDS = ("sentence-transformers", "onnx")
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingManager:
     """Manage document embeddings for retrieval"""
-    
-    def __init__(self, model_name="all-MiniLM-L6-v2", persist_dir="data/vector_store"):
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", persist_dir="data/vector_store",
+                 chunk_size=1500, chunk_overlap=200, quantization=None, hnsw_params=None,
+                 rerank_candidates=50, reranker=None, query_cache_size=256, embedding_model=None,
+                 shard_router=None, backend="sentence-transformers", batch_size=32):
+        """
+        Args:
+            quantization (str): None to keep float32 vectors in Chroma's HNSW index, or
+                "int8"/"float16" to keep quantized vectors in a QuantizedVectorStore and
+                re-rank the top rerank_candidates exactly.
+            hnsw_params (dict): Chroma HNSW settings for new collections
+                (M, construction_ef, search_ef).
+            reranker (CrossEncoderReranker): Optional second stage applied to search results.
+            query_cache_size (int): Query embeddings kept for repeated and follow-up searches.
+            embedding_model: Encoder to use instead of loading model_name (anything with
+                encode() and get_sentence_embedding_dimension(), e.g. a ReplayEmbeddingModel).
+            shard_router (ShardRouter): Optional cross-company index that every indexed
+                filing is also added to, searched with search_companies().
+            backend (str): "sentence-transformers", or "onnx" to run model_name with ONNX
+                Runtime (int8) and avoid importing PyTorch.
+            batch_size (int): Chunks per encoder forward pass when indexing.
+        """
+        self.model_name = model_name
         self.persist_dir = persist_dir
-        os.makedirs(self.persist_dir, exist_ok=True)
-        
-        # Initialize embedding model
-        try:
-            self.embedding_model = SentenceTransformer(model_name)
-        except Exception as e:
-            logger.error(f"Error loading embedding model: {e}")
-            raise
-        
+        self.lexical_dir = os.path.join(self.persist_dir, "lexical")
+        self.quantized_dir = os.path.join(self.persist_dir, "quantized")
+        os.makedirs(self.lexical_dir, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.quantization = quantization
+        self.hnsw_params = hnsw_params or {}
+        self.rerank_candidates = rerank_candidates
+        self.reranker = reranker
+        self.shard_router = shard_router
+        self.backend = backend
+        self.batch_size = batch_size
+
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        if not 0 <= chunk_overlap < chunk_size:
+            # _chunk_text advances chunk_size - chunk_overlap characters per chunk
+            raise ValueError(f"chunk_overlap must be at least 0 and below chunk_size "
+                             f"(got {chunk_overlap} and {chunk_size})")
+        unknown = set(self.hnsw_params) - set(HNSW_PARAM_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown HNSW parameters: {sorted(unknown)}")
+
+        # Embedding model, loaded on first use
+        self._embedding_model = embedding_model
+
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(path=self.persist_dir)
-    
-    def embed_text(self, text: str) -> np.ndarray:
-        """Generate embeddings for a single text"""
+
+        # Lexical (BM25) indexes kept alongside each Chroma collection
+        self.lexical_indexes = {}
+        self.quantized_stores = {}
+        self.collections = {}
+
+        # Recent query embeddings, most recently used last
+        self.query_cache_size = query_cache_size
+        self._query_embeddings = OrderedDict()
+
+    @property
+    def embedding_model(self):
+        """Sentence encoder, loaded on first use so that constructing the manager stays cheap"""
+        if self._embedding_model is None:
+            try:
+                self._embedding_model = self.load_model()
+            except Exception as e:
+                logger.error(f"Error loading embedding model: {e}")
+                raise
+        return self._embedding_model
+
+    def load_model(self):
+        """Load model_name with the configured backend (imported here so only that backend is loaded)"""
+        if self.backend == "onnx":
+            from models.onnx_embeddings import OnnxEmbedder
+            return OnnxEmbedder(self.model_name)
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+    def embed_text(self, text: str) -> Optional[np.ndarray]:
+        """Generate embeddings for a single text; None if there is nothing to embed"""
         if not text:
-            return np.zeros(384)  # Default embedding size for all-MiniLM-L6-v2
-        
+            return None
+
         try:
             return self.embedding_model.encode(text)
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
-            return np.zeros(384)
-    
-    def index_documents(self, documents: List[Dict[str, Any]], collection_name: str) -> bool:
-        """Index parsed documents in ChromaDB"""
+            return None
+
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Embedding for a search query, reused when the same query is searched again"""
+        key = " ".join(query.split())
+        cached = self._query_embeddings.get(key)
+        if cached is not None:
+            self._query_embeddings.move_to_end(key)
+            return cached
+
+        embedding = self.embed_text(key)
+        if embedding is not None and self.query_cache_size:
+            self._query_embeddings[key] = embedding
+            if len(self._query_embeddings) > self.query_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def load_collection(self, collection_name: str) -> bool:
+        """Open a collection and its lexical index ahead of searching; False if it was never indexed"""
         try:
-            # Get or create collection
-            try:
-                collection = self.client.get_collection(name=collection_name)
-            except:
-                collection = self.client.create_collection(name=collection_name)
-            
-            # Prepare documents for indexing
-            doc_ids = []
-            doc_texts = []
-            doc_metadata = []
-            
-            for i, doc in enumerate(documents):
-                # Combine sections into single text
-                sections = doc.get("sections", {})
-                full_text = "\n\n".join([sections.get(section, "") for section in sections.keys()])
-                
+            self._get_vector_collection(collection_name)
+        except Exception as e:
+            logger.error(f"Error loading collection {collection_name}: {e}")
+            return False
+        self.get_lexical_index(collection_name)
+        return True
+
+    def index_documents(self, documents: List[Dict[str, Any]], collection_name: str,
+                        ticker: Optional[str] = None) -> bool:
+        """
+        Index parsed documents in ChromaDB and the lexical index, one filing at a time.
+
+        With a shard router, each filing is also added to the ticker's shard.
+        """
+        try:
+            collection = self._get_vector_collection(collection_name, create=True)
+            lexical = self.get_lexical_index(collection_name)
+
+            indexed = False
+            for doc in documents:
+                doc_ids, doc_texts, doc_metadata = self._chunk_document(doc)
+
                 # Skip if no meaningful text
-                if len(full_text.strip()) < 100:
+                if not doc_ids:
                     continue
-                
-                doc_ids.append(f"doc_{i}")
-                doc_texts.append(full_text)
-                doc_metadata.append({
-                    "file_path": doc.get("metadata", {}).get("file_path", ""),
-                    "doc_type": doc.get("metadata", {}).get("doc_type", "Unknown"),
-                    "filing_date": doc.get("metadata", {}).get("filing_date", "Unknown")
-                })
-            
-            # Add documents to collection
-            if doc_ids:
-                collection.add(
-                    ids=doc_ids,
-                    documents=doc_texts,
-                    metadatas=doc_metadata
-                )
-                return True
-            
-            return False
-        
+
+                # Replace any chunks left over from a previous run of the same filing
+                file_path = doc_metadata[0]["file_path"]
+                collection.delete(where={"file_path": file_path})
+                lexical.remove_group(file_path)
+
+                try:
+                    embeddings = self.embedding_model.encode(doc_texts, batch_size=self.batch_size)
+                except Exception as e:
+                    # Never index placeholder vectors for chunks that failed to embed
+                    logger.error(f"Error generating embeddings for {file_path}: {e}")
+                    continue
+
+                if self.quantization:
+                    collection.add(doc_ids, embeddings, doc_texts, doc_metadata)
+                else:
+                    collection.add(
+                        ids=doc_ids,
+                        embeddings=embeddings.tolist(),
+                        documents=doc_texts,
+                        metadatas=doc_metadata
+                    )
+                lexical.add_documents(doc_ids, doc_texts, doc_metadata, group=file_path)
+                indexed = True
+
+                filing_ticker = ticker or doc.get("metadata", {}).get("ticker")
+                if self.shard_router is not None and filing_ticker:
+                    self.shard_router.add_filing(filing_ticker, file_path, doc_ids, embeddings, doc_texts,
+                                                 doc_metadata, filing_date=doc_metadata[0]["filing_date"])
+
+            if indexed:
+                lexical.save()
+                if self.quantization:
+                    collection.save()
+                if self.shard_router is not None:
+                    self.shard_router.save()
+            return indexed
+
         except Exception as e:
             logger.error(f"Error indexing documents: {e}")
             return False
+
+    def get_lexical_index(self, collection_name: str) -> BM25Index:
+        """Return the (cached) BM25 index that mirrors a Chroma collection"""
+        if collection_name not in self.lexical_indexes:
+            path = os.path.join(self.lexical_dir, f"{collection_name}.bm25")
+            self.lexical_indexes[collection_name] = BM25Index(path=path)
+        return self.lexical_indexes[collection_name]
+
+    def search(self, query: str, collection_name: str, k: int = 5,
+               where: Optional[Dict[str, Any]] = None, rerank: bool = True) -> List[Dict[str, Any]]:
+        """Dense vector search over a collection"""
+        embedding = self.embed_query(query)
+        if embedding is None:
+            return []
+
+        n_results = self._candidate_count(k, rerank)
+        try:
+            collection = self._get_vector_collection(collection_name)
+            if self.quantization:
+                results = collection.query(embedding, k=n_results, where=where)
+            else:
+                response = collection.query(
+                    query_embeddings=[embedding.tolist()],
+                    n_results=n_results,
+                    where=where
+                )
+                results = [
+                    {"id": doc_id, "document": text, "metadata": metadata, "score": 1.0 - distance}
+                    for doc_id, text, metadata, distance in zip(
+                        response["ids"][0], response["documents"][0],
+                        response["metadatas"][0], response["distances"][0]
+                    )
+                ]
+        except Exception as e:
+            logger.error(f"Error searching {collection_name}: {e}")
+            return []
+
+        return self._rerank(query, results, k, rerank)
+
+    def search_companies(self, query: str, k: int = 10, tickers: Optional[List[str]] = None,
+                         where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Dense search across every company in the shard router (or only tickers)"""
+        if self.shard_router is None:
+            logger.warning("Cross-company search needs a shard router")
+            return []
+        embedding = self.embed_query(query)
+        if embedding is None:
+            return []
+        return self.shard_router.search(embedding, k=k, tickers=tickers, where=where)
+
+    def lexical_search(self, query: str, collection_name: str, k: int = 5,
+                       where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """BM25 keyword search over a collection"""
+        hits = self.get_lexical_index(collection_name).search(query, k=k, where=where)
+        return self._fetch(collection_name, [doc_id for doc_id, _ in hits], [score for _, score in hits])
+
+    def hybrid_search(self, query: str, collection_name: str, k: int = 5, candidates: int = 50,
+                      where: Optional[Dict[str, Any]] = None, rrf_k: int = 60,
+                      rerank: bool = True) -> List[Dict[str, Any]]:
+        """Fuse dense and BM25 rankings with reciprocal rank fusion"""
+        dense = self.search(query, collection_name, k=candidates, where=where, rerank=False)
+        lexical = self.get_lexical_index(collection_name).search(query, k=candidates, where=where)
+
+        fused = reciprocal_rank_fusion(
+            [[hit["id"] for hit in dense], [doc_id for doc_id, _ in lexical]],
+            k=rrf_k,
+            limit=self._candidate_count(k, rerank)
+        )
+
+        known = {hit["id"]: hit for hit in dense}
+        missing = [doc_id for doc_id, _ in fused if doc_id not in known]
+        for hit in self._fetch(collection_name, missing):
+            known[hit["id"]] = hit
+
+        results = []
+        for doc_id, score in fused:
+            if doc_id in known:
+                results.append({**known[doc_id], "score": score})
+        return self._rerank(query, results, k, rerank)
+
+    def _candidate_count(self, k: int, rerank: bool) -> int:
+        """How many first-stage results to fetch so the re-ranker sees its full top-N"""
+        if rerank and self.reranker is not None:
+            return max(k, self.reranker.top_n)
+        return k
+
+    def _rerank(self, query: str, results: List[Dict[str, Any]], k: int, rerank: bool) -> List[Dict[str, Any]]:
+        if rerank and self.reranker is not None:
+            return self.reranker.rerank(query, results, k=k)
+        return results[:k]
+
+    def _fetch(self, collection_name: str, ids: List[str], scores: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Fetch documents and metadata for ids, preserving their order"""
+        if not ids:
+            return []
+        try:
+            response = self._get_vector_collection(collection_name).get(ids=ids)
+        except Exception as e:
+            logger.error(f"Error fetching documents from {collection_name}: {e}")
+            return []
+
+        found = {
+            doc_id: (text, metadata)
+            for doc_id, text, metadata in zip(response["ids"], response["documents"], response["metadatas"])
+        }
+        scores = scores or [None] * len(ids)
+        return [
+            {"id": doc_id, "document": found[doc_id][0], "metadata": found[doc_id][1], "score": score}
+            for doc_id, score in zip(ids, scores) if doc_id in found
+        ]
+
+    def _get_vector_collection(self, collection_name: str, create: bool = False):
+        """Return the Chroma collection, or the quantized store when quantization is enabled"""
+        if self.quantization:
+            if collection_name not in self.quantized_stores:
+                dim = self.embedding_model.get_sentence_embedding_dimension()
+                self.quantized_stores[collection_name] = QuantizedVectorStore(
+                    os.path.join(self.quantized_dir, collection_name),
+                    dim=dim,
+                    dtype=self.quantization,
+                    rerank_candidates=self.rerank_candidates
+                )
+            return self.quantized_stores[collection_name]
+
+        # Collection handles are kept so repeated searches skip the client lookup
+        if collection_name in self.collections:
+            return self.collections[collection_name]
+
+        if not create:
+            collection = self.client.get_collection(name=collection_name)
+        else:
+            metadata = {"hnsw:space": "cosine"}
+            metadata.update({HNSW_PARAM_KEYS[key]: value for key, value in self.hnsw_params.items()})
+            collection = self.client.get_or_create_collection(name=collection_name, metadata=metadata)
+        self.collections[collection_name] = collection
+        return collection
+
+    def _chunk_document(self, doc: Dict[str, Any]):
+        """Split a parsed filing into overlapping section chunks with stable ids"""
+        metadata = doc.get("metadata", {})
+        file_path = metadata.get("file_path", "")
+        filing_id = hashlib.sha1(file_path.encode("utf-8")).hexdigest()[:12]
+
+        doc_ids, doc_texts, doc_metadata = [], [], []
+        for section, text in doc.get("sections", {}).items():
+            # Skip if no meaningful text
+            if not text or len(text.strip()) < 100:
+                continue
+
+            for n, chunk in enumerate(self._chunk_text(text)):
+                doc_ids.append(f"{filing_id}_{section}_{n}")
+                doc_texts.append(chunk)
+                doc_metadata.append({
+                    "file_path": file_path,
+                    "section": section,
+                    "chunk": n,
+                    "doc_type": metadata.get("doc_type", "Unknown"),
+                    "filing_date": metadata.get("filing_date", "Unknown")
+                })
+
+        return doc_ids, doc_texts, doc_metadata
+
+    def _chunk_text(self, text: str) -> List[str]:
+        """Split text into chunks of about chunk_size characters on sentence boundaries"""
+        sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+        chunks = []
+        current = ""
+
+        for sentence in sentences:
+            if current and len(current) + len(sentence) + 1 > self.chunk_size:
+                chunks.append(current)
+                # Carry the tail of the previous chunk over for context
+                current = current[-self.chunk_overlap:] if self.chunk_overlap else ""
+            current = f"{current} {sentence}".strip()
+            # Hard-split runs of text without sentence breaks
+            while len(current) > self.chunk_size:
+                chunks.append(current[:self.chunk_size])
+                current = current[self.chunk_size - self.chunk_overlap:]
+
+        if current:
+            chunks.append(current)
+        return chunks
@@ -0,0 +1,286 @@
+import os
+import re
+import math
+import heapq
+import pickle
+import zlib
+import logging
+from array import array
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keeps tokens like "10-k", "r&d" and "3.5" intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.&'-][a-z0-9]+)*")
+
+INDEX_FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for both indexing and querying"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def _encode_varints(values, out: bytearray):
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _decode_varints(data: bytes):
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def encode_postings(postings: Dict[int, array]) -> bytes:
+    """Delta + varint encode {doc_num: positions} as [doc_gap, n, pos_gaps...]*"""
+    out = bytearray()
+    previous_doc = 0
+    for doc_num in sorted(postings):
+        positions = postings[doc_num]
+        _encode_varints((doc_num - previous_doc, len(positions)), out)
+        previous_pos = 0
+        for pos in positions:
+            _encode_varints((pos - previous_pos,), out)
+            previous_pos = pos
+        previous_doc = doc_num
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> Dict[int, array]:
+    """Inverse of encode_postings"""
+    postings = {}
+    values = _decode_varints(data)
+    doc_num = 0
+    for doc_gap in values:
+        doc_num += doc_gap
+        count = next(values)
+        positions = array("I")
+        pos = 0
+        for _ in range(count):
+            pos += next(values)
+            positions.append(pos)
+        postings[doc_num] = positions
+    return postings
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists: score(d) = sum over rankings of 1 / (k + rank)"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return fused[:limit] if limit is not None else fused
+
+
+class BM25Index:
+    """
+    Lexical inverted index with positional postings and BM25 scoring.
+
+    Postings are kept varint-encoded and only decoded for the terms a query touches.
+    Documents are grouped (one group per filing) so a filing can be replaced
+    incrementally without rebuilding the index.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75, phrase_boost: float = 1.0):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.phrase_boost = phrase_boost
+
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_lengths = array("I")
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+        self.id_to_num: Dict[str, int] = {}
+        self.groups: Dict[str, List[int]] = {}
+        self.total_length = 0
+
+        self._encoded: Dict[str, bytes] = {}
+        self._decoded: Dict[str, Dict[int, array]] = {}
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.id_to_num)
+
+    def add_documents(self, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+                      group: Optional[str] = None):
+        """Add documents, replacing any existing documents with the same ids"""
+        metadatas = metadatas or [{} for _ in ids]
+        for doc_id, text, metadata in zip(ids, texts, metadatas):
+            if doc_id in self.id_to_num:
+                self._delete(self.id_to_num[doc_id])
+
+            doc_num = len(self.doc_ids)
+            tokens = tokenize(text)
+            positions = defaultdict(lambda: array("I"))
+            for pos, token in enumerate(tokens):
+                positions[token].append(pos)
+            for term, term_positions in positions.items():
+                self._postings(term)[doc_num] = term_positions
+
+            self.doc_ids.append(doc_id)
+            self.doc_lengths.append(len(tokens))
+            self.metadatas.append(metadata)
+            self.id_to_num[doc_id] = doc_num
+            self.total_length += len(tokens)
+            if group is not None:
+                self.groups.setdefault(group, []).append(doc_num)
+
+    def remove_group(self, group: str) -> int:
+        """Remove every document of a group (e.g. a filing); returns the number removed"""
+        removed = 0
+        for doc_num in self.groups.pop(group, []):
+            if self.doc_ids[doc_num] is not None:
+                self._delete(doc_num)
+                removed += 1
+        return removed
+
+    def search(self, query: str, k: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Return the top-k (doc_id, score) pairs for a query"""
+        terms = tokenize(query)
+        if not terms or not self.id_to_num:
+            return []
+
+        n_docs = len(self.id_to_num)
+        avg_length = self.total_length / n_docs
+        scores = defaultdict(float)
+        term_postings = {}
+
+        for term, query_tf in Counter(terms).items():
+            postings = self._postings(term, create=False)
+            if postings:
+                postings = {d: p for d, p in postings.items() if self.doc_ids[d] is not None}
+            if not postings:
+                continue
+            term_postings[term] = postings
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_num, positions in postings.items():
+                tf = len(positions)
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_num] / avg_length)
+                scores[doc_num] += query_tf * idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Exact phrase matches get a bonus so "greater china net sales" beats scattered terms
+        if self.phrase_boost and len(terms) > 1 and len(term_postings) == len(set(terms)):
+            for doc_num in self._phrase_matches(terms, term_postings):
+                scores[doc_num] *= 1 + self.phrase_boost
+
+        if where:
+            scores = {d: s for d, s in scores.items() if self._matches(self.metadatas[d], where)}
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc_num], score) for doc_num, score in top]
+
+    def compact(self):
+        """Drop deleted documents from the postings and renumber the remaining ones"""
+        live = [num for num, doc_id in enumerate(self.doc_ids) if doc_id is not None]
+        remap = {old: new for new, old in enumerate(live)}
+
+        for term in list(self._encoded.keys() | self._decoded.keys()):
+            postings = {remap[d]: p for d, p in self._postings(term).items() if d in remap}
+            self._encoded.pop(term, None)
+            if postings:
+                self._decoded[term] = postings
+            else:
+                self._decoded.pop(term, None)
+
+        self.doc_ids = [self.doc_ids[num] for num in live]
+        self.doc_lengths = array("I", (self.doc_lengths[num] for num in live))
+        self.metadatas = [self.metadatas[num] for num in live]
+        self.id_to_num = {doc_id: num for num, doc_id in enumerate(self.doc_ids)}
+        self.groups = {g: [remap[d] for d in nums if d in remap] for g, nums in self.groups.items()}
+
+    def save(self, path: Optional[str] = None):
+        """Persist the index as a zlib-compressed pickle of varint-encoded postings"""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for saving the lexical index")
+
+        # Tombstones make up most of the waste after repeated re-indexing
+        if len(self.doc_ids) > 2 * max(len(self.id_to_num), 1):
+            self.compact()
+
+        for term, postings in self._decoded.items():
+            self._encoded[term] = encode_postings(postings)
+        self._decoded.clear()
+
+        state = {
+            "version": INDEX_FORMAT_VERSION,
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "metadatas": self.metadatas,
+            "groups": self.groups,
+            "postings": self._encoded,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 6))
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None):
+        """Load a persisted index"""
+        path = path or self.path
+        with open(path, "rb") as f:
+            state = pickle.loads(zlib.decompress(f.read()))
+
+        if state.get("version") != INDEX_FORMAT_VERSION:
+            logger.warning(f"Ignoring lexical index {path} with unsupported format {state.get('version')}")
+            return
+
+        self.doc_ids = state["doc_ids"]
+        self.doc_lengths = state["doc_lengths"]
+        self.metadatas = state["metadatas"]
+        self.groups = state["groups"]
+        self._encoded = state["postings"]
+        self._decoded = {}
+        self.id_to_num = {doc_id: num for num, doc_id in enumerate(self.doc_ids) if doc_id is not None}
+        self.total_length = sum(self.doc_lengths[num] for num in self.id_to_num.values())
+
+    def _postings(self, term: str, create: bool = True) -> Optional[Dict[int, array]]:
+        postings = self._decoded.get(term)
+        if postings is None:
+            encoded = self._encoded.pop(term, None)
+            if encoded is not None:
+                postings = decode_postings(encoded)
+            elif create:
+                postings = {}
+            else:
+                return None
+            self._decoded[term] = postings
+        return postings
+
+    def _delete(self, doc_num: int):
+        """Tombstone a document; its postings are skipped until the next compaction"""
+        doc_id = self.doc_ids[doc_num]
+        self.doc_ids[doc_num] = None
+        self.metadatas[doc_num] = None
+        self.id_to_num.pop(doc_id, None)
+        self.total_length -= self.doc_lengths[doc_num]
+
+    def _phrase_matches(self, terms: List[str], term_postings: Dict[str, Dict[int, array]]):
+        """Documents containing the query terms as a contiguous phrase"""
+        candidates = set.intersection(*(set(term_postings[t]) for t in terms))
+        for doc_num in candidates:
+            starts = set(term_postings[terms[0]][doc_num])
+            for offset, term in enumerate(terms[1:], start=1):
+                starts &= {pos - offset for pos in term_postings[term][doc_num]}
+                if not starts:
+                    break
+            if starts:
+                yield doc_num
+
+    def _matches(self, metadata: Optional[Dict[str, Any]], where: Dict[str, Any]) -> bool:
+        return metadata is not None and all(metadata.get(key) == value for key, value in where.items())
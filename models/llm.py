@@ -1,20 +1,26 @@
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import os
 import requests
 import json
+import time
+import threading
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
 class LLMManager:
     """Manage interactions with LLMs"""
     
-    def __init__(self, provider="ollama", model_name="mistral"):
+    def __init__(self, provider="ollama", model_name="mistral", stub_latency=0.0):
         self.provider = provider.lower()
         self.model_name = model_name
         
         # Set up provider-specific settings
-        if self.provider == "ollama":
+        if self.provider == "stub":
+            # Canned responses for load tests and offline runs
+            self.stub_latency = stub_latency
+        elif self.provider == "ollama":
             self.api_base = "http://localhost:11434/api"
         elif self.provider == "openai":
             self.api_base = "https://api.openai.com/v1"
@@ -22,39 +28,75 @@ class LLMManager:
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
     
-    def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 800) -> str:
-        """Generate text with the LLM"""
-        if self.provider == "ollama":
-            return self._generate_ollama(prompt, temperature, max_tokens)
+    def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 800,
+                 timeout: Optional[float] = None, task: Optional[str] = None) -> str:
+        """Generate text with the LLM (task is accepted so LLMRouter can stand in for this class)"""
+        return self.complete(prompt, temperature, max_tokens, timeout)["text"]
+    
+    def complete(self, prompt: str, temperature: float = 0.7, max_tokens: int = 800,
+                 timeout: Optional[float] = None, task: Optional[str] = None,
+                 schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Generate text and report usage: {"text", "prompt_tokens", "completion_tokens"}.
+        
+        With a JSON schema the model is constrained to answer with a matching JSON object.
+        """
+        if self.provider == "stub":
+            return self._generate_stub(prompt, max_tokens, schema)
+        elif self.provider == "ollama":
+            return self._generate_ollama(prompt, temperature, max_tokens, timeout or 60, schema)
         elif self.provider == "openai":
-            return self._generate_openai(prompt, temperature, max_tokens)
+            return self._generate_openai(prompt, temperature, max_tokens, timeout or 30, schema)
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
     
-    def _generate_ollama(self, prompt: str, temperature: float, max_tokens: int) -> str:
+    def _generate_stub(self, prompt: str, max_tokens: int, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return a canned response after the configured latency"""
+        if self.stub_latency:
+            time.sleep(self.stub_latency)
+        if schema:
+            # An object with every property null satisfies the schemas used here
+            text = json.dumps({key: None for key in schema.get("properties", {})})
+            return _usage(text, len(prompt) // 4, len(text) // 4)
+        first_line = prompt.strip().splitlines()[0] if prompt.strip() else ""
+        text = f"[{self.model_name} stub] Response to: {first_line[:200]}"
+        return _usage(text, len(prompt) // 4, len(text) // 4)
+    
+    def _generate_ollama(self, prompt: str, temperature: float, max_tokens: int, timeout: float,
+                         schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate text using Ollama API"""
         try:
+            payload = {
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": False,
+                "options": {
+                    "temperature": temperature,
+                    "num_predict": max_tokens
+                }
+            }
+            if schema:
+                # Structured outputs: Ollama constrains decoding to the schema
+                payload["format"] = schema
+            
             response = requests.post(
                 f"{self.api_base}/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "temperature": temperature,
-                    "max_length": max_tokens
-                },
-                timeout=60
+                json=payload,
+                timeout=timeout
             )
             
             if response.status_code == 200:
-                return response.json().get("response", "")
+                data = response.json()
+                return _usage(data.get("response", ""), data.get("prompt_eval_count", 0), data.get("eval_count", 0))
             else:
                 logger.error(f"Ollama API error: {response.status_code} - {response.text}")
-                return ""
+                return _usage("")
         except Exception as e:
             logger.error(f"Error generating text with Ollama: {e}")
-            return ""
+            return _usage("")
     
-    def _generate_openai(self, prompt: str, temperature: float, max_tokens: int) -> str:
+    def _generate_openai(self, prompt: str, temperature: float, max_tokens: int, timeout: float,
+                         schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate text using OpenAI API"""
         try:
             headers = {
@@ -68,19 +110,242 @@ class LLMManager:
                 "temperature": temperature,
                 "max_tokens": max_tokens
             }
+            if schema:
+                payload["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {"name": "response", "schema": schema, "strict": True}
+                }
             
             response = requests.post(
                 f"{self.api_base}/chat/completions",
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=timeout
             )
             
             if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
+                data = response.json()
+                usage = data.get("usage", {})
+                return _usage(data["choices"][0]["message"]["content"],
+                              usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
             else:
                 logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
-                return ""
+                return _usage("")
         except Exception as e:
             logger.error(f"Error generating text with OpenAI: {e}")
-            return ""
+            return _usage("")
+
+
+def _usage(text: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> Dict[str, Any]:
+    return {"text": text or "", "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+
+# Routes: "narrative" is the large model; "fast" is a small local model for short structured tasks
+NARRATIVE_ROUTE = "narrative"
+FAST_ROUTE = "fast"
+
+# Which route serves each kind of call; unknown tasks go to the router's default route
+DEFAULT_TASK_ROUTES = {
+    "narrative": NARRATIVE_ROUTE,
+    "chat": NARRATIVE_ROUTE,
+    "query_rewrite": FAST_ROUTE,
+    "metric_disambiguation": FAST_ROUTE,
+    "section_classification": FAST_ROUTE,
+    "extraction": FAST_ROUTE,
+}
+
+
+class RouteStats:
+    """Rolling latency and throughput figures for one route"""
+    
+    def __init__(self, window: float = 60.0, samples: int = 512):
+        self.window = window
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.fallbacks = 0  # Calls this route served for another route that failed
+        self.in_flight = 0
+        self.latencies = deque(maxlen=samples)
+        self.completed = deque()  # (finish time, completion tokens) within the window
+    
+    def record(self, latency: float, tokens: int, ok: bool):
+        now = time.monotonic()
+        with self.lock:
+            self.calls += 1
+            if not ok:
+                self.failures += 1
+                return
+            self.latencies.append(latency)
+            self.completed.append((now, tokens))
+            self._expire(now)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            self._expire(time.monotonic())
+            latencies = sorted(self.latencies)
+            tokens = sum(t for _, t in self.completed)
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "fallbacks": self.fallbacks,
+                "in_flight": self.in_flight,
+                "p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+                "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+                "requests_per_min": round(len(self.completed) * 60.0 / self.window, 2),
+                "tokens_per_sec": round(tokens / self.window, 2),
+            }
+    
+    def _expire(self, now: float):
+        while self.completed and now - self.completed[0][0] > self.window:
+            self.completed.popleft()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class Route:
+    """One model behind a concurrency limit, with the routes to try if it fails"""
+    
+    def __init__(self, name: str, manager: LLMManager, max_concurrency: int = 2,
+                 timeout: Optional[float] = None, fallback: Optional[List[str]] = None):
+        self.name = name
+        self.manager = manager
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.fallback = list(fallback or [])
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.stats = RouteStats()
+    
+    def complete(self, prompt: str, temperature: float, max_tokens: int, timeout: Optional[float],
+                 schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run one call; an empty text means the route failed or was saturated for the whole timeout"""
+        timeout = timeout or self.timeout
+        started = time.monotonic()
+        if not self.semaphore.acquire(timeout=timeout or None):
+            logger.warning(f"LLM route {self.name} saturated; no slot within {timeout}s")
+            self.stats.record(0.0, 0, ok=False)
+            return _usage("")
+        
+        with self.stats.lock:
+            self.stats.in_flight += 1
+        try:
+            remaining = max(timeout - (time.monotonic() - started), 1.0) if timeout else None
+            extra = {"schema": schema} if schema else {}
+            result = self.manager.complete(prompt, temperature, max_tokens, remaining, **extra)
+        except Exception as e:
+            logger.error(f"LLM route {self.name} failed: {e}")
+            result = _usage("")
+        finally:
+            with self.stats.lock:
+                self.stats.in_flight -= 1
+            self.semaphore.release()
+        
+        self.stats.record(time.monotonic() - started, result.get("completion_tokens", 0), ok=bool(result["text"]))
+        return result
+
+
+class LLMRouter:
+    """
+    Send each task to the model suited to it.
+    
+    Short structured tasks (extraction, metric disambiguation, classification, query
+    rewriting) go to a small fast model; narrative and chat go to the large one. Each
+    route has its own concurrency limit and metrics, and a failed or empty call moves
+    down the route's fallback chain. The interface matches LLMManager, so a router can
+    be passed wherever a manager is expected; calls without a task use the default route.
+    """
+    
+    def __init__(self, routes: List[Route], task_routes: Optional[Dict[str, str]] = None,
+                 default_route: str = NARRATIVE_ROUTE):
+        self.routes = {route.name: route for route in routes}
+        self.task_routes = dict(DEFAULT_TASK_ROUTES if task_routes is None else task_routes)
+        self.default_route = default_route if default_route in self.routes else routes[0].name
+        
+        unknown = {name for route in routes for name in route.fallback} - set(self.routes)
+        if unknown:
+            raise ValueError(f"Unknown fallback routes: {sorted(unknown)}")
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Dict[str, Any]], task_routes: Optional[Dict[str, str]] = None,
+                    default_route: str = NARRATIVE_ROUTE) -> "LLMRouter":
+        """
+        Build a router from {route: {"provider", "model", "max_concurrency", "timeout", "fallback"}}.
+        """
+        routes = [
+            Route(
+                name,
+                LLMManager(provider=spec.get("provider", "ollama"), model_name=spec["model"],
+                           stub_latency=spec.get("stub_latency", 0.0)),
+                max_concurrency=spec.get("max_concurrency", 2),
+                timeout=spec.get("timeout"),
+                fallback=spec.get("fallback")
+            )
+            for name, spec in config.items()
+        ]
+        return cls(routes, task_routes, default_route)
+    
+    @property
+    def model_name(self) -> str:
+        return self.routes[self.default_route].manager.model_name
+    
+    def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 800,
+                 timeout: Optional[float] = None, task: Optional[str] = None) -> str:
+        """Generate text on the route for task"""
+        return self.complete(prompt, temperature, max_tokens, timeout, task)["text"]
+    
+    def complete(self, prompt: str, temperature: float = 0.7, max_tokens: int = 800,
+                 timeout: Optional[float] = None, task: Optional[str] = None,
+                 schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate text and report usage plus the route that answered ("route" is None if all failed)"""
+        chain = self.chain(self.task_routes.get(task, self.default_route))
+        for i, route in enumerate(chain):
+            result = route.complete(prompt, temperature, max_tokens, timeout, schema)
+            if result["text"]:
+                if i:
+                    with route.stats.lock:
+                        route.stats.fallbacks += 1
+                return {**result, "route": route.name}
+            if i + 1 < len(chain):
+                logger.warning(f"LLM route {route.name} returned nothing for {task or 'default'}; "
+                               f"falling back to {chain[i + 1].name}")
+        return {**_usage(""), "route": None}
+    
+    def chain(self, route_name: str) -> List[Route]:
+        """A route followed by its fallbacks, breadth first, each route at most once"""
+        order, queue = [], [route_name if route_name in self.routes else self.default_route]
+        while queue:
+            name = queue.pop(0)
+            if name in order:
+                continue
+            order.append(name)
+            queue.extend(self.routes[name].fallback)
+        return [self.routes[name] for name in order]
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-route metrics, plus the model and concurrency limit of each route"""
+        return {
+            name: {"model": route.manager.model_name, "max_concurrency": route.max_concurrency,
+                   **route.stats.snapshot()}
+            for name, route in self.routes.items()
+        }
+
+
+def default_router(provider: str = "ollama", model_name: str = "mistral", small_model: Optional[str] = None,
+                   narrative_concurrency: int = 3, fast_concurrency: int = 4, timeout: float = 120,
+                   fast_timeout: float = 20, stub_latency: float = 0.0) -> LLMRouter:
+    """
+    The standard two-route setup: model_name for narrative, small_model for short tasks
+    falling back to model_name. Without a small model every task uses model_name.
+    """
+    config = {
+        NARRATIVE_ROUTE: {"provider": provider, "model": model_name, "max_concurrency": narrative_concurrency,
+                          "timeout": timeout, "stub_latency": stub_latency},
+    }
+    if small_model and small_model != model_name:
+        config[FAST_ROUTE] = {"provider": provider, "model": small_model, "max_concurrency": fast_concurrency,
+                              "timeout": fast_timeout, "fallback": [NARRATIVE_ROUTE], "stub_latency": stub_latency}
+    task_routes = {task: route if route in config else NARRATIVE_ROUTE for task, route in DEFAULT_TASK_ROUTES.items()}
+    return LLMRouter.from_config(config, task_routes)
@@ -0,0 +1,154 @@
+import os
+import logging
+import threading
+import numpy as np
+from typing import List, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = "data/models/onnx"
+
+# Files of the sentence-transformers repos on the Hugging Face Hub
+ONNX_FILE = "onnx/model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def prepare_model(model_name: str, model_dir: str = DEFAULT_MODEL_DIR, quantize: bool = True):
+    """
+    Download a sentence-transformers model's ONNX export and fast tokenizer, and
+    quantize its weights to int8 (dynamic quantization) once.
+
+    Returns:
+        tuple: (model_path, tokenizer_path)
+    """
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    target = os.path.join(model_dir, repo_id.replace("/", "--"))
+    model_path = os.path.join(target, "model_int8.onnx" if quantize else ONNX_FILE)
+    tokenizer_path = os.path.join(target, TOKENIZER_FILE)
+    if os.path.exists(model_path) and os.path.exists(tokenizer_path):
+        return model_path, tokenizer_path
+
+    from huggingface_hub import hf_hub_download
+    os.makedirs(target, exist_ok=True)
+    fp32_path = hf_hub_download(repo_id, ONNX_FILE, local_dir=target)
+    hf_hub_download(repo_id, TOKENIZER_FILE, local_dir=target)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        logger.info(f"Quantizing {repo_id} to int8")
+        quantize_dynamic(fp32_path, model_path + ".tmp", weight_type=QuantType.QInt8)
+        os.replace(model_path + ".tmp", model_path)
+    return model_path, tokenizer_path
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token embeddings over real (unpadded) tokens, then L2-normalize"""
+    mask = attention_mask[..., None].astype(np.float32)
+    pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.clip(norms, 1e-12, None)
+
+
+class OnnxEmbedder:
+    """
+    Sentence embeddings from a MiniLM-style model run with ONNX Runtime.
+
+    Drop-in for SentenceTransformer where EmbeddingManager uses it (encode and
+    get_sentence_embedding_dimension) without importing PyTorch: the model is the
+    int8-quantized ONNX export, tokenized with the Rust fast tokenizer, mean-pooled
+    and normalized like the all-MiniLM-L6-v2 pipeline. Texts are batched by length
+    so short chunks are not padded to the longest one in the call.
+    """
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", model_dir=DEFAULT_MODEL_DIR, quantize=True,
+                 max_length=256, batch_size=32, threads=None, session=None, tokenizer=None):
+        """
+        Args:
+            max_length (int): Tokens kept per text (the model's max_seq_length).
+            threads (int): ONNX Runtime intra-op threads; None lets the runtime decide.
+            session, tokenizer: Preloaded InferenceSession and tokenizers.Tokenizer;
+                prepared and loaded lazily when omitted.
+        """
+        self.model_name = model_name
+        self.model_dir = model_dir
+        self.quantize = quantize
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.threads = threads
+
+        self._session = session
+        self._tokenizer = tokenizer
+        self._input_names = None
+        self._load_lock = threading.Lock()
+        if tokenizer is not None:
+            self._configure_tokenizer(tokenizer)
+
+    def _load(self):
+        with self._load_lock:
+            if self._session is not None and self._tokenizer is not None:
+                return
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            model_path, tokenizer_path = prepare_model(self.model_name, self.model_dir, self.quantize)
+            if self._session is None:
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                if self.threads:
+                    options.intra_op_num_threads = self.threads
+                self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            if self._tokenizer is None:
+                self._tokenizer = self._configure_tokenizer(Tokenizer.from_file(tokenizer_path))
+
+    def _configure_tokenizer(self, tokenizer):
+        tokenizer.enable_truncation(max_length=self.max_length)
+        tokenizer.enable_padding()
+        return tokenizer
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._load()
+        return self._session
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._load()
+        return self._tokenizer
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = None, **kwargs) -> np.ndarray:
+        """Embed one text (returns a vector) or a list of texts (returns a matrix)"""
+        batch_size = batch_size or self.batch_size
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Batch texts of similar length together, then restore the caller's order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for i, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                embeddings[i] = vector
+
+        result = np.stack(embeddings).astype(np.float32)
+        return result[0] if single else result
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        if self._input_names is None:
+            self._input_names = {node.name for node in self.session.get_inputs()}
+        feed = {name: value for name, value in inputs.items() if name in self._input_names}
+        token_embeddings = self.session.run(None, feed)[0]
+        return mean_pool(token_embeddings, inputs["attention_mask"])
+
+    def get_sentence_embedding_dimension(self) -> int:
+        dim = self.session.get_outputs()[0].shape[-1]
+        return dim if isinstance(dim, int) else len(self.encode("dimension"))
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_digest(text):
+    """Short content hash of a chunk, part of its score cache key"""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+class CrossEncoderReranker:
+    """Re-rank retrieved chunks with a cross-encoder, batched on CPU and cached"""
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", top_n=20, batch_size=16,
+                 max_workers=2, cache_size=10000, model=None):
+        """
+        Args:
+            top_n (int): Only the first top_n results are scored; the rest keep their order.
+            batch_size (int): Query/chunk pairs per forward pass.
+            max_workers (int): Threads running batches concurrently (inference releases the GIL).
+            cache_size (int): Maximum number of cached (query, chunk) scores.
+            model: Preloaded model exposing predict(pairs); loaded lazily when omitted.
+        """
+        self.model_name = model_name
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rerank")
+
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Load the cross-encoder on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Re-order search results by cross-encoder relevance.
+
+        Results need "id" and "document" keys (as returned by EmbeddingManager searches).
+        Each re-ranked result gets a "rerank_score". Scores are cached per query and chunk
+        text, so a chunk re-indexed with new text under the same id is scored again.
+        """
+        if not query or not results:
+            return results[:k] if k is not None else results
+
+        head, tail = results[:self.top_n], results[self.top_n:]
+        query_key = hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+        keys = [(query_key, result["id"], chunk_digest(result["document"])) for result in head]
+        scores = [self._cache_get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            try:
+                batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+                futures = [
+                    self.executor.submit(self._score, [(query, head[i]["document"]) for i in batch])
+                    for batch in batches
+                ]
+                for batch, future in zip(batches, futures):
+                    for i, score in zip(batch, future.result()):
+                        scores[i] = float(score)
+                        self._cache_put(keys[i], scores[i])
+            except Exception as e:
+                logger.error(f"Error re-ranking results: {e}")
+                return results[:k] if k is not None else results
+
+        reranked = [
+            {**result, "rerank_score": score}
+            for result, score in sorted(zip(head, scores), key=lambda pair: pair[1], reverse=True)
+        ]
+        reranked += tail
+        return reranked[:k] if k is not None else reranked
+
+    def _score(self, pairs):
+        return self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put(self, key, score):
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
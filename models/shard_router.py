@@ -0,0 +1,281 @@
+import os
+import re
+import sys
+import json
+import zlib
+import heapq
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from models.vector_store import QuantizedVectorStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 16
+
+
+def hash_shard(ticker: str, num_shards: int) -> str:
+    """Stable shard name for a ticker"""
+    return f"hash-{zlib.crc32(ticker.upper().encode('utf-8')) % num_shards:03d}"
+
+
+def sector_shard(sector: str) -> str:
+    return "sector-" + re.sub(r"[^a-z0-9]+", "-", sector.lower()).strip("-")
+
+
+class ShardRouter:
+    """
+    Cross-company vector index split into a bounded number of shards.
+
+    Tickers map to shards by sector when a sector is known and by hash otherwise, so
+    a question about a few companies opens only their shards and a question about all
+    of them fans out over num_shards stores (in parallel) rather than one collection
+    per ticker. Each shard is a QuantizedVectorStore. A catalog of which filings each
+    ticker has in which shard is kept in memory and on disk, so routing, pruning and
+    deletion never scan the shards. Shards are loaded on demand; once their in-memory
+    codes exceed memory_budget, the least recently used ones are saved and unloaded.
+    """
+
+    def __init__(self, root: str = "data/vector_store/shards", dim: int = 384, dtype: str = "int8",
+                 num_shards: int = DEFAULT_SHARDS, sectors: Optional[Dict[str, str]] = None,
+                 memory_budget: int = 256 * 1024 * 1024, max_workers: int = 4, rerank_candidates: int = 50):
+        """
+        Args:
+            sectors (dict): {ticker: sector}; tickers with a sector share that sector's shard.
+            memory_budget (int): Bytes of quantized codes kept loaded between queries.
+            max_workers (int): Shards queried in parallel.
+        """
+        self.root = root
+        self.dim = dim
+        self.dtype = dtype
+        self.num_shards = num_shards
+        self.sectors = {ticker.upper(): sector for ticker, sector in (sectors or {}).items() if sector}
+        self.memory_budget = memory_budget
+        self.rerank_candidates = rerank_candidates
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        os.makedirs(self.root, exist_ok=True)
+        self._catalog_path = os.path.join(self.root, "catalog.json")
+        # shard -> {ticker -> {file_path -> filing_date}}
+        self.catalog: Dict[str, Dict[str, Dict[str, str]]] = self._load_catalog()
+        self._loaded: "OrderedDict[str, QuantizedVectorStore]" = OrderedDict()  # least recently used first
+        self._dirty = set()
+        self._lock = threading.RLock()
+
+    def shard_for(self, ticker: str) -> str:
+        """Shard holding a ticker's filings (where they already are, if indexed before a sector was set)"""
+        ticker = ticker.upper()
+        for shard, tickers in self.catalog.items():
+            if ticker in tickers:
+                return shard
+        if ticker in self.sectors:
+            return sector_shard(self.sectors[ticker])
+        return hash_shard(ticker, self.num_shards)
+
+    def add_filing(self, ticker: str, file_path: str, ids: List[str], embeddings, documents: List[str],
+                   metadatas: List[Dict[str, Any]], filing_date: str = "Unknown"):
+        """Index one filing's chunks, replacing any earlier copy of the same filing"""
+        ticker = ticker.upper()
+        with self._lock:
+            shard = self.shard_for(ticker)
+            store = self.load_shard(shard)
+            store.delete(where={"file_path": file_path})
+            store.add(ids, embeddings, documents, [{**metadata, "ticker": ticker, "file_path": file_path} for metadata in metadatas])
+            self.catalog.setdefault(shard, {}).setdefault(ticker, {})[file_path] = filing_date
+            self._dirty.add(shard)
+
+    def search(self, embedding, k: int = 10, tickers: Optional[List[str]] = None,
+               where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k chunks across companies (all, or only tickers), merged from every shard involved.
+
+        Each hit carries its "shard" and the chunk's "ticker" in its metadata.
+        """
+        with self._lock:
+            if tickers:
+                wanted = {ticker.upper() for ticker in tickers}
+                shards = {shard for shard, indexed in self.catalog.items() if wanted & set(indexed)}
+            else:
+                wanted = None
+                shards = set(self.catalog)
+            stores = {shard: self.load_shard(shard) for shard in sorted(shards)}
+            self._enforce_budget(keep=set(stores))
+
+        def query(shard, store):
+            shard_where = dict(where or {})
+            if wanted is not None:
+                # Only this shard's requested tickers; a list matches any of its values
+                shard_where["ticker"] = sorted(wanted & set(self.catalog.get(shard, {})))
+            try:
+                hits = store.query(embedding, k=k, where=shard_where or None,
+                                   rerank_candidates=max(self.rerank_candidates, k))
+            except Exception as e:
+                logger.error(f"Error searching shard {shard}: {e}")
+                return []
+            return [{**hit, "shard": shard} for hit in hits]
+
+        futures = [self.executor.submit(query, shard, store) for shard, store in stores.items()]
+        return heapq.nlargest(k, (hit for future in futures for hit in future.result()), key=lambda hit: hit["score"])
+
+    def remove_filing(self, file_path: str) -> int:
+        """Delete one filing's chunks; returns the number removed"""
+        with self._lock:
+            for shard, tickers in self.catalog.items():
+                for ticker, filings in tickers.items():
+                    if file_path in filings:
+                        removed = self.load_shard(shard).delete(where={"file_path": file_path})
+                        del filings[file_path]
+                        if not filings:
+                            del tickers[ticker]
+                        self._dirty.add(shard)
+                        return removed
+        return 0
+
+    def remove_ticker(self, ticker: str) -> int:
+        """Delete every filing of a ticker"""
+        with self._lock:
+            filings = [path for tickers in self.catalog.values() for path in tickers.get(ticker.upper(), {})]
+            return sum(self.remove_filing(path) for path in filings)
+
+    def prune(self, keep_latest: int = 8) -> int:
+        """
+        Delete each ticker's filings beyond its keep_latest most recent (by filing date).
+
+        Returns:
+            int: Chunks removed.
+        """
+        with self._lock:
+            stale = []
+            for tickers in self.catalog.values():
+                for filings in tickers.values():
+                    by_date = sorted(filings, key=lambda path: (filings[path] != "Unknown", filings[path]), reverse=True)
+                    stale.extend(by_date[keep_latest:])
+            return sum(self.remove_filing(path) for path in stale)
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite shards without deleted chunks, dropping shards left empty; returns live chunks per shard"""
+        with self._lock:
+            sizes = {}
+            for shard in self._shard_dirs():
+                store = self.load_shard(shard)
+                if len(store) == 0 and not self.catalog.get(shard):
+                    self.unload_shard(shard, save=False)
+                    self._remove_shard_files(shard)
+                    self.catalog.pop(shard, None)
+                    continue
+                store.compact()
+                self._dirty.discard(shard)
+                sizes[shard] = len(store)
+                self._enforce_budget()
+            self._save_catalog()
+            return sizes
+
+    def load_shard(self, shard: str) -> QuantizedVectorStore:
+        """Open a shard (from memory if loaded), marking it most recently used"""
+        with self._lock:
+            if shard in self._loaded:
+                self._loaded.move_to_end(shard)
+                return self._loaded[shard]
+            store = QuantizedVectorStore(os.path.join(self.root, shard), dim=self.dim, dtype=self.dtype,
+                                         rerank_candidates=self.rerank_candidates)
+            self._loaded[shard] = store
+            self._enforce_budget(keep={shard})
+            return store
+
+    def unload_shard(self, shard: str, save: bool = True):
+        with self._lock:
+            store = self._loaded.pop(shard, None)
+            if store is not None and save and shard in self._dirty:
+                store.save()
+            self._dirty.discard(shard)
+
+    def save(self):
+        """Persist modified shards and the catalog"""
+        with self._lock:
+            for shard in list(self._dirty):
+                if shard in self._loaded:
+                    self._loaded[shard].save()
+            self._dirty.clear()
+            self._save_catalog()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "shards": len(self.catalog),
+                "loaded": list(self._loaded),
+                "memory_bytes": self.memory_bytes,
+                "memory_budget": self.memory_budget,
+                "tickers": sum(len(tickers) for tickers in self.catalog.values()),
+                "filings": sum(len(filings) for tickers in self.catalog.values() for filings in tickers.values()),
+            }
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(store.memory_bytes for store in self._loaded.values())
+
+    def _enforce_budget(self, keep=()):
+        """Unload least recently used shards (other than keep) until within the memory budget"""
+        for shard in list(self._loaded):
+            if self.memory_bytes <= self.memory_budget:
+                break
+            if shard not in keep:
+                self.unload_shard(shard)
+
+    def _shard_dirs(self) -> List[str]:
+        names = {name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))}
+        return sorted(names | set(self.catalog) | set(self._loaded))
+
+    def _remove_shard_files(self, shard: str):
+        path = os.path.join(self.root, shard)
+        for name in os.listdir(path) if os.path.isdir(path) else []:
+            os.remove(os.path.join(path, name))
+        if os.path.isdir(path):
+            os.rmdir(path)
+
+    def _load_catalog(self):
+        try:
+            with open(self._catalog_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_catalog(self):
+        # Tickers with no filings left are dropped from the catalog
+        catalog = {shard: {t: f for t, f in tickers.items() if f} for shard, tickers in self.catalog.items()}
+        self.catalog = {shard: tickers for shard, tickers in catalog.items() if tickers}
+        tmp = self._catalog_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.catalog, f)
+        os.replace(tmp, self._catalog_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the sharded cross-company vector index")
+    parser.add_argument("--root", default="data/vector_store/shards")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prune_parser = subparsers.add_parser("prune", help="Delete each ticker's older filings, then compact")
+    prune_parser.add_argument("--keep", type=int, default=8, help="Most recent filings kept per ticker")
+    remove_parser = subparsers.add_parser("remove", help="Delete a ticker's filings, then compact")
+    remove_parser.add_argument("ticker")
+    subparsers.add_parser("compact", help="Reclaim space from deleted chunks")
+    subparsers.add_parser("stats", help="Show shard sizes")
+
+    args = parser.parse_args(argv)
+    router = ShardRouter(args.root, memory_budget=0)  # Shards are unloaded as soon as they are done with
+    if args.command == "prune":
+        print(f"Removed {router.prune(keep_latest=args.keep)} chunks")
+    elif args.command == "remove":
+        print(f"Removed {router.remove_ticker(args.ticker)} chunks")
+    sizes = router.compact() if args.command != "stats" else None
+    stats = router.stats()
+    print(f"{stats['shards']} shards, {stats['tickers']} tickers, {stats['filings']} filings")
+    for shard, size in sorted((sizes or {}).items()):
+        print(f"  {shard:<28} {size:8d} chunks")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
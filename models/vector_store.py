@@ -0,0 +1,254 @@
+import os
+import pickle
+import logging
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ("int8", "float16")
+
+# Rows scored per block so the int8 -> float32 upcast never materializes the whole matrix
+SCORE_BLOCK_ROWS = 65536
+
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """
+    Quantize L2-normalized vectors.
+
+    int8 uses a symmetric per-vector scale (x ~= codes * scale); float16 is a plain cast.
+
+    Returns:
+        tuple: (codes, scales) where scales is None for float16.
+    """
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported quantization dtype: {dtype}")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so dot products are cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class QuantizedVectorStore:
+    """
+    Brute-force vector store over quantized codes with exact re-ranking.
+
+    Quantized codes (1 or 2 bytes per dimension) are held in memory and scanned to
+    pick candidates; the full-precision float32 vectors stay on disk in a memory-mapped
+    file and are only read for the candidates being re-ranked.
+    """
+
+    def __init__(self, path: str, dim: int = 384, dtype: str = "int8", rerank_candidates: int = 50):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported quantization dtype: {dtype}")
+
+        self.path = path
+        self.dim = dim
+        self.dtype = dtype
+        self.rerank_candidates = rerank_candidates
+
+        self.ids: List[Optional[str]] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.codes = np.zeros((0, dim), dtype=np.int8 if dtype == "int8" else np.float16)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.live = np.zeros(0, dtype=bool)
+
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._pending = []  # float32 rows not yet flushed to the on-disk file
+        self._flushed_rows = 0
+        self.load()
+
+    def __len__(self):
+        return len(self.id_to_row)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held in memory for scoring (codes and scales)"""
+        return self.codes.nbytes + self.scales.nbytes
+
+    def add(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Add or replace vectors"""
+        if not ids:
+            return
+        self.delete(ids=[doc_id for doc_id in ids if doc_id in self.id_to_row])
+
+        vectors = normalize(embeddings)
+        codes, scales = quantize(vectors, self.dtype)
+        start = len(self.ids)
+
+        self.codes = np.concatenate([self.codes, codes])
+        self.scales = np.concatenate([self.scales, scales if scales is not None else np.ones(len(ids), np.float32)])
+        self.live = np.concatenate([self.live, np.ones(len(ids), dtype=bool)])
+        self._pending.append(vectors)
+
+        for offset, (doc_id, text, metadata) in enumerate(zip(ids, documents, metadatas)):
+            self.ids.append(doc_id)
+            self.documents.append(text)
+            self.metadatas.append(metadata)
+            self.id_to_row[doc_id] = start + offset
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> int:
+        """Tombstone vectors by id or metadata equality filter; returns the number removed"""
+        rows = [self.id_to_row[doc_id] for doc_id in ids or [] if doc_id in self.id_to_row]
+        if where:
+            rows += [row for row in self.id_to_row.values() if self._matches(self.metadatas[row], where)]
+
+        for row in set(rows):
+            self.id_to_row.pop(self.ids[row], None)
+            self.ids[row] = None
+            self.documents[row] = None
+            self.metadatas[row] = None
+            self.live[row] = False
+        return len(set(rows))
+
+    def get(self, ids: List[str]) -> Dict[str, List[Any]]:
+        """Fetch documents and metadata for ids (Chroma-style response)"""
+        rows = [self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row]
+        return {
+            "ids": [self.ids[row] for row in rows],
+            "documents": [self.documents[row] for row in rows],
+            "metadatas": [self.metadatas[row] for row in rows],
+        }
+
+    def query(self, embedding, k: int = 5, where: Optional[Dict[str, Any]] = None,
+              rerank_candidates: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Approximate search over the quantized codes, re-ranked exactly with float32 vectors"""
+        if not self.id_to_row:
+            return []
+
+        query = normalize(embedding)[0]
+        mask = self.live.copy()
+        if where:
+            mask &= np.array([self._matches(metadata, where) for metadata in self.metadatas], dtype=bool)
+
+        approx = np.full(len(self.ids), -np.inf, dtype=np.float32)
+        query_codes = query.astype(np.float16) if self.dtype == "float16" else query
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            approx[start:start + SCORE_BLOCK_ROWS] = block @ query_codes.astype(np.float32)
+        approx *= self.scales
+        approx[~mask] = -np.inf
+
+        n_candidates = min(max(rerank_candidates or self.rerank_candidates, k), int(mask.sum()))
+        if n_candidates == 0:
+            return []
+        candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+
+        exact = self._full_vectors(candidates) @ query
+        order = np.argsort(-exact)[:k]
+        return [
+            {
+                "id": self.ids[candidates[i]],
+                "document": self.documents[candidates[i]],
+                "metadata": self.metadatas[candidates[i]],
+                "score": float(exact[i]),
+            }
+            for i in order
+        ]
+
+    def save(self):
+        """Persist codes, records and full-precision vectors"""
+        self._flush_vectors()
+        if len(self.ids) > 2 * max(len(self.id_to_row), 1):
+            self._compact()
+
+        np.save(os.path.join(self.path, "codes.npy"), self.codes)
+        np.save(os.path.join(self.path, "scales.npy"), self.scales)
+        with open(os.path.join(self.path, "records.pkl"), "wb") as f:
+            pickle.dump(
+                {"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas,
+                 "dim": self.dim, "dtype": self.dtype},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+
+    def compact(self):
+        """Rewrite the store without deleted rows and persist it"""
+        self._flush_vectors()
+        if self._flushed_rows:
+            self._compact()
+        self.save()
+
+    def load(self):
+        """Load a persisted store if present"""
+        records_path = os.path.join(self.path, "records.pkl")
+        if not os.path.exists(records_path):
+            # Vectors flushed by a run that never saved its records are unusable
+            if os.path.exists(self._vectors_path):
+                os.remove(self._vectors_path)
+            return
+
+        with open(records_path, "rb") as f:
+            records = pickle.load(f)
+        if records["dtype"] != self.dtype or records["dim"] != self.dim:
+            raise ValueError(
+                f"Vector store at {self.path} holds {records['dtype']}/{records['dim']} vectors, "
+                f"not {self.dtype}/{self.dim}"
+            )
+
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids) if doc_id is not None}
+        self.codes = np.load(os.path.join(self.path, "codes.npy"))
+        self.scales = np.load(os.path.join(self.path, "scales.npy"))
+        self.live = np.array([doc_id is not None for doc_id in self.ids], dtype=bool)
+        self._flushed_rows = len(self.ids)
+
+        # Drop rows appended after the last save so the file stays aligned with the records
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(self._flushed_rows * self.dim * 4)
+
+    def _full_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Read float32 vectors for rows from disk (or the unflushed buffer)"""
+        self._flush_vectors()
+        vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._flushed_rows, self.dim))
+        return np.asarray(vectors[np.sort(rows)])[np.argsort(np.argsort(rows))]
+
+    def _flush_vectors(self):
+        if not self._pending:
+            return
+        with open(self._vectors_path, "ab") as f:
+            for vectors in self._pending:
+                f.write(vectors.astype(np.float32).tobytes())
+                self._flushed_rows += len(vectors)
+        self._pending = []
+
+    def _compact(self):
+        """Rewrite the store without tombstoned rows"""
+        keep = np.flatnonzero(self.live)
+        vectors = np.array(np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                     shape=(self._flushed_rows, self.dim))[keep])
+        with open(self._vectors_path, "wb") as f:
+            f.write(vectors.tobytes())
+
+        self.codes = self.codes[keep]
+        self.scales = self.scales[keep]
+        self.live = np.ones(len(keep), dtype=bool)
+        self.ids = [self.ids[row] for row in keep]
+        self.documents = [self.documents[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._flushed_rows = len(keep)
+
+    def _matches(self, metadata: Optional[Dict[str, Any]], where: Dict[str, Any]) -> bool:
+        """Equality filter; a list value matches any of its items"""
+        return metadata is not None and all(
+            metadata.get(key) in value if isinstance(value, (list, tuple, set)) else metadata.get(key) == value
+            for key, value in where.items()
+        )
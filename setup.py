@@ -14,6 +14,7 @@ setup(
         'ollama==0.1.5',
         'chromadb==0.4.18',
         'requests==2.31.0',
+        'aiohttp==3.9.5',
         'sentence-transformers==2.2.2',
         'python-dotenv==1.0.0',
         'llama-index'
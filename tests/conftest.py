@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# Keep test runs from writing the app log into the working tree
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="sec-analysis-logs-"))
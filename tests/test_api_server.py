@@ -0,0 +1,111 @@
+# tests/test_api_server.py
+import unittest
+from aiohttp.test_utils import TestClient, TestServer
+from agents.job_service import JobService
+from api.server import create_app
+
+class FakeEmbeddingManager:
+    shard_router = object()
+
+    def hybrid_search(self, query, collection_name, k=5):
+        return [{"id": "chunk_1", "document": f"{query} in {collection_name}", "metadata": {}}][:k]
+
+    def search_companies(self, query, k=10, tickers=None):
+        return [{"id": f"{ticker}_chunk", "document": query, "metadata": {"ticker": ticker}}
+                for ticker in tickers or ["AAPL", "MSFT"]][:k]
+
+class FakeOrchestrator:
+    """Stand-in for SECAnalysisOrchestrator with canned results"""
+
+    def __init__(self):
+        self.use_cache = True
+        self.cache = {}
+        self.calls = 0
+        self.embedding_manager = FakeEmbeddingManager()
+
+    def process_ticker(self, ticker, generate_narrative=True, refresh=False, progress=None):
+        self.calls += 1
+        if ticker == "NONE":
+            return {"error": f"No SEC filings found for {ticker}"}
+        if ticker == "BAD$":
+            return {"error": f"Invalid ticker symbol: {ticker}"}
+        if ticker == "BOOM":
+            return {"error": f"Error analyzing {ticker}: connection reset"}
+        results = {
+            "ticker": ticker,
+            "analysis": {
+                "latest": {"revenue": 391e9, "gross_margin": float("nan")},
+                "trends": {"revenue_cagr": 0.08},
+                "trend_basis": "annual",
+                "financials": [{"revenue": 391e9, "notes": "x" * 2000}],
+            },
+            "quick_insights": ["Revenue grew."],
+            "narrative_prompts": {"insights": "prompt"},
+            "accessions": ["0000320193-24-000123"],
+            "processed_at": 1700000000.0,
+        }
+        self.cache[ticker] = results
+        return results
+
+    def generate_narrative(self, results):
+        yield "Key Insights", "stub narrative"
+        results["insight_sections"] = {"Key Insights": "stub narrative"}
+
+class TestAPIServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.orchestrator = FakeOrchestrator()
+        app = create_app(JobService(self.orchestrator), max_concurrency=2)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_metrics_and_conditional_requests(self):
+        response = await self.client.get("/v1/tickers/aapl/metrics")
+        self.assertEqual(response.status, 200)
+        body = await response.json()
+        self.assertEqual(body["metrics"]["revenue"], 391e9)
+        self.assertIsNone(body["metrics"]["gross_margin"])
+
+        etag = response.headers["ETag"]
+        response = await self.client.get("/v1/tickers/AAPL/metrics", headers={"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(self.orchestrator.calls, 1)
+
+    async def test_gzip_and_errors(self):
+        response = await self.client.get("/v1/tickers/AAPL/trends", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        self.assertEqual((await response.json())["basis"], "annual")
+
+        response = await self.client.get("/v1/tickers/NONE/analysis")
+        self.assertEqual(response.status, 404)
+        response = await self.client.get("/v1/tickers/BAD$/metrics")
+        self.assertEqual(response.status, 400)
+        response = await self.client.get("/v1/tickers/BOOM/metrics")
+        self.assertEqual(response.status, 500)
+
+        response = await self.client.get("/v1/tickers/AAPL/search")
+        self.assertEqual(response.status, 400)
+        response = await self.client.get("/v1/tickers/AAPL/search", params={"q": "supply chain"})
+        self.assertEqual((await response.json())["results"][0]["document"], "supply chain in AAPL_filings")
+
+        response = await self.client.get("/v1/search", params={"q": "tariff risk", "tickers": "msft, nvda"})
+        self.assertEqual([hit["metadata"]["ticker"] for hit in (await response.json())["results"]], ["MSFT", "NVDA"])
+        self.orchestrator.embedding_manager.shard_router = None
+        response = await self.client.get("/v1/search", params={"q": "tariff risk"})
+        self.assertEqual(response.status, 501)
+
+    async def test_narrative_changes_etag(self):
+        response = await self.client.get("/v1/tickers/AAPL/insights")
+        before = response.headers["ETag"]
+        self.assertIsNone((await response.json())["insight_sections"])
+
+        response = await self.client.get("/v1/tickers/AAPL/insights", params={"narrative": "true"})
+        body = await response.json()
+        self.assertEqual(body["insight_sections"], {"Key Insights": "stub narrative"})
+        self.assertNotEqual(response.headers["ETag"], before)
+
+if __name__ == "__main__":
+    unittest.main()
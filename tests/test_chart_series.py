@@ -0,0 +1,61 @@
+# tests/test_chart_series.py
+import copy
+import json
+import unittest
+import numpy as np
+from utils.chart_series import build_chart_series, lttb
+from ui.visualization import figure_json
+
+FINANCIALS = [
+    {"filing_date": "Unknown", "period_end_date": "2024-09-28", "fiscal_year": 2024, "fiscal_period": "FY",
+     "revenue": 391.0, "net_income": 93.7, "profit_margin": 0.24},
+    {"filing_date": "Unknown", "period_end_date": "2023-09-30", "fiscal_year": 2023, "fiscal_period": "FY",
+     "revenue": 383.3, "net_income": 97.0, "profit_margin": 0.25},
+    {"filing_date": "2024-05-03", "revenue": 90.8, "net_income": 23.6},
+    {"filing_date": "Unknown", "period_end_date": None, "fiscal_year": 2024, "fiscal_period": "Q1",
+     "fiscal_year_end": "--09-28", "revenue": 119.6},
+    {"filing_date": "Unknown", "revenue": 1.0},
+]
+
+class TestChartSeries(unittest.TestCase):
+
+    def test_build_sorts_and_types(self):
+        original = copy.deepcopy(FINANCIALS)
+        with self.assertLogs("utils.chart_series", level="WARNING") as logs:
+            series = build_chart_series(FINANCIALS)
+
+        self.assertEqual(FINANCIALS, original)
+        self.assertEqual(series["dates"].dtype, np.dtype("datetime64[D]"))
+        # Without a period end date, Q1 of a September fiscal year ends in December
+        self.assertEqual(series["labels"], ["FY 2023", "Q1 2024", "2024-05-03", "FY 2024"])
+        self.assertEqual(str(series["dates"][1]), "2023-12-31")
+        np.testing.assert_array_equal(series["metrics"]["revenue"], [383.3, 119.6, 90.8, 391.0])
+        self.assertIn("1 of 5 filings", logs.output[0])
+        self.assertNotIn("gross_margin", series["metrics"])
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50.0)
+        y[500] = 10.0
+        y[700] = np.nan
+
+        keep = lttb(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 999)
+        self.assertIn(500, keep)
+        self.assertNotIn(700, keep)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+        # Short series are returned whole
+        np.testing.assert_array_equal(lttb(x[:10], y[:10], 50), np.arange(10))
+
+    def test_figures_are_downsampled(self):
+        dates = np.arange("1990-01-01", "2024-01-01", dtype="datetime64[D]")[::7]
+        series = {"dates": dates, "labels": [], "metrics": {"revenue": np.linspace(1, 2, len(dates))}}
+        figure = json.loads(figure_json(series, "timeline", max_points=100))
+        self.assertEqual(len(figure["data"][0]["y"]), 100)
+        self.assertEqual(json.loads(figure_json(series, "ratios"))["data"], [])
+
+if __name__ == "__main__":
+    unittest.main()
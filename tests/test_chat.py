@@ -0,0 +1,85 @@
+# tests/test_chat.py
+import unittest
+from agents.chat import ChatSession, content_terms
+from utils.prompt_builder import PromptBuilder, estimate_tokens
+
+class FakeEmbeddingManager:
+    """Stand-in EmbeddingManager that records searches"""
+
+    def __init__(self, indexed=True):
+        self.indexed = indexed
+        self.loaded = []
+        self.queries = []
+
+    def load_collection(self, collection_name):
+        self.loaded.append(collection_name)
+        return self.indexed
+
+    def hybrid_search(self, query, collection_name, k=5):
+        self.queries.append(query)
+        n = len(self.queries)
+        return [{"id": f"chunk{n}", "document": f"Excerpt about {query}.",
+                 "metadata": {"section": "mda", "doc_type": "10-Q", "filing_date": "2025-01-31"}}]
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, temperature=0.7, max_tokens=800, timeout=None, task=None):
+        self.prompts.append(prompt)
+        return f"Answer {len(self.prompts)}. It is discussed in the MD&A."
+
+RESULTS = {"analysis": {"latest": {"revenue": 124.3e9, "gross_margin": 0.469}}}
+
+class TestChatSession(unittest.TestCase):
+
+    def setUp(self):
+        self.embeddings = FakeEmbeddingManager()
+        self.llm = FakeLLM()
+        self.chat = ChatSession("aapl", self.embeddings, self.llm, PromptBuilder(max_tokens=800),
+                                results=RESULTS, recent_turns=2)
+
+    def test_collection_loaded_once(self):
+        self.assertEqual(self.embeddings.loaded, ["AAPL_filings"])
+        self.chat.ask("What drove services revenue growth?")
+        self.chat.ask("What drove services revenue growth?")
+        self.assertEqual(self.embeddings.loaded, ["AAPL_filings"])
+        # A repeated question reuses the cached retrieval
+        self.assertEqual(len(self.embeddings.queries), 1)
+
+    def test_follow_up_rewriting(self):
+        first = self.chat.ask("How did Greater China net sales change?")
+        self.assertEqual(first["query"], "How did Greater China net sales change?")
+        self.assertIn("$124.3B", self.llm.prompts[0])
+
+        follow_up = self.chat.ask("Why did they fall?")
+        self.assertEqual(follow_up["query"], "Why did they fall? greater china net sales change")
+        # The previous turn's chunks stay in context for the follow-up
+        self.assertEqual([s["excerpt"][:13] for s in follow_up["sources"]], ["Excerpt about"] * 2)
+        self.assertIn("Q: How did Greater China net sales change?", self.llm.prompts[1])
+
+        standalone = self.chat.ask("What are the main supply chain risks?")
+        self.assertEqual(standalone["query"], "What are the main supply chain risks?")
+        self.assertEqual(len(standalone["sources"]), 1)
+
+    def test_memory_is_summarized(self):
+        for i in range(30):
+            self.chat.ask(f"Question number {i} about segment margins and product mix?")
+
+        self.assertEqual(len(self.chat.history), 30)
+        self.assertEqual(len(self.chat.summary), 12)
+        self.assertIn("Asked: Question number 27", self.chat.summary[-1])
+        prompt = self.llm.prompts[-1]
+        self.assertIn("Question number 28", prompt)
+        self.assertNotIn("Question number 2 ", prompt)
+        self.assertLessEqual(estimate_tokens(prompt), 800)
+
+    def test_unindexed_ticker(self):
+        chat = ChatSession("MSFT", FakeEmbeddingManager(indexed=False), self.llm, PromptBuilder())
+        reply = chat.ask("What is the revenue?")
+        self.assertEqual(reply["sources"], [])
+        self.assertIn("No matching excerpts", self.llm.prompts[-1])
+        self.assertEqual(content_terms("What about its iPhone sales?"), ["iphone", "sales"])
+
+if __name__ == "__main__":
+    unittest.main()
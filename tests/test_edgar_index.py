@@ -0,0 +1,92 @@
+# tests/test_edgar_index.py
+import os
+import shutil
+import unittest
+from datetime import date
+from agents.edgar_index import (EdgarIndexSource, BulkIndexIngestor, parse_master_index,
+                                quarter_index_paths, daily_index_paths)
+from agents.parser import FilingParser
+
+AAPL_10Q = "data/filings/sec-edgar-filings/AAPL/10-Q/0000320193-24-000069/primary-document.html"
+
+MASTER_INDEX = """Description:           Master Index of EDGAR Dissemination Feed
+Last Data Received:    March 31, 2024
+Comments:              webmaster@sec.gov
+
+CIK|Company Name|Form Type|Date Filed|Filename
+--------------------------------------------------------------------------------
+320193|Apple Inc.|10-Q|2024-02-02|edgar/data/320193/0000320193-24-000006.txt
+320193|Apple Inc.|4|2024-02-05|edgar/data/320193/0000320193-24-000010.txt
+789019|MICROSOFT CORP|10-Q|2024-01-30|edgar/data/789019/0000950170-24-008814.txt
+1000045|NICHOLAS FINANCIAL INC|10-Q|2024-02-14|edgar/data/1000045/0000950170-24-014566.txt
+"""
+
+class TestEdgarIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror = "test_data/edgar"
+        self.output_dir = "test_data/filings"
+        os.makedirs(os.path.join(self.mirror, "full-index/2024/QTR1"))
+        with open(os.path.join(self.mirror, "full-index/2024/QTR1/master.idx"), "w") as f:
+            f.write(MASTER_INDEX)
+        for line in MASTER_INDEX.splitlines()[6:]:
+            path = os.path.join(self.mirror, line.split("|")[4][len("edgar/"):])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"<SEC-DOCUMENT>{line}</SEC-DOCUMENT>")
+
+    def tearDown(self):
+        if os.path.exists("test_data"):
+            shutil.rmtree("test_data")
+
+    def test_parse_and_paths(self):
+        entries = list(parse_master_index(MASTER_INDEX.splitlines()))
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[0].form, "10-Q")
+        self.assertEqual(quarter_index_paths(date(2023, 11, 1), date(2024, 2, 1)),
+                         ["full-index/2023/QTR4/master.idx", "full-index/2024/QTR1/master.idx"])
+        # Weekend days have no daily index
+        self.assertEqual(len(daily_index_paths(date(2024, 2, 2), date(2024, 2, 5))), 2)
+
+    def test_ingests_only_new_filings(self):
+        ingestor = BulkIndexIngestor(
+            EdgarIndexSource(self.mirror),
+            output_dir=self.output_dir,
+            cik_to_ticker={"0000320193": "AAPL", "0000789019": "MSFT"}
+        )
+        stored = ingestor.ingest(["full-index/2024/QTR1/master.idx", "full-index/2024/QTR2/master.idx"])
+        self.assertEqual(len(stored), 2)
+        self.assertTrue(os.path.exists(os.path.join(
+            self.output_dir, "sec-edgar-filings/AAPL/10-Q/0000320193-24-000006/full-submission.txt")))
+
+        # A second pass finds nothing new
+        self.assertEqual(ingestor.scan(["full-index/2024/QTR1/master.idx"]), [])
+
+    def test_ingested_submission_parses_like_primary_document(self):
+        # EDGAR's full submission: SEC header, then the 10-Q and an exhibit as <DOCUMENT>s
+        with open(AAPL_10Q) as f:
+            primary = f.read()
+        submission = (
+            "<SEC-DOCUMENT>0000320193-24-000006.txt : 20240202\n<SEC-HEADER>\n"
+            "CONFORMED SUBMISSION TYPE:\t10-Q\nFILED AS OF DATE:\t\t20240202\n</SEC-HEADER>\n"
+            "<DOCUMENT>\n<TYPE>EX-31.1\n<SEQUENCE>2\n<TEXT>\n<html><p>Certification</p></html>\n</TEXT>\n</DOCUMENT>\n"
+            f"<DOCUMENT>\n<TYPE>10-Q\n<SEQUENCE>1\n<TEXT>\n<XBRL>\n{primary}\n</XBRL>\n</TEXT>\n</DOCUMENT>\n"
+            "</SEC-DOCUMENT>\n"
+        )
+        with open(os.path.join(self.mirror, "data/320193/0000320193-24-000006.txt"), "w") as f:
+            f.write(submission)
+        stored = BulkIndexIngestor(EdgarIndexSource(self.mirror), output_dir=self.output_dir,
+                                   cik_to_ticker={"320193": "AAPL"}).ingest(["full-index/2024/QTR1/master.idx"])
+
+        parser = FilingParser()
+        ingested = parser.parse_filing(stored[0])
+        expected = parser.parse_filing(AAPL_10Q)
+        self.assertEqual(ingested["metadata"]["filing_date"], "2024-02-02")
+        for key in ("doc_type", "fiscal_year", "fiscal_period", "period_end_date"):
+            self.assertEqual(ingested["metadata"][key], expected["metadata"][key])
+        self.assertEqual(len(ingested["tables"]), len(expected["tables"]))
+        self.assertEqual(ingested["table_types"], expected["table_types"])
+        self.assertEqual(ingested["sections"], expected["sections"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# tests/test_filing_archive.py
+import os
+import shutil
+import time
+import unittest
+import multiprocessing
+from agents.parser import FilingParser
+from utils.filing_archive import FilingArchive
+
+SAMPLE_FILING = "data/filings/sec-edgar-filings/AAPL/10-K/0000320193-24-000123/primary-document.html"
+
+def append_filings(root, writer, count):
+    archive = FilingArchive(root, codec="gzip")
+    for i in range(count):
+        archive.add("AAPL", "10-Q", f"{writer:010d}-24-{i:06d}", os.urandom(2048 + 97 * i))
+
+def hold_write_lock(root, locked, seconds):
+    archive = FilingArchive(root, codec="gzip")
+    with archive._write_lock():
+        locked.set()
+        time.sleep(seconds)
+
+class TestFilingArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data"
+        self.archive = FilingArchive(os.path.join(self.test_dir, "archive"), codec="gzip")
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_add_read_and_list(self):
+        self.archive.add("aapl", "10-Q", "0000320193-24-000069", b"<html>q2</html>", filing_date="2024-05-03")
+        self.archive.add("AAPL", "10-K", "0000320193-24-000123", b"<html>fy</html>", filing_date="2024-11-01")
+        self.archive.add("MSFT", "10-K", "0000950170-24-087843", b"<html>msft</html>", filing_date="2024-07-30")
+
+        self.assertEqual(self.archive.read("0000320193-24-000069"), b"<html>q2</html>")
+        records = self.archive.list_filings("AAPL")
+        self.assertEqual([r["form"] for r in records], ["10-K", "10-Q"])
+        self.assertEqual(len(self.archive.list_filings("AAPL", forms=["10-Q"], after="2024-06-01")), 0)
+
+        # Replacing an accession and compacting keeps only the latest copy
+        self.archive.add("AAPL", "10-K", "0000320193-24-000123", b"<html>amended</html>")
+        other = FilingArchive(self.archive.root)
+        self.assertEqual(other.read("0000320193-24-000123"), b"<html>amended</html>")
+        other.compact()
+        self.assertEqual(len(other), 3)
+        self.assertEqual(self.archive.read("0000320193-24-000123"), b"<html>amended</html>")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_concurrent_writer_processes(self):
+        context = multiprocessing.get_context("fork")
+        writers = [context.Process(target=append_filings, args=(self.archive.root, w, 25)) for w in range(4)]
+        for process in writers:
+            process.start()
+        for process in writers:
+            process.join(30)
+            self.assertEqual(process.exitcode, 0)
+
+        # Every record's offset and length frame a blob that decompresses intact
+        archive = FilingArchive(self.archive.root)
+        self.assertEqual(len(archive), 100)
+        for accession, record in archive.records.items():
+            self.assertEqual(len(archive.read(accession)), record["size"])
+
+        # A writer in another process holds off appends until it is done
+        locked = context.Event()
+        holder = context.Process(target=hold_write_lock, args=(self.archive.root, locked, 0.5))
+        holder.start()
+        self.assertTrue(locked.wait(10))
+        started = time.monotonic()
+        self.archive.add("MSFT", "10-K", "0000950170-24-087843", b"<html>msft</html>")
+        self.assertGreater(time.monotonic() - started, 0.3)
+        holder.join(10)
+
+    def test_import_and_parse(self):
+        accession_dir = os.path.join(self.test_dir, "filings/sec-edgar-filings/AAPL/10-K/0000320193-24-000123")
+        os.makedirs(accession_dir)
+        shutil.copy(SAMPLE_FILING, accession_dir)
+        with open(os.path.join(accession_dir, "full-submission.txt"), "w") as f:
+            f.write("<SEC-HEADER>\nFILED AS OF DATE:\t\t20241101\n</SEC-HEADER>")
+
+        refs = self.archive.import_directory(os.path.join(self.test_dir, "filings"), remove=True)
+        self.assertEqual(refs, ["archive://0000320193-24-000123/primary-document.html"])
+        self.assertFalse(os.path.exists(accession_dir))
+        self.assertEqual(self.archive.get_record("0000320193-24-000123")["filing_date"], "2024-11-01")
+        self.assertGreater(self.archive.stats()["ratio"], 5)
+
+        parsed = FilingParser(archive=self.archive).parse_filing(refs[0])
+        self.assertEqual(parsed["metadata"]["doc_type"], "10-K")
+        self.assertTrue(parsed["tables"])
+
+if __name__ == "__main__":
+    unittest.main()
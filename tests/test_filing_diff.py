@@ -0,0 +1,110 @@
+# tests/test_filing_diff.py
+import os
+import zlib
+import shutil
+import unittest
+from agents.filing_diff import FilingDiffer, align_paragraphs, fingerprint_paragraphs, shingle_hashes, hash_words, format_diff
+from bs4 import BeautifulSoup
+from agents.parser import FilingParser
+
+BASE = [
+    "The Company depends on component suppliers located in a small number of countries, including China and India.",
+    "Changes in tax laws could adversely affect the Company's effective tax rate and results of operations.",
+    "The Company's retail stores are subject to numerous risks and uncertainties, including local regulations.",
+    "The Company is exposed to credit risk on its trade accounts receivable and vendor non-trade receivables.",
+]
+
+def filing(accession, year, period, paragraphs):
+    return {
+        "metadata": {"file_path": f"test_data/raw/{accession}/primary-document.html", "doc_type": "10-Q",
+                     "fiscal_year": str(year), "fiscal_period": period, "filing_date": "Unknown"},
+        "sections": {"risk_factors": "\n\n".join(paragraphs)}
+    }
+
+class TestFilingDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.differ = FilingDiffer(cache_dir=os.path.join(self.test_dir, "fingerprints"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_rolling_hash_matches_direct_hash(self):
+        words = "one two three four five six seven".split()
+        shingles = shingle_hashes(words, size=3)
+        self.assertEqual(len(shingles), 5)  # size=3 windows over seven words
+        # The last window's rolled hash equals the hash computed from scratch
+        self.assertIn(hash_words([zlib.crc32(w.encode("utf-8")) for w in words[4:]]), shingles)
+
+    def test_align(self):
+        new = [
+            BASE[2],  # moved, unchanged
+            BASE[0].replace("China and India", "China, India and Vietnam"),
+            "New export controls and tariffs could increase the cost of the Company's products and components.",
+            BASE[1],
+        ]
+        diff = align_paragraphs(fingerprint_paragraphs("\n\n".join(BASE)), fingerprint_paragraphs("\n\n".join(new)))
+
+        self.assertEqual(diff["unchanged"], 2)
+        self.assertEqual(diff["removed"], [BASE[3]])
+        self.assertEqual(len(diff["added"]), 1)
+        self.assertIn("tariffs", diff["added"][0])
+        self.assertEqual(len(diff["modified"]), 1)
+        self.assertTrue(diff["modified"][0]["substantive"])
+        self.assertIn("Vietnam", " ".join(c["new"] for c in diff["modified"][0]["changes"]))
+
+    def test_short_paragraphs_and_table_rows_are_skipped(self):
+        text = "Apple Inc. | Q1 2025 Form 10-Q | 12\n\nItem 1A. Risk Factors\n\n" + BASE[0]
+        self.assertEqual([p.text for p in fingerprint_paragraphs(text)], [BASE[0]])
+
+    def test_diff_latest_uses_cache(self):
+        rolled = BASE[:3] + [BASE[3] + " As of June 29, 2024 the balance was $5 billion."]
+        rolled_forward = BASE[:3] + [BASE[3] + " As of December 28, 2024 the balance was $6 billion."]
+        filings = [
+            filing("0000000000-25-000002", 2025, "Q1", rolled_forward),
+            filing("0000000000-24-000001", 2024, "Q3", rolled),
+        ]
+        diff = self.differ.diff_latest(filings)
+
+        self.assertEqual(diff["from"]["period"], "Q3 2024")
+        self.assertEqual(diff["to"]["accession"], "0000000000-25-000002")
+        self.assertEqual(diff["summary"], {"added": 0, "removed": 0, "modified": 1})
+        self.assertFalse(diff["sections"]["risk_factors"]["modified"][0]["substantive"])
+        # Roll-forwards are ranked last in the LLM context
+        self.assertEqual(len(format_diff(diff)), 1)
+
+        # Fingerprints are reused from disk by a new differ, without the section text
+        differ = FilingDiffer(cache_dir=os.path.join(self.test_dir, "fingerprints"))
+        filings[0]["sections"] = {}
+        self.assertEqual(differ.diff(filings[1], filings[0])["summary"], diff["summary"])
+        self.assertIsNone(differ.diff_latest(filings[:1]))
+
+    def test_parser_keeps_paragraphs(self):
+        html = (
+            "<html><body><table><tr><td>Item 1A.</td><td>Risk Factors</td><td>5</td></tr>"
+            "<tr><td>Item 2.</td><td>Unregistered Sales</td><td>9</td></tr></table>"
+            "<div><span>Item 1A. </span><span>Risk Factors</span></div>"
+            f"<div><span>{BASE[0]}</span></div><p>{BASE[1]}</p>"
+            "<div>Item 2. Unregistered Sales of Equity Securities</div></body></html>"
+        )
+        path = os.path.join(self.test_dir, "primary-document.html")
+        with open(path, "w") as f:
+            f.write(html)
+
+        sections = FilingParser().parse_filing(path)["sections"]
+        self.assertEqual(sections["risk_factors"], f"{BASE[0]}\n\n{BASE[1]}")
+
+    def test_parser_keeps_text_beside_nested_blocks(self):
+        html = (
+            f"<html><body><div>Item 1A. Risk Factors<div>{BASE[0]}</div>{BASE[1]}"
+            f"<table><tr><td>Item 2.</td><td>9</td></tr></table><b>{BASE[2]}</b></div></body></html>"
+        )
+        parser = FilingParser()
+        text = parser._html_to_text(BeautifulSoup(html, "html.parser"))
+        self.assertEqual(text.split("\n\n"), ["Item 1A. Risk Factors", BASE[0], BASE[1], "Item 2. | 9", BASE[2]])
+
+if __name__ == "__main__":
+    unittest.main()
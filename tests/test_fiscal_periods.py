@@ -0,0 +1,132 @@
+# tests/test_fiscal_periods.py
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from bs4 import BeautifulSoup
+from agents.analyzer import FinancialAnalyzer
+from agents.parser import FilingParser
+from utils.fiscal_periods import PeriodLedger, identify_fiscal_period
+
+def annual_filing(fiscal_year, revenue):
+    table = pd.DataFrame([["", str(fiscal_year)], ["Net sales", str(revenue)], ["Net income", str(revenue // 4)]])
+    return {
+        "metadata": {"file_path": f"AAPL/10-K/{fiscal_year}.html", "doc_type": "10-K",
+                     "filing_date": f"{fiscal_year}-11-01", "ticker": "AAPL",
+                     "fiscal_year": str(fiscal_year), "fiscal_period": "FY"},
+        "sections": {},
+        "tables": [table],
+    }
+
+class TestIdentifyFiscalPeriod(unittest.TestCase):
+
+    def test_cover_page_facts_with_nested_tags(self):
+        html = (
+            '<div><ix:nonNumeric name="dei:DocumentPeriodEndDate" format="ixt:date-monthname-day-year-en">'
+            '<ix:nonNumeric name="dei:CurrentFiscalYearEndDate" format="ixt:date-monthname-day-en">September 28'
+            '</ix:nonNumeric>, 2024</ix:nonNumeric></div>'
+            '<span><ix:nonNumeric name="dei:DocumentFiscalPeriodFocus">FY</ix:nonNumeric></span>'
+        )
+        facts = FilingParser()._extract_dei_facts(BeautifulSoup(html, "html.parser"))
+        self.assertEqual(facts, {"DocumentPeriodEndDate": "September 28, 2024",
+                                 "CurrentFiscalYearEndDate": "September 28", "DocumentFiscalPeriodFocus": "FY"})
+        metadata = {"doc_type": "10-K", "period_end_date": facts["DocumentPeriodEndDate"],
+                    "fiscal_year_end": facts["CurrentFiscalYearEndDate"]}
+        self.assertEqual(identify_fiscal_period(metadata), (2024, "FY"))
+
+    def test_uses_cover_page_facts(self):
+        metadata = {"doc_type": "10-Q", "fiscal_year": "2024", "fiscal_period": "Q3"}
+        self.assertEqual(identify_fiscal_period(metadata), (2024, "Q3"))
+
+    def test_annual_report_is_full_year(self):
+        metadata = {"doc_type": "10-K", "fiscal_year": "2024", "fiscal_period": "Q4"}
+        self.assertEqual(identify_fiscal_period(metadata), (2024, "FY"))
+
+    def test_derives_quarter_from_period_end(self):
+        metadata = {"doc_type": "10-Q", "period_end_date": "December 28, 2024", "fiscal_year_end": "--09-28"}
+        self.assertEqual(identify_fiscal_period(metadata), (2025, "Q1"))
+
+    def test_unknown_period(self):
+        self.assertIsNone(identify_fiscal_period({"doc_type": "10-Q", "filing_date": "Unknown"}))
+
+class TestPeriodLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = PeriodLedger()
+        for fy in (2023, 2024):
+            for q, revenue in zip(("Q1", "Q2", "Q3"), (100.0, 80.0, 90.0)):
+                self.ledger.add(fy, q, {"revenue": revenue * (fy - 2022), "total_assets": 500.0}, key=f"{fy}{q}")
+
+    def test_derives_q4_from_annual(self):
+        self.ledger.add(2023, "FY", {"revenue": 400.0, "total_assets": 550.0}, key="2023FY")
+        self.assertEqual(self.ledger.quarter(2023, "Q4"), {"revenue": 130.0, "total_assets": 550.0})
+        self.assertIn((2023, "Q4"), self.ledger.derived)
+
+    def test_ttm_and_yoy_update_incrementally(self):
+        self.assertEqual(self.ledger.ttm(2024, "Q3"), {"total_assets": 500.0})
+
+        changed = self.ledger.add(2023, "FY", {"revenue": 400.0, "total_assets": 550.0}, key="2023FY")
+        self.assertIn((2023, "Q4"), changed)
+        # Q4 2023 (130) + Q1-Q3 2024 (200 + 160 + 180)
+        self.assertEqual(self.ledger.ttm(2024, "Q3")["revenue"], 670.0)
+        self.assertAlmostEqual(self.ledger.yoy(2024, "Q2")["revenue"], 1.0)
+
+    def test_duplicate_filing_is_ignored(self):
+        self.assertEqual(self.ledger.add(2024, "Q1", {"revenue": 1.0}, key="2024Q1"), [])
+        self.assertEqual(self.ledger.quarter(2024, "Q1")["revenue"], 200.0)
+
+    def test_year_to_date_cash_flows(self):
+        # Apple's fiscal 2024 10-Q cash flows are year-to-date (3, 6 and 9 months), added out of order
+        ledger = PeriodLedger()
+        ledger.add(2024, "Q3", {"revenue": 85777.0, "operating_cash_flow": 91443.0}, key="Q3")
+        self.assertNotIn("operating_cash_flow", ledger.quarter(2024, "Q3"))  # Q2 year-to-date unknown
+        ledger.add(2024, "Q1", {"revenue": 119575.0, "operating_cash_flow": 39895.0}, key="Q1")
+        changed = ledger.add(2024, "Q2", {"revenue": 90753.0, "operating_cash_flow": 62585.0}, key="Q2")
+        self.assertIn((2024, "Q3"), changed)
+        self.assertEqual(ledger.quarter(2024, "Q2")["operating_cash_flow"], 22690.0)
+        self.assertEqual(ledger.quarter(2024, "Q3")["operating_cash_flow"], 28858.0)
+
+        ledger.add(2024, "FY", {"revenue": 391035.0, "operating_cash_flow": 118254.0}, key="FY")
+        self.assertEqual(ledger.quarter(2024, "Q4")["operating_cash_flow"], 26811.0)
+        self.assertEqual(ledger.ttm(2024, "Q4")["operating_cash_flow"], 118254.0)
+
+    def test_annual_series_carries_growth(self):
+        self.ledger.add(2023, "FY", {"revenue": 400.0}, key="2023FY")
+        self.ledger.add(2024, "FY", {"revenue": 600.0}, key="2024FY")
+        series = self.ledger.annual_series()
+        self.assertEqual([row["fiscal_year"] for row in series], [2023, 2024])
+        self.assertAlmostEqual(series[-1]["revenue_growth"], 0.5)
+
+class TestAnalyzerPeriods(unittest.TestCase):
+
+    def test_periods_come_from_the_filings_passed(self):
+        analyzer = FinancialAnalyzer(metrics_cache_size=4)
+        filings = [annual_filing(year, 100 + 10 * i) for i, year in enumerate(range(2019, 2025))]
+        full = analyzer.analyze(filings)
+        self.assertEqual(len(full["periods"]), 6)
+        self.assertEqual(full["trend_basis"], "annual")
+
+        # A shorter history on the same (long-lived) analyzer matches a fresh one
+        latest_only = analyzer.analyze(filings[-1:])
+        fresh = FinancialAnalyzer().analyze(filings[-1:])
+        for key in ("periods", "trends", "trend_basis", "latest"):
+            self.assertEqual(latest_only[key], fresh[key])
+        self.assertEqual(len(latest_only["periods"]), 1)
+        self.assertEqual(latest_only["trend_basis"], "filings")
+        self.assertLessEqual(len(analyzer._metrics_cache), 4)
+
+    def test_metrics_cache_is_locked(self):
+        # Jobs share the analyzer; a lookup waits while another thread updates the cache
+        analyzer = FinancialAnalyzer()
+        filing = annual_filing(2024, 400)
+        analyzer.add_filing(filing)
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            with analyzer._cache_lock:
+                lookup = pool.submit(analyzer.add_filing, filing)
+                time.sleep(0.2)
+                self.assertFalse(lookup.done())
+            self.assertEqual(lookup.result(timeout=5)[0]["revenue"], 400.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# tests/test_insight_pipeline.py
+import time
+import unittest
+from agents.insight_pipeline import InsightPipeline
+from utils.prompt_builder import PromptBuilder
+
+class SlowLLM:
+    """Stand-in LLMManager with per-prompt delays"""
+
+    def __init__(self, delays):
+        self.delays = delays
+
+    def generate(self, prompt, max_tokens=800, timeout=None):
+        for marker, delay in self.delays.items():
+            if marker in prompt:
+                time.sleep(delay)
+                return f"analysis for {marker}"
+        return ""
+
+ANALYSIS = {
+    "financials": [{"revenue": 100.0}],
+    "latest": {"revenue": 100.0, "profit_margin": 0.25, "debt_to_equity": 0.4},
+    "trends": {"revenue_cagr": 0.1},
+}
+FILINGS = [{"metadata": {"doc_type": "10-K", "fiscal_year": "2024", "fiscal_period": "FY"},
+            "sections": {"risk_factors": "Supply chain concentration is a material risk."}}]
+
+class TestInsightPipeline(unittest.TestCase):
+
+    def test_calls_run_concurrently(self):
+        llm = SlowLLM({"investment insights": 0.3, "financial ratios": 0.3, "Risk Factors": 0.3})
+        pipeline = InsightPipeline(llm, PromptBuilder(), max_concurrency=3, timeout=5)
+
+        start = time.monotonic()
+        sections = pipeline.run("AAPL", ANALYSIS, FILINGS)
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertEqual(list(sections), ["Key Insights", "Ratio Analysis", "Risk Assessment"])
+        self.assertEqual(sections["Risk Assessment"], "analysis for Risk Factors")
+
+    def test_partial_results_on_timeout(self):
+        llm = SlowLLM({"investment insights": 0.0, "financial ratios": 1.0, "Risk Factors": 0.0})
+        pipeline = InsightPipeline(llm, PromptBuilder(), max_concurrency=3, timeout=0.3)
+
+        sections = pipeline.run("AAPL", ANALYSIS, FILINGS)
+        self.assertEqual(sections["Key Insights"], "analysis for investment insights")
+        self.assertIn("unavailable", sections["Ratio Analysis"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+# tests/test_insights.py
+import unittest
+import pandas as pd
+from agents.insights import InsightAgent
+
+class TestInsightAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.agent = InsightAgent()
+
+    def test_generate_insights(self):
+        insights = self.agent.generate_insights(
+            {"revenue_growth": 0.15, "profit_margin": 0.25},
+            {"revenue_trend": "increasing", "net_income_avg_growth": 0.02}
+        )
+        self.assertEqual(len(insights), 3)
+        self.assertIn("Revenue is on an upward trend, indicating positive growth.", insights)
+
+    def test_missing_metrics_do_not_fire(self):
+        self.assertEqual(self.agent.generate_insights({}, {}), [])
+
+    def test_evaluate_universe(self):
+        table = pd.DataFrame(
+            {"debt_to_equity": [0.3, 2.5, None], "net_income": [10.0, -5.0, 3.0]},
+            index=pd.Index(["AAA", "BBB", "CCC"], name="ticker")
+        )
+        alerts = self.agent.evaluate_universe(table)
+        self.assertEqual(sorted(alerts["rule"]), ["high_leverage", "net_loss"])
+        self.assertEqual(set(alerts["ticker"]), {"BBB"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# tests/test_job_service.py
+import time
+import threading
+import unittest
+from agents.job_service import JobService, DONE, FAILED
+
+class SlowOrchestrator:
+    """Stand-in for SECAnalysisOrchestrator that counts pipeline runs"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.use_cache = True
+        self.cache = {}
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def cache_key(self, ticker, years=None):
+        return ticker if years in (None, 5) else f"{ticker}.{years}Y"
+
+    def process_ticker(self, ticker, generate_narrative=True, refresh=False, progress=None, years=None):
+        with self._lock:
+            self.calls.append(ticker if years is None else (ticker, years))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        progress("Parsing filing 1 of 1", 0.5)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if ticker == "FAIL":
+            return {"error": "No SEC filings found for FAIL"}
+        results = {"ticker": ticker, "narrative_prompts": {"insights": "prompt"}}
+        self.cache[self.cache_key(ticker, years)] = results
+        return results
+
+    def generate_narrative(self, results):
+        yield "Key Insights", "text"
+        results["insight_sections"] = {"Key Insights": "text"}
+
+class TestJobService(unittest.TestCase):
+
+    def test_identical_requests_are_coalesced(self):
+        orchestrator = SlowOrchestrator()
+        service = JobService(orchestrator, max_workers=2)
+        jobs = [service.submit("aapl") for _ in range(10)]
+
+        self.assertEqual(len({job.id for job in jobs}), 1)
+        self.assertTrue(jobs[0].wait(5))
+        self.assertEqual(jobs[0].state, DONE)
+        self.assertEqual(jobs[0].subscribers, 10)
+        self.assertEqual(orchestrator.calls, ["AAPL"])
+
+        # Later requests are served from the cache without a worker
+        self.assertTrue(service.submit("AAPL").done)
+        self.assertEqual(orchestrator.calls, ["AAPL"])
+
+    def test_concurrency_is_capped(self):
+        orchestrator = SlowOrchestrator(delay=0.1)
+        service = JobService(orchestrator, max_workers=2)
+        jobs = [service.submit(ticker) for ticker in ["AAPL", "MSFT", "GOOGL", "AMZN", "FAIL"]]
+        for job in jobs:
+            self.assertTrue(job.wait(5))
+
+        self.assertEqual(orchestrator.peak, 2)
+        self.assertEqual(jobs[-1].state, FAILED)
+        self.assertIn("No SEC filings", jobs[-1].error)
+
+    def test_narrative_sections(self):
+        orchestrator = SlowOrchestrator(delay=0)
+        service = JobService(orchestrator)
+        job = service.submit("AAPL")
+        job.wait(5)
+
+        narrative = service.submit_narrative(job.result)
+        self.assertTrue(narrative.wait(5))
+        self.assertEqual(narrative.sections, {"Key Insights": "text"})
+        self.assertTrue(service.submit_narrative(job.result).done)
+
+    def test_years_are_cached_separately(self):
+        orchestrator = SlowOrchestrator(delay=0.1)
+        service = JobService(orchestrator, max_workers=2)
+        jobs = [service.submit("AAPL"), service.submit("AAPL", years=2), service.submit("AAPL", years=2)]
+        for job in jobs:
+            self.assertTrue(job.wait(5))
+
+        self.assertIs(jobs[1], jobs[2])
+        self.assertCountEqual(orchestrator.calls, ["AAPL", ("AAPL", 2)])
+        # The configured history shares the default entry
+        self.assertTrue(service.submit("AAPL", years=5).done)
+        self.assertTrue(service.submit("AAPL", years=2).done)
+        self.assertEqual(len(orchestrator.calls), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# tests/test_lexical_index.py
+import unittest
+import os
+import shutil
+from models.lexical_index import BM25Index, reciprocal_rank_fusion, encode_postings, decode_postings
+from array import array
+
+class TestBM25Index(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data/lexical"
+        self.index = BM25Index(path=os.path.join(self.test_dir, "AAPL_filings.bm25"))
+        self.index.add_documents(
+            ["k_mda_0", "k_mda_1", "k_notes_0"],
+            [
+                "Greater China net sales decreased due to lower iPhone sales.",
+                "Net sales in Europe increased. China and greater demand for services.",
+                "Term debt consists of fixed-rate notes with maturities through 2062."
+            ],
+            [{"section": "mda"}, {"section": "mda"}, {"section": "financial_statements"}],
+            group="10-K"
+        )
+        self.index.add_documents(["q_mda_0"], ["Term debt was unchanged during the quarter."],
+                                 [{"section": "mda"}], group="10-Q")
+
+    def tearDown(self):
+        if os.path.exists("test_data"):
+            shutil.rmtree("test_data")
+
+    def test_phrase_match_ranks_first(self):
+        hits = self.index.search("Greater China net sales", k=2)
+        self.assertEqual(hits[0][0], "k_mda_0")
+
+    def test_where_filter(self):
+        hits = self.index.search("term debt", where={"section": "financial_statements"})
+        self.assertEqual([doc_id for doc_id, _ in hits], ["k_notes_0"])
+
+    def test_remove_group_and_persist(self):
+        self.assertEqual(self.index.remove_group("10-Q"), 1)
+        self.index.save()
+
+        reloaded = BM25Index(path=self.index.path)
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual([doc_id for doc_id, _ in reloaded.search("term debt")], ["k_notes_0"])
+
+    def test_postings_round_trip(self):
+        postings = {0: array("I", [1, 5, 300]), 7: array("I", [0])}
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+        self.assertEqual([doc_id for doc_id, _ in fused], ["a", "c", "b"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# tests/test_llm_extractor.py
+import os
+import json
+import shutil
+import unittest
+import pandas as pd
+from agents.analyzer import FinancialAnalyzer
+from agents.llm_extractor import LLMMetricExtractor, metrics_schema, parse_answer
+from models.llm import LLMManager
+from utils.table_classifier import classify_tables
+
+# IFRS-style labels the table scan's search terms mostly miss
+INCOME = pd.DataFrame([
+    ["(In millions)", "", ""],
+    ["", "2024", "2023"],
+    ["Turnover", "$ 1,200", "$ 1,100"],
+    ["Cost of sales", "(700)", "(650)"],
+    ["Gross margin", "500", "450"],
+    ["Operating expenses", "(300)", "(280)"],
+    ["Profit from operations", "200", "170"],
+    ["Provision for income taxes", "(50)", "(40)"],
+    ["Profit for the year", "150", "130"],
+    ["Diluted", "1.50", "1.30"],
+])
+
+class FakeLLM:
+    """Stand-in LLMRouter answering with fixed JSON"""
+    model_name = "fake"
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def complete(self, prompt, temperature=0.7, max_tokens=800, timeout=None, task=None, schema=None):
+        self.calls.append({"prompt": prompt, "task": task, "schema": schema})
+        text = json.dumps(self.answer) if self.answer is not None else ""
+        return {"text": text, "prompt_tokens": len(prompt) // 4, "completion_tokens": 20, "route": "fast"}
+
+def make_filing():
+    tables = [pd.DataFrame([["Exhibit", "3.1"], ["Exhibit", "4.1"]]), INCOME]
+    return {
+        "metadata": {"file_path": "test_data/raw/0000000000-24-000001/primary-document.html", "doc_type": "10-K",
+                     "filing_date": "2024-11-01", "fiscal_year": "2024", "fiscal_period": "FY"},
+        "tables": tables,
+        "table_types": classify_tables(tables),
+        "sections": {"mda": "Turnover in fiscal 2024 rose. Revenue for 2024 was $1.3 billion, driven by services."},
+    }
+
+class TestLLMExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.cache_dir = os.path.join(self.test_dir, "extractions")
+        # A year and a number missing from the tables must both be rejected
+        self.answer = {"revenue": 1200, "net_income": 150, "operating_income": 2024, "total_assets": 9999}
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_one_validated_request_per_filing(self):
+        llm = FakeLLM(self.answer)
+        analyzer = FinancialAnalyzer(llm_extractor=LLMMetricExtractor(llm, cache_dir=self.cache_dir))
+        metrics = analyzer._extract_metrics(make_filing())
+
+        self.assertEqual(len(llm.calls), 1)
+        call = llm.calls[0]
+        self.assertEqual(call["task"], "extraction")
+        self.assertIn("Profit for the year | 150 | 130", call["prompt"])
+        self.assertNotIn("Exhibit", call["prompt"])
+        self.assertIn("net_income", call["schema"]["required"])
+        self.assertNotIn("gross_profit", call["schema"]["properties"])  # found by the table scan
+
+        self.assertEqual(metrics["revenue"], 1.2e9)
+        self.assertEqual(metrics["net_income"], 1.5e8)
+        self.assertEqual(metrics["gross_profit"], 5e8)
+        self.assertNotIn("operating_income", metrics)
+        self.assertNotIn("total_assets", metrics)
+
+        cost = analyzer.extraction_costs[make_filing()["metadata"]["file_path"]]
+        self.assertEqual((cost["calls"], cost["cached"], cost["route"]), (1, False, "fast"))
+        self.assertEqual(cost["metrics_found"], ["net_income", "revenue"])
+
+    def test_cached_by_table_hash(self):
+        FinancialAnalyzer(llm_extractor=LLMMetricExtractor(FakeLLM(self.answer), cache_dir=self.cache_dir)) \
+            .analyze([make_filing()])
+
+        llm = FakeLLM(self.answer)
+        results = FinancialAnalyzer(llm_extractor=LLMMetricExtractor(llm, cache_dir=self.cache_dir)) \
+            .analyze([make_filing()])
+        self.assertEqual(llm.calls, [])
+        self.assertEqual(results["latest"]["revenue"], 1.2e9)
+        cost = results["extraction_costs"][0]
+        self.assertTrue(cost["cached"])
+        self.assertEqual((cost["calls"], cost["prompt_tokens"], cost["doc_type"]), (0, 0, "10-K"))
+
+    def test_text_patterns_when_model_gives_no_answer(self):
+        analyzer = FinancialAnalyzer(llm_extractor=LLMMetricExtractor(FakeLLM(None), cache_dir=self.cache_dir))
+        metrics = analyzer._extract_metrics(make_filing())
+        self.assertEqual(metrics["revenue"], 1.3e9)  # the MD&A amount, not the year before it
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_text_patterns_only_when_model_gives_no_usable_answer(self):
+        # Every value rejected: the pattern fallback runs. A partial answer: its nulls stand.
+        cases = [({"operating_income": 2024, "total_assets": 9999}, {"revenue": 1.3e9}),
+                 ({"net_income": 150, "revenue": None}, {"net_income": 1.5e8})]
+        for i, (answer, expected) in enumerate(cases):
+            extractor = LLMMetricExtractor(FakeLLM(answer), cache_dir=os.path.join(self.cache_dir, str(i)))
+            analyzer = FinancialAnalyzer(llm_extractor=extractor)
+            metrics = analyzer._extract_metrics(make_filing())
+            self.assertEqual({k: v for k, v in metrics.items() if k in ("revenue", "net_income")}, expected)
+            self.assertNotIn("operating_income", metrics)
+
+    def test_stub_answers_schema(self):
+        schema = metrics_schema(["revenue", "capex"])
+        text = LLMManager(provider="stub").complete("Extract", schema=schema)["text"]
+        self.assertEqual(parse_answer(text), {"revenue": None, "capex": None})
+        self.assertEqual(parse_answer('Here you go: {"revenue": 5} '), {"revenue": 5})
+        self.assertIsNone(parse_answer("no JSON here"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_llm_router.py
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from models.llm import LLMManager, LLMRouter, Route, default_router, FAST_ROUTE, NARRATIVE_ROUTE
+
+class FailingManager:
+    """Stand-in LLMManager whose calls fail or return nothing"""
+    model_name = "broken"
+
+    def __init__(self, raise_error=False):
+        self.raise_error = raise_error
+        self.calls = 0
+
+    def complete(self, prompt, temperature=0.7, max_tokens=800, timeout=None):
+        self.calls += 1
+        if self.raise_error:
+            raise ConnectionError("model not loaded")
+        return {"text": "", "prompt_tokens": 0, "completion_tokens": 0}
+
+class CountingManager(LLMManager):
+    """Stub manager that records its peak concurrency"""
+
+    def __init__(self, latency):
+        super().__init__(provider="stub", model_name="counting", stub_latency=latency)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def complete(self, prompt, temperature=0.7, max_tokens=800, timeout=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().complete(prompt, temperature, max_tokens, timeout)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+class TestLLMRouter(unittest.TestCase):
+
+    def test_tasks_are_routed(self):
+        router = default_router(provider="stub", model_name="mistral", small_model="phi3")
+        self.assertTrue(router.generate("Classify this section", task="section_classification").startswith("[phi3 stub]"))
+        self.assertTrue(router.generate("Write insights").startswith("[mistral stub]"))
+        self.assertEqual(router.complete("Rewrite", task="query_rewrite")["route"], FAST_ROUTE)
+        self.assertEqual(router.model_name, "mistral")
+
+        single = default_router(provider="stub", model_name="mistral", small_model="")
+        self.assertEqual(list(single.routes), [NARRATIVE_ROUTE])
+        self.assertEqual(single.complete("Extract revenue", task="extraction")["route"], NARRATIVE_ROUTE)
+
+    def test_fallback_chain(self):
+        broken, empty = FailingManager(raise_error=True), FailingManager()
+        router = LLMRouter([
+            Route(FAST_ROUTE, broken, fallback=["backup"]),
+            Route("backup", empty, fallback=[NARRATIVE_ROUTE, FAST_ROUTE]),
+            Route(NARRATIVE_ROUTE, LLMManager(provider="stub", model_name="mistral")),
+        ])
+        self.assertEqual([r.name for r in router.chain(FAST_ROUTE)], [FAST_ROUTE, "backup", NARRATIVE_ROUTE])
+
+        result = router.complete("Extract revenue", task="extraction")
+        self.assertEqual(result["route"], NARRATIVE_ROUTE)
+        self.assertEqual((broken.calls, empty.calls), (1, 1))
+
+        stats = router.stats()
+        self.assertEqual(stats[FAST_ROUTE]["failures"], 1)
+        self.assertEqual(stats[NARRATIVE_ROUTE]["fallbacks"], 1)
+        self.assertEqual(stats[NARRATIVE_ROUTE]["calls"], 1)
+        self.assertGreater(stats[NARRATIVE_ROUTE]["tokens_per_sec"], 0)
+
+        with self.assertRaises(ValueError):
+            LLMRouter([Route(FAST_ROUTE, broken, fallback=["missing"])])
+
+    def test_route_concurrency_limit(self):
+        manager = CountingManager(latency=0.05)
+        router = LLMRouter([Route(NARRATIVE_ROUTE, manager, max_concurrency=2, timeout=5)])
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda i: router.generate(f"prompt {i}"), range(6)))
+
+        self.assertTrue(all(results))
+        self.assertEqual(manager.peak, 2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        stats = router.stats()[NARRATIVE_ROUTE]
+        self.assertEqual(stats["calls"], 6)
+        self.assertGreaterEqual(stats["p95_ms"], stats["p50_ms"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# tests/test_numeric_parser.py
+import unittest
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+from utils.numeric_parser import parse_numeric_series, parse_numeric_value, detect_table_scale, parse_table
+from agents.analyzer import FinancialAnalyzer
+from utils.sec_utils import extract_tables
+
+class TestNumericParser(unittest.TestCase):
+
+    def test_cell_formats(self):
+        cells = pd.Series(["$391,035", "(1,234)", "(1,234", ")", "-5.5", "—", "$ –", "12.5%",
+                           "(2.5)%", "391,035(1)", "(1)", "*", "n/a", None, 7])
+        expected = [391035, -1234, -1234, np.nan, -5.5, 0, 0, 0.125,
+                    -0.025, 391035, np.nan, np.nan, np.nan, np.nan, 7]
+        np.testing.assert_allclose(parse_numeric_series(cells).to_numpy(), expected)
+
+    def test_scale(self):
+        self.assertEqual(parse_numeric_series(pd.Series(["1,000", "50%"]), 1e6).tolist(), [1e9, 0.5])
+        self.assertEqual(parse_numeric_value("$1.2 billion"), 1.2e9)
+        self.assertEqual(parse_numeric_value("3 in thousands", scale=1e6), 3000.0)
+        self.assertIsNone(parse_numeric_value("Total net sales"))
+        self.assertIsNone(parse_numeric_value(float("nan")))
+
+    def test_detect_table_scale(self):
+        table = pd.DataFrame([["(In millions, except per-share amounts)", "", ""],
+                              ["Net sales", "$", "391,035"]])
+        self.assertEqual(detect_table_scale(table), 1e6)
+        self.assertEqual(detect_table_scale(pd.DataFrame([["Net sales", "10"]])), 1.0)
+        self.assertEqual(parse_table(table).shape, table.shape)
+
+    def test_scale_from_caption_above_table(self):
+        # EDGAR statements print the units in a block before the table's own wrapper div
+        rows = "".join(f"<tr><td>{label}</td><td>$</td><td>{value}</td></tr>"
+                       for label, value in [("", "2024"), ("Total net sales", "124,300"), ("Net income", "36,330")])
+        html = (
+            "<div><table><tr><td>Other</td><td>1</td></tr><tr><td>(In thousands)</td><td>2</td></tr></table></div>"
+            "<div>CONDENSED CONSOLIDATED STATEMENTS OF OPERATIONS</div>"
+            "<div>(In millions, except number of shares, which are reflected in thousands)</div><div></div>"
+            f"<div><table>{rows}</table></div><div><table>{rows}</table></div>"
+        )
+        captioned, uncaptioned = extract_tables(BeautifulSoup(html, "html.parser"))
+        self.assertIn("STATEMENTS OF OPERATIONS", captioned.attrs["caption"])
+        self.assertEqual(detect_table_scale(captioned), 1e6)
+        self.assertEqual(detect_table_scale(uncaptioned), 1.0)  # The caption belongs to the table before it
+
+        metrics = {}
+        FinancialAnalyzer()._extract_from_table(captioned, metrics)
+        self.assertEqual(metrics["revenue"], 124300e6)
+
+    def test_analyzer_takes_current_period(self):
+        # Header row first, the current year in the first value column, split "$" and ")" cells
+        table = pd.DataFrame([
+            ["Years ended (in millions)", "2024", "", "2023", ""],
+            ["Total net sales", "$", "391,035", "$", "383,285"],
+            ["Operating income", "", "123,216", "", "114,301"],
+            ["Other income/(expense), net", "", "(269", ")", "(565)"],
+            ["Net income", "$", "93,736", "$", "96,995"],
+        ])
+        metrics = {}
+        FinancialAnalyzer()._extract_from_table(table, metrics)
+
+        self.assertEqual(metrics["revenue"], 391035e6)
+        self.assertEqual(metrics["operating_income"], 123216e6)
+        self.assertEqual(metrics["net_income"], 93736e6)
+
+    def test_analyzer_text(self):
+        metrics = {}
+        sections = {"mda": "Total revenue for the year was $4.2 billion, up 8%."}
+        FinancialAnalyzer()._extract_from_text(sections, metrics)
+        self.assertEqual(metrics["revenue"], 4.2e9)
+
+        # A year between the term and the amount is not the amount
+        metrics = {}
+        FinancialAnalyzer()._extract_from_text({"mda": "Total revenue for fiscal 2024 was $4.2 billion"}, metrics)
+        self.assertEqual(metrics["revenue"], 4.2e9)
+        metrics = {}
+        FinancialAnalyzer()._extract_from_text({"mda": "Net income in 2024 rose 8% from 2023."}, metrics)
+        self.assertEqual(metrics, {})
+
+if __name__ == "__main__":
+    unittest.main()
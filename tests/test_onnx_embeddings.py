@@ -0,0 +1,84 @@
+# tests/test_onnx_embeddings.py
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from models.onnx_embeddings import OnnxEmbedder, mean_pool
+
+DIM = 4
+
+class FakeTokenizer:
+    """One token per word, id = word length, padded to the longest text in the batch"""
+
+    def enable_truncation(self, max_length):
+        self.max_length = max_length
+
+    def enable_padding(self):
+        pass
+
+    def encode_batch(self, texts):
+        ids = [[len(word) for word in text.split()][:self.max_length] for text in texts]
+        width = max(len(row) for row in ids)
+        return [
+            SimpleNamespace(ids=row + [0] * (width - len(row)), attention_mask=[1] * len(row) + [0] * (width - len(row)),
+                            type_ids=[0] * width)
+            for row in ids
+        ]
+
+class FakeSession:
+    """Token embedding = (id, 1, 0, 0); records the inputs of every run"""
+
+    def __init__(self):
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def get_outputs(self):
+        return [SimpleNamespace(shape=["batch", "sequence", DIM])]
+
+    def run(self, output_names, feed):
+        self.feeds.append(feed)
+        ids = feed["input_ids"].astype(np.float32)
+        hidden = np.zeros(ids.shape + (DIM,), dtype=np.float32)
+        hidden[..., 0] = ids
+        hidden[..., 1] = 1.0
+        hidden[..., 3] = 100.0 * (ids == 0)  # padding must not leak into the pooled vector
+        return [hidden]
+
+def expected(text):
+    lengths = [len(word) for word in text.split()]
+    vector = np.array([np.mean(lengths), 1.0, 0.0, 0.0])
+    return vector / np.linalg.norm(vector)
+
+class TestOnnxEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.session = FakeSession()
+        self.model = OnnxEmbedder(session=self.session, tokenizer=FakeTokenizer(), batch_size=2, max_length=8)
+
+    def test_mean_pool_ignores_padding(self):
+        hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [50.0, 50.0]]])
+        pooled = mean_pool(hidden, np.array([[1, 1, 0]]))
+        np.testing.assert_allclose(pooled, [[1.0, 0.0]])
+
+    def test_encode_keeps_order_across_length_batches(self):
+        texts = ["a much longer paragraph about revenue", "hi", "net sales grew", "ok then"]
+        embeddings = self.model.encode(texts)
+
+        self.assertEqual(embeddings.shape, (4, DIM))
+        self.assertEqual(embeddings.dtype, np.float32)
+        for text, vector in zip(texts, embeddings):
+            np.testing.assert_allclose(vector, expected(text), rtol=1e-5)
+        # Only the inputs the model declares are fed, in batches of similar length
+        self.assertEqual(set(self.session.feeds[0]), {"input_ids", "attention_mask"})
+        self.assertEqual([feed["input_ids"].shape for feed in self.session.feeds], [(2, 2), (2, 6)])
+
+    def test_single_text_and_dimension(self):
+        vector = self.model.encode("operating income")
+        self.assertEqual(vector.shape, (DIM,))
+        np.testing.assert_allclose(vector, expected("operating income"), rtol=1e-5)
+        self.assertEqual(self.model.get_sentence_embedding_dimension(), DIM)
+        self.assertEqual(self.model.encode([]).shape, (0, DIM))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# tests/test_prompt_builder.py
+import os
+import unittest
+from agents.analyzer import FinancialAnalyzer
+from agents.parser import FilingParser
+from config.prompts import FINANCIAL_INSIGHTS_PROMPT, RISK_ASSESSMENT_PROMPT
+from utils.prompt_builder import PromptBuilder, estimate_tokens, format_value, rank_facts, compress_text
+
+# Apple's Q1 fiscal 2025 10-Q, bundled with the repo
+AAPL_10Q = os.path.join(os.path.dirname(__file__), "..", "data", "filings", "sec-edgar-filings", "AAPL", "10-Q",
+                        "0000320193-25-000008", "primary-document.html")
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def test_format_value(self):
+        self.assertEqual(format_value("revenue", 391035000000.0), "$391.0B")
+        self.assertEqual(format_value("revenue_ttm", 391035000000.0), "$391.0B")
+        self.assertEqual(format_value("shares_outstanding", 15204137000.0), "15.2B")
+        self.assertEqual(format_value("employees", 164000), "164.0K")
+        self.assertEqual(format_value("gross_margin", 0.46206), "46.2%")
+        self.assertEqual(format_value("revenue_cagr", 0.0212345678901234), "2.1%")
+        self.assertEqual(format_value("debt_to_equity", 1.8712), "1.87x")
+        self.assertIsNone(format_value("net_income_volatility", float("nan")))
+
+    def test_rank_facts_orders_by_salience(self):
+        facts = rank_facts({
+            "rd_intensity": 0.08,
+            "revenue": 391e9,
+            "revenue_volatility": 0.12,
+            "fiscal_year": 2024
+        })
+        self.assertEqual(facts[0], "revenue: $391.0B")
+        self.assertEqual(len(facts), 3)
+
+    def test_compress_text_keeps_section_leads(self):
+        paragraphs = [
+            f"Risk {i} headline. Filler sentence without signal. "
+            f"A material adverse change could occur in {2020 + i}."
+            for i in range(200)
+        ]
+        text = "\n\n".join(paragraphs)
+        compressed = compress_text(text, 1200)
+        self.assertLessEqual(estimate_tokens(compressed), 1200)
+        self.assertIn("Risk 0 headline.", compressed)
+        self.assertIn("Risk 199 headline.", compressed)
+        self.assertNotIn("Filler sentence", compressed)
+
+    def test_build_respects_budget(self):
+        builder = PromptBuilder(model_name="mistral", max_tokens=500)
+        risk_text = " ".join(f"Supply chain risk number {i} could materially affect results." for i in range(500))
+        risk_changes = [f"[Risk Factors] New: Tariff exposure number {i} was added." for i in range(100)]
+        prompt = builder.build(RISK_ASSESSMENT_PROMPT, {"ticker": "AAPL", "risk_factors": risk_text,
+                                                        "risk_changes": risk_changes})
+        self.assertIn("AAPL", prompt)
+        self.assertLessEqual(estimate_tokens(prompt), 500)
+
+    def test_filing_amounts_keep_their_units(self):
+        # Statements state "(In millions)" above the table; the prompt must show dollars, not $124.3K
+        latest = FinancialAnalyzer().analyze([FilingParser().parse_filing(AAPL_10Q)])["latest"]
+        prompt = PromptBuilder().build(FINANCIAL_INSIGHTS_PROMPT, {
+            "ticker": "AAPL", "financial_metrics": rank_facts(latest), "financial_trends": [],
+        })
+        self.assertIn("revenue: $124.3B", prompt)
+        self.assertIn("net income: $36.3B", prompt)
+        self.assertIn("total assets: $344.1B", prompt)
+        self.assertIn("capex: -$2.9B", prompt)
+        self.assertNotIn("fiscal year end", prompt)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# tests/test_replay.py
+import os
+import shutil
+import unittest
+from datetime import datetime
+import numpy as np
+from agents.retriever import SECRetriever
+from models.llm import LLMManager, LLMRouter, Route, NARRATIVE_ROUTE
+from utils.replay import (
+    FixtureStore, FixtureMissing, ReplayDownloader, ReplayEmbeddingModel, ReplayLLM, results_digest, RECORD, REPLAY
+)
+
+class FakeDownloader:
+    """Writes one filing per call, the way sec-edgar-downloader lays them out"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.calls = 0
+
+    def get(self, form, ticker, **kwargs):
+        self.calls += 1
+        path = os.path.join(self.output_dir, "sec-edgar-filings", ticker, form, "0000320193-24-000123")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "primary-document.html"), "w") as f:
+            f.write(f"<html>{form} filing</html>")
+        return 1
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.arange(len(texts) * 4, dtype=np.float32).reshape(len(texts), 4)
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+def offline():
+    raise AssertionError("replay must not reach the live service")
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data"
+        self.fixture_dir = os.path.join(self.test_dir, "fixtures")
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_llm_calls(self):
+        recorder = FixtureStore(self.fixture_dir, mode=RECORD)
+        router = LLMRouter([Route(NARRATIVE_ROUTE, ReplayLLM(recorder, LLMManager(provider="stub", model_name="m")))])
+        recorded = router.complete("Summarize the risks", max_tokens=100)
+
+        store = FixtureStore(self.fixture_dir, mode=REPLAY)
+        replayed = ReplayLLM(store, LLMManager(provider="stub", model_name="m"))
+        replayed.manager.complete = lambda *args, **kwargs: offline()
+        self.assertEqual(replayed.complete("Summarize the risks", max_tokens=100, timeout=5)["text"], recorded["text"])
+        self.assertEqual(replayed.model_name, "m")
+        self.assertEqual(store.misses, [])
+
+        with self.assertRaises(FixtureMissing):
+            replayed.generate("A prompt that was never recorded")
+        self.assertEqual([kind for kind, _ in store.misses], ["llm"])
+
+    def test_embedding_calls(self):
+        encoder = FakeEncoder()
+        recorder = ReplayEmbeddingModel(FixtureStore(self.fixture_dir, mode=RECORD), "mini", loader=lambda: encoder)
+        recorded = recorder.encode(["first chunk", "second chunk"])
+        self.assertEqual(recorder.get_sentence_embedding_dimension(), 4)
+
+        replayer = ReplayEmbeddingModel(FixtureStore(self.fixture_dir, mode=REPLAY), "mini", loader=offline)
+        np.testing.assert_array_equal(replayer.encode(["first chunk", "second chunk"]), recorded)
+        self.assertEqual(replayer.get_sentence_embedding_dimension(), 4)
+        self.assertEqual(encoder.calls, 1)
+        with self.assertRaises(FixtureMissing):
+            replayer.encode(["another chunk"])
+
+    def test_edgar_downloads(self):
+        live_dir = os.path.join(self.test_dir, "live")
+        live = SECRetriever(output_dir=live_dir, use_archive=False)
+        live._dl = ReplayDownloader(FixtureStore(self.fixture_dir, mode=RECORD), live_dir,
+                                    loader=lambda: FakeDownloader(live_dir))
+        recorded = live.get_filings("AAPL", forms=["10-K"])
+
+        store = FixtureStore(self.fixture_dir, mode=REPLAY)
+        replay_dir = os.path.join(self.test_dir, "replay")
+        replay = SECRetriever(output_dir=replay_dir, use_archive=False, as_of=store.recorded_at)
+        replay._dl = ReplayDownloader(store, replay_dir, loader=offline)
+        replayed = replay.get_filings("AAPL", forms=["10-K"])
+
+        self.assertEqual([os.path.relpath(p, replay_dir) for p in replayed],
+                         [os.path.relpath(p, live_dir) for p in recorded])
+        with open(replayed[0]) as f:
+            self.assertEqual(f.read(), "<html>10-K filing</html>")
+        self.assertEqual(store.recorded_at.date(), datetime.now().date())
+
+    def test_results_digest_ignores_timestamps(self):
+        results = {"ticker": "AAPL", "analysis": {"chart_series": {"revenue": np.array([1.0, 2.0])}}, "processed_at": 1.0}
+        self.assertEqual(results_digest(results), results_digest({**results, "processed_at": 2.0}))
+        changed = {**results, "analysis": {"chart_series": {"revenue": np.array([1.0, 3.0])}}}
+        self.assertNotEqual(results_digest(results), results_digest(changed))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+# tests/test_reranker.py
+import unittest
+from models.reranker import CrossEncoderReranker
+
+class KeywordModel:
+    """Stand-in cross-encoder scoring pairs by keyword overlap"""
+
+    def __init__(self):
+        self.pairs_scored = 0
+
+    def predict(self, pairs, batch_size=16, show_progress_bar=False):
+        self.pairs_scored += len(pairs)
+        return [len(set(query.lower().split()) & set(text.lower().split())) for query, text in pairs]
+
+class TestCrossEncoderReranker(unittest.TestCase):
+
+    def setUp(self):
+        self.model = KeywordModel()
+        self.reranker = CrossEncoderReranker(top_n=3, batch_size=2, model=self.model)
+        self.results = [
+            {"id": "a", "document": "apple revenue overview"},
+            {"id": "b", "document": "term debt maturities and term debt covenants"},
+            {"id": "c", "document": "term debt"},
+            {"id": "d", "document": "term debt outside the top n"},
+        ]
+
+    def test_reranks_only_top_n(self):
+        reranked = self.reranker.rerank("term debt", self.results)
+        self.assertEqual([r["id"] for r in reranked], ["b", "c", "a", "d"])
+        self.assertNotIn("rerank_score", reranked[-1])
+        self.assertEqual(self.model.pairs_scored, 3)
+
+    def test_scores_are_cached(self):
+        self.reranker.rerank("term debt", self.results)
+        reranked = self.reranker.rerank("term debt", self.results, k=2)
+        self.assertEqual(len(reranked), 2)
+        self.assertEqual(self.model.pairs_scored, 3)
+
+    def test_reindexed_chunks_are_scored_again(self):
+        self.reranker.rerank("term debt", self.results)
+        # Re-indexing replaced chunk "a" with new text under the same id
+        reindexed = [{"id": "a", "document": "term debt repayments of term debt"}] + self.results[1:]
+        reranked = self.reranker.rerank("term debt", reindexed)
+        self.assertEqual(reranked[0]["id"], "a")
+        self.assertEqual(self.model.pairs_scored, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# tests/test_scheduler.py
+import os
+import shutil
+import unittest
+from agents.scheduler import PrecomputeWorker
+from utils.result_cache import ResultCache
+
+class FakeRetriever:
+    def __init__(self, accessions):
+        self.accessions = accessions
+
+    def get_latest_accessions(self, ticker, forms=None, limit=1):
+        return self.accessions.get(ticker, [])
+
+class FakeOrchestrator:
+    """Stand-in for SECAnalysisOrchestrator that records processed tickers"""
+
+    def __init__(self, cache, accessions):
+        self.cache = cache
+        self.retriever = FakeRetriever(accessions)
+        self.processed = []
+
+    def process_ticker(self, ticker, generate_narrative=True, refresh=False):
+        self.processed.append(ticker)
+        results = {"ticker": ticker, "filing_count": 1, "accessions": self.retriever.accessions.get(ticker, [])}
+        self.cache[ticker] = results
+        return results
+
+class TestPrecomputeWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data/results"
+        self.cache = ResultCache(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists("test_data"):
+            shutil.rmtree("test_data")
+
+    def test_processes_only_new_filings(self):
+        orchestrator = FakeOrchestrator(self.cache, {"AAPL": ["0000320193-24-000123"], "MSFT": ["0000950170-24-000001"]})
+        self.cache["MSFT"] = {"ticker": "MSFT", "accessions": ["0000950170-24-000001"]}
+
+        worker = PrecomputeWorker(orchestrator, ["aapl", "msft"])
+        self.assertEqual(worker.run_once(), ["AAPL"])
+        self.assertEqual(self.cache.get_status("AAPL")["state"], "ready")
+
+        # Nothing new on the next poll
+        self.assertEqual(worker.run_once(), [])
+        self.assertEqual(orchestrator.processed, ["AAPL"])
+
+        orchestrator.retriever.accessions["AAPL"] = ["0000320193-25-000001"]
+        self.assertEqual(worker.pending_accession("AAPL"), "0000320193-25-000001")
+
+    def test_cache_shared_across_instances(self):
+        self.cache["AAPL"] = {"ticker": "AAPL", "accessions": ["b", "a"]}
+        other = ResultCache(self.test_dir)
+        self.assertIn("AAPL", other)
+        self.assertEqual(other.get("AAPL")["accessions"], ["a", "b"])
+
+        other.set_status("AAPL", "processing", accession="c")
+        self.assertEqual(self.cache.get_status("AAPL")["accession"], "c")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# tests/test_screener.py
+import unittest
+import os
+import shutil
+from agents.screener import UniverseScreener, parse_filter
+
+def make_analysis(revenue, gross_profit, long_term_debt, total_equity, revenue_cagr):
+    latest = {
+        "revenue": revenue,
+        "gross_profit": gross_profit,
+        "gross_margin": gross_profit / revenue,
+        "debt_to_equity": long_term_debt / total_equity,
+        "filing_date": "2024-11-01",
+        "doc_type": "10-K"
+    }
+    return {"latest": latest, "trends": {"revenue_cagr": revenue_cagr, "revenue_trend": "increasing"}}
+
+class TestUniverseScreener(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data/processed"
+        self.screener = UniverseScreener(table_path=os.path.join(self.test_dir, "universe.pkl"))
+        self.screener.build(
+            {
+                "AAA": make_analysis(100.0, 60.0, 10.0, 100.0, 0.20),
+                "BBB": make_analysis(200.0, 50.0, 80.0, 100.0, 0.30),
+                "CCC": make_analysis(300.0, 150.0, 20.0, 100.0, 0.10),
+                "DDD": make_analysis(400.0, 100.0, 10.0, 100.0, 0.50),
+            },
+            sectors={"AAA": "Tech", "BBB": "Tech", "CCC": "Tech", "DDD": "Energy"}
+        )
+
+    def tearDown(self):
+        if os.path.exists("test_data"):
+            shutil.rmtree("test_data")
+
+    def test_parse_filter(self):
+        self.assertEqual(parse_filter("gross_margin > 40%"), ("gross_margin", ">", 0.4))
+        self.assertEqual(parse_filter("debt_to_equity<=0.5"), ("debt_to_equity", "<=", 0.5))
+        with self.assertRaises(ValueError):
+            parse_filter("gross_margin is high")
+
+    def test_screen_filters_and_ranks(self):
+        matches = self.screener.screen(
+            filters=["gross_margin > 40%", "debt_to_equity < 0.5"],
+            rank_by="revenue_cagr"
+        )
+        self.assertEqual(list(matches.index), ["AAA", "CCC"])
+
+    def test_sector_percentiles(self):
+        table = self.screener.table
+        self.assertAlmostEqual(table.at["BBB", "revenue_cagr_sector_pct"], 1.0)
+        self.assertAlmostEqual(table.at["DDD", "revenue_cagr_sector_pct"], 1.0)
+        self.assertAlmostEqual(table.at["CCC", "revenue_cagr_sector_pct"], 1 / 3)
+
+    def test_update_persists_and_reranks(self):
+        self.screener.update("EEE", make_analysis(500.0, 300.0, 0.0, 100.0, 0.90), sector="Tech")
+        reloaded = UniverseScreener(table_path=self.screener.table_path)
+        self.assertEqual(len(reloaded.table), 5)
+        self.assertAlmostEqual(reloaded.table.at["EEE", "revenue_cagr_sector_pct"], 1.0)
+        self.assertAlmostEqual(reloaded.table.at["BBB", "revenue_cagr_sector_pct"], 0.75)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_shard_router.py
+import os
+import shutil
+import unittest
+import numpy as np
+from models.shard_router import ShardRouter, hash_shard
+
+DIM = 16
+TICKERS = ["AAPL", "MSFT", "NVDA", "JPM", "XOM", "KO"]
+SECTORS = {"AAPL": "Technology", "MSFT": "Technology", "NVDA": "Technology", "JPM": "Financials"}
+
+def filing_chunks(ticker, n, rng):
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    ids = [f"{ticker}_{n}_{i}" for i in range(n)]
+    return ids, vectors, [f"{ticker} chunk {i}" for i in range(n)], [{"section": "risk_factors"} for _ in range(n)]
+
+class TestShardRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.root = "test_data/shards"
+        self.rng = np.random.default_rng(0)
+        self.vectors = {}
+        self.router = self.make_router()
+        for ticker in TICKERS:
+            for year, n in (("2023", 5), ("2024", 6)):
+                ids, vectors, documents, metadatas = filing_chunks(ticker, n, self.rng)
+                self.router.add_filing(ticker, f"{ticker}/{year}.html", ids, vectors, documents, metadatas,
+                                       filing_date=f"{year}-11-01")
+                self.vectors[(ticker, year)] = vectors
+        self.router.save()
+
+    def tearDown(self):
+        if os.path.exists("test_data"):
+            shutil.rmtree("test_data")
+
+    def make_router(self, **kwargs):
+        return ShardRouter(self.root, dim=DIM, num_shards=4, sectors=SECTORS, **kwargs)
+
+    def test_routing(self):
+        self.assertEqual(self.router.shard_for("msft"), "sector-technology")
+        self.assertEqual(self.router.shard_for("KO"), hash_shard("KO", 4))
+        self.assertLessEqual(self.router.stats()["shards"], 2 + 4)
+        self.assertEqual(self.router.stats()["filings"], 12)
+
+    def test_fan_out_and_filter(self):
+        query = self.vectors[("XOM", "2024")][2]
+        hits = self.router.search(query, k=5)
+        self.assertEqual(hits[0]["id"], "XOM_6_2")
+        self.assertEqual(hits[0]["metadata"]["ticker"], "XOM")
+        self.assertEqual(len(hits), 5)
+        self.assertTrue(all(a["score"] >= b["score"] for a, b in zip(hits, hits[1:])))
+
+        hits = self.router.search(query, k=20, tickers=["aapl", "jpm"])
+        self.assertEqual({hit["metadata"]["ticker"] for hit in hits}, {"AAPL", "JPM"})
+        self.assertEqual({hit["shard"] for hit in hits}, {"sector-technology", "sector-financials"})
+
+    def test_lifecycle_survives_reload(self):
+        # Re-indexing a filing replaces its chunks
+        ids, vectors, documents, metadatas = filing_chunks("KO", 3, self.rng)
+        self.router.add_filing("KO", "KO/2024.html", ids, vectors, documents, metadatas, filing_date="2024-11-01")
+        self.assertEqual(self.router.remove_filing("KO/2024.html"), 3)
+        self.assertEqual(self.router.remove_ticker("JPM"), 11)
+        # KO's 2023 filing is now its latest and is kept
+        self.assertEqual(self.router.prune(keep_latest=1), 5 * 4)
+        sizes = self.router.compact()
+
+        self.assertNotIn("sector-financials", sizes)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "sector-financials")))
+        self.assertEqual(sum(sizes.values()), 6 * 4 + 5)
+
+        reloaded = self.make_router()
+        self.assertEqual(reloaded.stats()["filings"], 5)
+        self.assertEqual(reloaded.search(self.vectors[("AAPL", "2024")][0], k=1)[0]["id"], "AAPL_6_0")
+        self.assertEqual(reloaded.search(self.vectors[("AAPL", "2023")][0], k=3, tickers=["JPM"]), [])
+
+    def test_memory_budget(self):
+        router = self.make_router(memory_budget=1)
+        router.search(self.vectors[("KO", "2023")][0], k=3)
+        # Shards needed by a query stay loaded for it; the budget is enforced on the next load
+        router.load_shard("sector-technology")
+        self.assertEqual(router.stats()["loaded"], ["sector-technology"])
+
+if __name__ == "__main__":
+    unittest.main()
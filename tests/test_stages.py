@@ -0,0 +1,174 @@
+# tests/test_stages.py
+import time
+import unittest
+import pandas as pd
+from types import SimpleNamespace
+from agents.analyzer import FinancialAnalyzer
+from agents.parser import FilingParser
+from agents.stages import STAGES, get_stage, register_stage
+from config.settings import PipelineSettings
+from utils.result_cache import MemoryResultCache, get_result_cache, cache_key
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = []
+
+    def get_filings(self, ticker, years=1, forms=None, limit=10, download=True):
+        self.calls.append((ticker, years, forms, limit))
+        return [f"{ticker}/10-K/{i}/primary-document.html" for i in range(3)]
+
+class FakeParser:
+    def parse_filings(self, file_paths, progress=None):
+        for i in range(len(file_paths)):
+            progress(i, len(file_paths))
+        return [{"metadata": {"file_path": path}, "sections": {}} for path in file_paths]
+
+class YearsRetriever:
+    """One annual report per fiscal year, the latest (2024) first"""
+
+    def get_filings(self, ticker, years=1, forms=None, limit=10, download=True):
+        return [f"{ticker}/10-K/{2024 - i}.html" for i in range(years)]
+
+class AnnualReportParser:
+    """Parsed 10-K whose income statement grows with the fiscal year named in the path"""
+
+    def parse_filings(self, file_paths, progress=None):
+        parsed = []
+        for path in file_paths:
+            year = int(path.rsplit("/", 1)[1].split(".")[0])
+            revenue = 100 * (year - 2015)
+            table = pd.DataFrame([["", str(year)], ["Net sales", str(revenue)], ["Net income", str(revenue // 4)]])
+            parsed.append({
+                "metadata": {"file_path": path, "doc_type": "10-K", "filing_date": f"{year}-11-01",
+                             "ticker": "AAPL", "fiscal_year": str(year), "fiscal_period": "FY"},
+                "sections": {},
+                "tables": [table],
+            })
+        return parsed
+
+class FakeAnalyzer:
+    def analyze(self, parsed):
+        return {"financials": [{"revenue": 1.0}] * len(parsed), "latest": {"revenue": 1.0}, "trends": {}}
+
+class SlowParser(FilingParser):
+    def parse_filing(self, file_path):
+        time.sleep(0.05 if file_path.endswith("0") else 0.0)
+        return {"metadata": {"file_path": file_path}}
+
+def fake_orchestrator(settings):
+    return SimpleNamespace(
+        settings=settings,
+        retriever=FakeRetriever(),
+        parser=FakeParser(),
+        analyzer=FakeAnalyzer(),
+        insight_agent=SimpleNamespace(generate_insights=lambda latest, trends: ["Revenue is positive."]),
+        differ=SimpleNamespace(diff_latest=lambda parsed: None),
+        embedding_manager=None,
+    )
+
+class TestPipelineSettings(unittest.TestCase):
+
+    def test_override_ignores_none(self):
+        settings = PipelineSettings().override(
+            llm={"model": "llama3", "provider": None}, retrieval={"years": 2}, stages=["retrieve", "parse"]
+        )
+        self.assertEqual(settings.llm.model, "llama3")
+        self.assertEqual(settings.llm.provider, PipelineSettings().llm.provider)
+        self.assertEqual(settings.retrieval.years, 2)
+        self.assertEqual(settings.stages, ("retrieve", "parse"))
+        self.assertEqual(settings.to_dict()["retrieval"]["years"], 2)
+
+    def test_embedding_index_settings(self):
+        self.assertEqual(PipelineSettings().override(embedding={"hnsw_m": 0, "hnsw_construction_ef": 0,
+                                                                "hnsw_search_ef": 0}).embedding.hnsw_params(), {})
+        embedding = PipelineSettings().override(
+            embedding={"quantization": "int8", "rerank_candidates": 80, "hnsw_m": 32, "hnsw_search_ef": 0}
+        ).embedding
+        self.assertEqual((embedding.quantization, embedding.rerank_candidates), ("int8", 80))
+        self.assertEqual(embedding.hnsw_params().get("M"), 32)
+        self.assertNotIn("search_ef", embedding.hnsw_params())
+        embedding = PipelineSettings().override(
+            embedding={"reranker": "cross-encoder/ms-marco-MiniLM-L-6-v2", "rerank_top_n": 10}
+        ).embedding
+        self.assertEqual((embedding.reranker, embedding.rerank_top_n), ("cross-encoder/ms-marco-MiniLM-L-6-v2", 10))
+
+    def test_chunk_overlap_must_be_below_chunk_size(self):
+        settings = PipelineSettings().override(embedding={"chunk_size": 500, "chunk_overlap": 0})
+        self.assertEqual(settings.embedding.chunk_overlap, 0)
+        for overlap in (500, 800, -1):
+            with self.assertRaises(ValueError):
+                PipelineSettings().override(embedding={"chunk_size": 500, "chunk_overlap": overlap})
+
+    def test_cache_backends(self):
+        cache = get_result_cache("memory")
+        self.assertIsInstance(cache, MemoryResultCache)
+        cache[cache_key("aapl", 3)] = {"ticker": "AAPL", "accessions": ["b", "a"]}
+        self.assertIn("AAPL.3Y", cache)
+        self.assertNotIn("AAPL", cache)
+        self.assertEqual(cache.get("AAPL.3Y")["accessions"], ["a", "b"])
+        cache.set_status("AAPL", "ready")
+        self.assertEqual(cache.get_status("aapl")["state"], "ready")
+        with self.assertRaises(ValueError):
+            get_result_cache("redis")
+
+class TestStages(unittest.TestCase):
+
+    def test_default_stages_use_settings(self):
+        settings = PipelineSettings().override(retrieval={"forms": ["10-K"], "max_filings": 4})
+        orchestrator = fake_orchestrator(settings)
+        stages = []
+        context = {"ticker": "AAPL", "years": 3, "report": lambda stage, fraction: stages.append(stage)}
+        for name in ("retrieve", "parse", "analyze", "diff"):
+            self.assertIsNone(get_stage(name)(orchestrator, context))
+
+        self.assertEqual(orchestrator.retriever.calls, [("AAPL", 3, ["10-K"], 4)])
+        self.assertEqual(len(context["parsed_filings"]), 3)
+        self.assertEqual(context["quick_insights"], ["Revenue is positive."])
+        self.assertIn("Parsing filing 3 of 3", stages)
+
+    def test_years_change_the_analysis(self):
+        # The same analyzer serves every request, as in the orchestrator
+        orchestrator = fake_orchestrator(PipelineSettings())
+        orchestrator.retriever = YearsRetriever()
+        orchestrator.parser = AnnualReportParser()
+        orchestrator.analyzer = FinancialAnalyzer()
+
+        def run(years):
+            context = {"ticker": "AAPL", "years": years, "report": lambda stage, fraction: None}
+            for name in ("retrieve", "parse", "analyze"):
+                get_stage(name)(orchestrator, context)
+            return context["analysis"]
+
+        five_years = run(5)
+        one_year = run(1)
+        self.assertEqual(len(five_years["periods"]), 5)
+        self.assertEqual(len(one_year["periods"]), 1)
+        self.assertEqual(one_year["periods"], FinancialAnalyzer().analyze(
+            orchestrator.parser.parse_filings(orchestrator.retriever.get_filings("AAPL", years=1)))["periods"])
+        self.assertEqual(run(5)["trends"], five_years["trends"])
+
+    def test_registry(self):
+        with self.assertRaises(ValueError):
+            get_stage("missing")
+
+        @register_stage("count_filings")
+        def count_filings(orchestrator, context):
+            context["count"] = len(context["filings"])
+
+        try:
+            context = {"filings": ["a", "b"]}
+            get_stage("count_filings")(None, context)
+            self.assertEqual(context["count"], 2)
+        finally:
+            del STAGES["count_filings"]
+
+    def test_parallel_parse_keeps_order(self):
+        paths = [f"filing-{i}" for i in range(6)]
+        started = []
+        parser = SlowParser(max_workers=3)
+        parsed = parser.parse_filings(paths, progress=lambda i, total: started.append(i))
+        self.assertEqual([doc["metadata"]["file_path"] for doc in parsed], paths)
+        self.assertEqual(sorted(started), list(range(6)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# tests/test_table_classifier.py
+import unittest
+import pandas as pd
+from bs4 import BeautifulSoup
+from utils.sec_utils import extract_tables
+from utils.table_classifier import (
+    INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW, SEGMENT, OTHER, classify_table, classify_tables, index_tables
+)
+from agents.analyzer import FinancialAnalyzer
+
+def make_table(labels, value="100"):
+    return pd.DataFrame([["", "2024", "2023"]] + [[label, value, "90"] for label in labels])
+
+INCOME = make_table(["Net sales", "Cost of sales", "Gross margin", "Research and development",
+                     "Operating income", "Provision for income taxes", "Net income", "Diluted"])
+BALANCE = make_table(["ASSETS:", "Current assets:", "Cash and cash equivalents", "Accounts receivable, net",
+                      "Inventories", "Total current assets", "Total assets", "Total liabilities",
+                      "Total shareholders’ equity"], value="500")
+CASH = make_table(["Operating activities:", "Net income", "Depreciation and amortization",
+                   "Cash generated by operating activities", "Investing activities:", "Financing activities:"])
+SEGMENTS = make_table(["Americas", "Europe", "Greater China", "Japan", "Rest of Asia Pacific"])
+EXHIBITS = make_table(["Exhibit Number", "3.1", "4.1", "10.1"])
+
+class TestTableClassifier(unittest.TestCase):
+
+    def test_classify(self):
+        tables = [INCOME, BALANCE, CASH, SEGMENTS, EXHIBITS, pd.DataFrame()]
+        self.assertEqual(classify_tables(tables),
+                         [INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW, SEGMENT, OTHER, OTHER])
+        self.assertEqual(index_tables(tables)[OTHER], [4, 5])
+
+    def test_index_uses_stored_tags(self):
+        self.assertEqual(index_tables([INCOME], [CASH_FLOW]), {CASH_FLOW: [0]})
+        # Tags that no longer line up with the tables are recomputed
+        self.assertEqual(index_tables([INCOME, EXHIBITS], [CASH_FLOW]), {INCOME_STATEMENT: [0], OTHER: [1]})
+
+    def test_analyzer_searches_statement_tables(self):
+        # A segment table listed first would otherwise supply "net sales" for one region
+        segment = pd.DataFrame([["", "2024"], ["Americas:", ""], ["Net sales", "7"], ["Europe", "3"],
+                                ["Greater China", "2"], ["Japan", "1"]])
+        filing = {"tables": [segment, INCOME, BALANCE, CASH], "sections": {}}
+        filing["table_types"] = classify_tables(filing["tables"])
+
+        metrics = FinancialAnalyzer()._extract_metrics(filing)
+        self.assertEqual(metrics["revenue"], 100)
+        self.assertEqual(metrics["total_assets"], 500)
+        self.assertEqual(metrics["operating_cash_flow"], 100)
+
+    def test_untagged_statement_falls_back_to_other_tables(self):
+        # A condensed balance sheet scores below the classifier's threshold
+        condensed = make_table(["Total assets", "Total shareholders' equity"], value="700")
+        filing = {"tables": [INCOME, EXHIBITS, condensed], "sections": {}}
+        filing["table_types"] = classify_tables(filing["tables"])
+        self.assertEqual(filing["table_types"][2], OTHER)
+
+        metrics = FinancialAnalyzer()._extract_metrics(filing)
+        self.assertEqual(metrics["revenue"], 100)
+        self.assertEqual(metrics["total_assets"], 700)
+        self.assertEqual(metrics["total_equity"], 700)
+
+    def test_statement_heading_rows_are_kept(self):
+        html = "<table>" + "".join(
+            f"<tr>{''.join(f'<td>{cell}</td>' for cell in row)}</tr>"
+            for row in [["", "2024"], ["ASSETS:"], ["Total current assets", "10"], ["Total assets", "20"]]
+        ) + "</table>"
+        tables = extract_tables(BeautifulSoup(html, "html.parser"))
+        self.assertEqual(len(tables), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# tests/test_ticker_map.py
+import os
+import json
+import shutil
+import unittest
+from utils.ticker_map import TickerMap
+from utils.sec_utils import validate_ticker
+
+COMPANY_TICKERS = {
+    "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "1": {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+    "2": {"cik_str": 1067983, "ticker": "BRK-B", "title": "BERKSHIRE HATHAWAY INC"},
+}
+
+class TestTickerMap(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.source = os.path.join(self.test_dir, "company_tickers.json")
+        with open(self.source, "w") as f:
+            json.dump(COMPANY_TICKERS, f)
+        self.index_path = os.path.join(self.test_dir, "ticker_map.pkl")
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_seed_is_incomplete(self):
+        ticker_map = TickerMap(index_path=self.index_path, seed_path=self.source)
+        self.assertEqual(ticker_map.get_cik("aapl"), "0000320193")
+        self.assertIsNone(ticker_map.get_cik("ZZZZ"))
+        self.assertFalse(ticker_map.complete)
+        # Unknown tickers still pass format validation until the map is complete
+        self.assertTrue(validate_ticker("ZZZZ", ticker_map))
+
+    def test_refresh_and_validate(self):
+        TickerMap(index_path=self.index_path, seed_path="missing.json").refresh(self.source)
+
+        ticker_map = TickerMap(index_path=self.index_path, seed_path="missing.json")
+        self.assertTrue(ticker_map.complete)
+        self.assertEqual(len(ticker_map), 3)
+        self.assertTrue(validate_ticker("BRK-B", ticker_map))
+        self.assertFalse(validate_ticker("ZZZZ", ticker_map))
+        self.assertFalse(validate_ticker("invalid ticker", ticker_map))
+
+    def test_search(self):
+        ticker_map = TickerMap(index_path=self.index_path, seed_path=self.source)
+        self.assertEqual(ticker_map.search("micro")[0][0], "MSFT")
+        self.assertEqual(ticker_map.search("Berkshire Hathaway")[0][0], "BRK-B")
+        self.assertEqual(ticker_map.search("Aple")[0][0], "AAPL")
+        self.assertEqual(ticker_map.search("aapl")[0], ("AAPL", "Apple Inc."))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# tests/test_vector_store.py
+import unittest
+import os
+import shutil
+import numpy as np
+from models.vector_store import QuantizedVectorStore
+
+class TestQuantizedVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_data/quantized"
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(200, 32)).astype(np.float32)
+        self.ids = [f"chunk_{i}" for i in range(200)]
+        self.metadatas = [{"file_path": f"filing_{i % 4}"} for i in range(200)]
+
+    def tearDown(self):
+        if os.path.exists("test_data"):
+            shutil.rmtree("test_data")
+
+    def make_store(self, dtype):
+        store = QuantizedVectorStore(os.path.join(self.test_dir, dtype), dim=32, dtype=dtype, rerank_candidates=20)
+        store.add(self.ids, self.vectors, [f"text {i}" for i in range(200)], self.metadatas)
+        return store
+
+    def test_exact_rerank_finds_nearest(self):
+        for dtype in ("int8", "float16"):
+            store = self.make_store(dtype)
+            hits = store.query(self.vectors[17], k=3)
+            self.assertEqual(hits[0]["id"], "chunk_17")
+            self.assertAlmostEqual(hits[0]["score"], 1.0, places=5)
+
+    def test_delete_and_reload(self):
+        store = self.make_store("int8")
+        self.assertEqual(store.delete(where={"file_path": "filing_1"}), 50)
+        store.save()
+
+        reloaded = QuantizedVectorStore(store.path, dim=32, dtype="int8")
+        self.assertEqual(len(reloaded), 150)
+        self.assertNotEqual(reloaded.query(self.vectors[17], k=1)[0]["id"], "chunk_17")
+        self.assertEqual(reloaded.query(self.vectors[18], k=1, where={"file_path": "filing_2"})[0]["id"], "chunk_18")
+        self.assertEqual(reloaded.get(["chunk_18"])["documents"], ["text 18"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,14 +2,25 @@
 # ui/app.py
 import os
 import sys
+import json
+import time
 # Add the parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-from agents.orchestrator import SECAnalysisOrchestrator
-from ui.components import render_metrics_cards, render_insights_section
-from ui.visualization import create_financial_timeline, create_ratio_chart
+from ui.services import get_job_service
+from agents.insight_pipeline import ANALYSES
+from utils.ticker_map import get_ticker_map
+from ui.components import render_metrics_cards, render_insights_section, render_quick_insights, render_filing_diff
+from ui.visualization import figure_json
+from utils.chart_series import build_chart_series
+from utils.result_cache import results_version
+
+@st.cache_data(max_entries=128)
+def cached_figure(ticker, version, kind, _chart_series):
+    """Plotly figure JSON per ticker, results version and chart; reruns and tab switches reuse it"""
+    return json.loads(figure_json(_chart_series, kind))
 
 def main():
     st.set_page_config(
@@ -18,8 +29,9 @@ def main():
         layout="wide"
     )
     
-    # Initialize the orchestrator with caching
-    orchestrator = SECAnalysisOrchestrator(use_cache=True)
+    # Shared job service; identical in-flight requests are computed once
+    job_service = get_job_service()
+    orchestrator = job_service.orchestrator
     
     # App header
     st.title("Financial Insights from SEC Filings")
@@ -32,10 +44,15 @@ def main():
     with st.sidebar:
         st.header("Company Selection")
         ticker = st.text_input("Enter Ticker Symbol", "AAPL").upper()
+        company_query = st.text_input("Find a ticker by company name", "")
+        if company_query:
+            for match_ticker, title in get_ticker_map().search(company_query):
+                st.caption(f"{match_ticker} — {title}")
         
         # Analysis parameters
         st.subheader("Analysis Parameters")
-        years = st.slider("Years of History", min_value=1, max_value=5, value=5)
+        default_years = orchestrator.settings.retrieval.years
+        years = st.slider("Years of History", min_value=1, max_value=max(5, default_years), value=default_years)
         
         analyze_button = st.button("Analyze SEC Filings", type="primary")
         
@@ -51,11 +68,20 @@ def main():
     
     # Main content
     if analyze_button:
-        with st.spinner(f"Analyzing SEC filings for {ticker}... This may take a minute."):
-            results = orchestrator.process_ticker(ticker)
-            
-            # Store results in session state for persistence
-            st.session_state.results = results
+        # The LLM narrative is generated after the first render
+        st.session_state.job_id = job_service.submit(ticker, years=years).id
+        st.session_state.results = None
+    
+    job = job_service.get(st.session_state.get('job_id'))
+    if job is not None and not st.session_state.get('results'):
+        if not job.done:
+            progress_bar = st.progress(job.progress, text=f"Analyzing SEC filings for {job.ticker}...")
+            while not job.wait(timeout=0.5):
+                progress_bar.progress(job.progress, text=f"{job.ticker}: {job.stage}")
+            progress_bar.empty()
+        
+        # Store results in session state for persistence
+        st.session_state.results = job.result or {"error": f"Error analyzing {job.ticker}: {job.error}"}
     
     # Display results if available (either from button click or session state)
     if hasattr(st.session_state, 'results') and st.session_state.results:
@@ -65,8 +91,18 @@ def main():
         if 'error' in results:
             st.error(results['error'])
         else:
+            # Flag a newer filing the precompute worker has not finished with
+            status = orchestrator.cache.get_status(results['ticker'])
+            if status.get('state') == 'processing' and status.get('accession') not in results.get('accessions', []):
+                st.info(
+                    f"A newer filing ({status.get('accession') or 'pending'}) is still being processed. "
+                    "Showing the previous analysis; click Analyze again once it completes."
+                )
+            if results.get('processed_at'):
+                st.caption(f"Analysis computed {time.strftime('%Y-%m-%d %H:%M', time.localtime(results['processed_at']))}")
+
             # Create tabs for different views
-            tabs = st.tabs(["Key Metrics", "Financial Trends", "Investment Insights"])
+            tabs = st.tabs(["Key Metrics", "Financial Trends", "Investment Insights", "What Changed", "Ask the Filings"])
             
             with tabs[0]:
                 st.header(f"Key Financial Metrics: {results['ticker']}")
@@ -82,18 +118,20 @@ def main():
             with tabs[1]:
                 st.header(f"Financial Performance Trends: {results['ticker']}")
                 
-                # Convert financials to DataFrame for plotting
+                # Charts are built from the precomputed series and cached per results version
                 if results['analysis']['financials']:
-                    financials_df = pd.DataFrame(results['analysis']['financials'])
+                    chart_series = results['analysis'].get('chart_series') or \
+                        build_chart_series(results['analysis']['financials'])
+                    version = results_version(results)
                     
                     # Timeline of key metrics
                     st.subheader("Revenue and Profitability")
-                    timeline_chart = create_financial_timeline(financials_df)
+                    timeline_chart = cached_figure(results['ticker'], version, "timeline", chart_series)
                     st.plotly_chart(timeline_chart, use_container_width=True)
                     
                     # Financial ratios
                     st.subheader("Financial Ratios")
-                    ratio_chart = create_ratio_chart(financials_df)
+                    ratio_chart = cached_figure(results['ticker'], version, "ratios", chart_series)
                     st.plotly_chart(ratio_chart, use_container_width=True)
                     
                     # Trend summary table
@@ -115,13 +153,89 @@ def main():
             
             with tabs[2]:
                 st.header(f"Investment Insights: {results['ticker']}")
-                render_insights_section(results['insights'])
+                
+                # Rule-based highlights are available instantly
+                st.subheader("Highlights")
+                render_quick_insights(results.get('quick_insights', []))
+                
+                if 'insight_sections' not in results:
+                    # Show each LLM analysis as soon as the shared narrative job completes it
+                    narrative_job = job_service.submit_narrative(results)
+                    prompts = results.get('narrative_prompts', {})
+                    slots = {title: st.empty() for key, title in ANALYSES if key in prompts}
+                    for slot in slots.values():
+                        slot.info("Generating analysis...")
+                    while slots:
+                        finished = narrative_job.wait(timeout=0.5)
+                        for title, text in list(narrative_job.sections.items()):
+                            if title in slots and not finished:
+                                with slots.pop(title).container():
+                                    st.subheader(title)
+                                    render_insights_section(text)
+                        if finished:
+                            break
+                    sections = narrative_job.sections
+                    for title, slot in slots.items():
+                        if title in sections and "unavailable" not in sections[title]:
+                            with slot.container():
+                                st.subheader(title)
+                                render_insights_section(sections[title])
+                        else:
+                            slot.warning(sections.get(title, f"{title} is unavailable."))
+                    results['insight_sections'] = sections
+                    results['insights'] = sections.get("Key Insights", "")
+                else:
+                    for title, text in results['insight_sections'].items():
+                        st.subheader(title)
+                        render_insights_section(text)
                 
                 # Additional context about the analysis
                 with st.expander("Analysis Context"):
                     st.write(f"This analysis is based on {results['filing_count']} SEC filings.")
                     filing_dates = [f['filing_date'] for f in results['analysis']['financials']]
                     st.write(f"Filing dates analyzed: {', '.join(filing_dates)}")
+            
+            with tabs[3]:
+                st.header(f"What Changed: {results['ticker']}")
+                render_filing_diff(results.get('filing_diff'))
+            
+            with tabs[4]:
+                st.header(f"Ask the Filings: {results['ticker']}")
+                
+                # One session per browser tab and results version; it keeps the conversation,
+                # the loaded collection and cached retrievals between questions
+                session_key = (results['ticker'], results_version(results))
+                if st.session_state.get('chat_key') != session_key:
+                    st.session_state.chat_key = session_key
+                    st.session_state.chat = orchestrator.create_chat_session(results['ticker'], results)
+                chat = st.session_state.chat
+                
+                for turn in chat.history:
+                    with st.chat_message("user"):
+                        st.markdown(turn['question'])
+                    with st.chat_message("assistant"):
+                        st.markdown(turn['answer'])
+                
+                with st.form("chat_form", clear_on_submit=True):
+                    question = st.text_input("Ask a follow-up question about these filings")
+                    asked = st.form_submit_button("Ask")
+                
+                if asked and question.strip():
+                    with st.chat_message("user"):
+                        st.markdown(question)
+                    with st.chat_message("assistant"):
+                        with st.spinner("Searching filings..."):
+                            reply = chat.ask(question)
+                        st.markdown(reply['answer'])
+                        with st.expander("Sources"):
+                            for source in reply['sources']:
+                                st.caption(f"{source['doc_type']} {source['filing_date']} · "
+                                           f"{str(source['section']).replace('_', ' ')}")
+                                st.text(source['excerpt'])
+                
+                if chat.history and st.button("Clear conversation"):
+                    chat.reset()
+                    st.rerun()
 
 if __name__ == "__main__":
     main()
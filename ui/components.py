@@ -48,6 +48,55 @@ def render_insights_section(insights):
             st.markdown(point)
             st.markdown("---")
 
+def render_quick_insights(insights):
+    """Render rule-based insights as a bullet list"""
+    if not insights:
+        st.info("No rule-based highlights for this company.")
+        return
+    
+    st.markdown("\n".join(f"- {insight}" for insight in insights))
+
+def render_filing_diff(diff):
+    """Render paragraph-level changes between the latest filing and its predecessor"""
+    if not diff:
+        st.info("At least two filings with comparable sections are needed to show changes.")
+        return
+
+    st.caption(
+        f"{diff['to']['doc_type']} {diff['to']['period']} compared with "
+        f"{diff['from']['doc_type']} {diff['from']['period']}"
+    )
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Added paragraphs", diff['summary']['added'])
+    col2.metric("Removed paragraphs", diff['summary']['removed'])
+    col3.metric("Revised paragraphs", diff['summary']['modified'])
+
+    for section, changes in diff['sections'].items():
+        st.subheader(section.replace('_', ' ').title())
+        st.caption(f"{changes['unchanged']} paragraphs unchanged")
+
+        revised = [c for c in changes['modified'] if c.get('substantive', True)]
+        for change in revised:
+            with st.expander(f"Revised: {change['new'][:90]}..."):
+                for edit in change['changes']:
+                    if edit['old']:
+                        st.markdown(f"- ~~{edit['old']}~~")
+                    if edit['new']:
+                        st.markdown(f"+ **{edit['new']}**")
+        if len(revised) < len(changes['modified']):
+            st.caption(f"{len(changes['modified']) - len(revised)} paragraphs only updated dates or figures")
+
+        if changes['added']:
+            with st.expander(f"Added ({len(changes['added'])})"):
+                for text in changes['added']:
+                    st.markdown(text)
+                    st.markdown("---")
+        if changes['removed']:
+            with st.expander(f"Removed ({len(changes['removed'])})"):
+                for text in changes['removed']:
+                    st.markdown(text)
+                    st.markdown("---")
+
 def format_currency(value):
     """Format a number as currency with appropriate scale"""
     if abs(value) >= 1_000_000_000:
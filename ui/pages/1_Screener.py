@@ -0,0 +1,95 @@
+# Universe screening page
+# ui/pages/1_Screener.py
+import os
+import sys
+import time
+# Add the project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import streamlit as st
+from agents.screener import UniverseScreener
+from agents.insights import InsightAgent
+from ui.services import get_job_service
+
+def main():
+    st.set_page_config(
+        page_title="Screener - SEC Filing Analysis",
+        page_icon="🔎",
+        layout="wide"
+    )
+
+    screener = UniverseScreener()
+
+    st.title("Peer Comparison and Screening")
+    st.markdown("""
+    Screen the precomputed universe of analyzed companies. Enter one filter per line,
+    e.g. `gross_margin > 40%` or `debt_to_equity < 0.5`. Columns ending in `_sector_pct`
+    hold percentile ranks within the company's sector.
+    """)
+
+    # Sidebar: grow the universe
+    with st.sidebar:
+        st.header("Universe")
+        st.write(f"{len(screener.table)} companies in the universe.")
+        tickers = st.text_input("Add Tickers (comma separated)", "")
+        sector = st.text_input("Sector", "Unknown")
+
+        if st.button("Analyze and Add", type="primary") and tickers.strip():
+            # Submit every ticker up front; the shared workers process them concurrently
+            job_service = get_job_service()
+            jobs = [job_service.submit(t.strip()) for t in tickers.split(",") if t.strip()]
+            for job in jobs:
+                ticker = job.ticker
+                with st.spinner(f"Analyzing {ticker}..."):
+                    job.wait()
+                results = job.result or {"error": f"Error analyzing {ticker}: {job.error}"}
+                if "error" in results:
+                    st.error(results["error"])
+                else:
+                    screener.add_results(results, sector=sector)
+                    st.success(f"Added {ticker}")
+
+    if screener.table.empty:
+        st.info("The universe is empty. Add tickers from the sidebar to get started.")
+        return
+
+    columns = screener.numeric_columns()
+    sectors = ["All"] + sorted(screener.table["sector"].dropna().unique().tolist())
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        filters_text = st.text_area("Filters", "gross_margin > 40%\ndebt_to_equity < 0.5")
+    with col2:
+        default_rank = columns.index("revenue_cagr") if "revenue_cagr" in columns else 0
+        rank_by = st.selectbox("Rank By", columns, index=default_rank)
+        ascending = st.checkbox("Ascending", value=False)
+        selected_sector = st.selectbox("Sector", sectors)
+
+    filters = [line for line in filters_text.splitlines() if line.strip()]
+
+    try:
+        start = time.perf_counter()
+        matches = screener.screen(
+            filters=filters,
+            rank_by=rank_by,
+            ascending=ascending,
+            sector=None if selected_sector == "All" else selected_sector
+        )
+        elapsed = time.perf_counter() - start
+    except (ValueError, KeyError) as e:
+        st.error(str(e))
+        return
+
+    st.subheader(f"{len(matches)} matches")
+    st.caption(f"Screened {len(screener.table)} companies in {elapsed * 1000:.1f} ms")
+    st.dataframe(matches, use_container_width=True)
+
+    # Rule-based alerts evaluated in bulk over the matched companies
+    with st.expander("Alerts"):
+        alerts = InsightAgent().evaluate_universe(matches)
+        if alerts.empty:
+            st.write("No alerts for the matched companies.")
+        else:
+            st.dataframe(alerts, use_container_width=True)
+
+if __name__ == "__main__":
+    main()
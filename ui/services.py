@@ -0,0 +1,11 @@
+# Process-wide resources shared by every Streamlit session
+# ui/services.py
+import streamlit as st
+from agents.orchestrator import SECAnalysisOrchestrator
+from agents.job_service import JobService
+from config.settings import JOB_WORKERS
+
+@st.cache_resource
+def get_job_service():
+    """One pipeline and worker pool shared by every browser session and page"""
+    return JobService(SECAnalysisOrchestrator(use_cache=True), max_workers=JOB_WORKERS)
@@ -1,57 +1,60 @@
 # Plotly charts
 # ui/visualizations.py
-import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
+from utils.chart_series import lttb
 
-def create_financial_timeline(financials_df):
+# Default cap on points per trace; longer histories are downsampled with LTTB
+MAX_CHART_POINTS = 500
+
+def _trace_points(chart_series, metric, max_points):
+    """x and y values for one metric, downsampled when the history is long"""
+    dates = chart_series["dates"]
+    values = chart_series["metrics"][metric]
+    if max_points and len(values) > max_points:
+        keep = lttb(dates, values, max_points)
+        return dates[keep], values[keep]
+    return dates, values
+
+def create_financial_timeline(chart_series, max_points=MAX_CHART_POINTS):
     """Create a timeline visualization of key financial metrics"""
-    if 'filing_date' not in financials_df.columns:
-        return go.Figure()
-    
-    # Clean up data - ensure filing_date is datetime
-    financials_df['filing_date'] = pd.to_datetime(financials_df['filing_date'], errors='coerce')
-    
-    # Sort by date
-    df = financials_df.sort_values('filing_date')
-    
-    # Select metrics to display
     metrics = ['revenue', 'net_income', 'operating_income']
-    available_metrics = [m for m in metrics if m in df.columns]
-    
+    available_metrics = [m for m in metrics if m in chart_series.get("metrics", {})]
+
     if not available_metrics:
         return go.Figure()
-    
+
     # Create figure with secondary y-axis
     fig = go.Figure()
-    
+
     # Add revenue as bars
     if 'revenue' in available_metrics:
+        x, y = _trace_points(chart_series, 'revenue', max_points)
         fig.add_trace(
             go.Bar(
-                x=df['filing_date'],
-                y=df['revenue'],
+                x=x,
+                y=y,
                 name='Revenue',
                 marker_color='lightblue'
             )
         )
-    
+
     # Add net income and operating income as lines
     for metric in [m for m in available_metrics if m != 'revenue']:
+        x, y = _trace_points(chart_series, metric, max_points)
         fig.add_trace(
             go.Scatter(
-                x=df['filing_date'],
-                y=df[metric],
+                x=x,
+                y=y,
                 mode='lines+markers',
                 name=metric.replace('_', ' ').title(),
                 line=dict(width=3)
             )
         )
-    
+
     # Update layout
     fig.update_layout(
         title='Revenue and Income Trends',
-        xaxis_title='Filing Date',
+        xaxis_title='Period End',
         yaxis_title='Amount ($)',
         legend=dict(
             orientation="h",
@@ -62,51 +65,46 @@ def create_financial_timeline(financials_df):
         ),
         template='plotly_white'
     )
-    
+
     return fig
 
-def create_ratio_chart(financials_df):
+def create_ratio_chart(chart_series, max_points=MAX_CHART_POINTS):
     """Create a visualization of financial ratios"""
-    if 'filing_date' not in financials_df.columns:
-        return go.Figure()
-    
-    # Clean up data
-    financials_df['filing_date'] = pd.to_datetime(financials_df['filing_date'], errors='coerce')
-    
-    # Sort by date
-    df = financials_df.sort_values('filing_date')
-    
-    # Select ratios to display
     ratios = ['profit_margin', 'gross_margin', 'debt_to_equity', 'current_ratio']
-    available_ratios = [r for r in ratios if r in df.columns]
-    
+    available_ratios = [r for r in ratios if r in chart_series.get("metrics", {})]
+
     if not available_ratios:
         return go.Figure()
-    
-    # Create figure
-    fig = px.line(
-        df,
-        x='filing_date',
-        y=available_ratios,
-        labels={
-            'filing_date': 'Filing Date',
-            'value': 'Ratio Value',
-            'variable': 'Ratio'
-        },
-        title='Financial Ratios Over Time'
-    )
-    
-    # Customize line appearance
-    for i, ratio in enumerate(available_ratios):
-        fig.data[i].name = ratio.replace('_', ' ').title()
-        fig.data[i].line.width = 3
-    
+
+    fig = go.Figure()
+    for ratio in available_ratios:
+        x, y = _trace_points(chart_series, ratio, max_points)
+        fig.add_trace(
+            go.Scatter(
+                x=x,
+                y=y,
+                mode='lines',
+                name=ratio.replace('_', ' ').title(),
+                line=dict(width=3)
+            )
+        )
+
     # Update layout
     fig.update_layout(
-        xaxis_title='Filing Date',
+        title='Financial Ratios Over Time',
+        xaxis_title='Period End',
         yaxis_title='Ratio Value',
         legend_title='Ratio',
         template='plotly_white'
     )
-    
+
     return fig
+
+CHARTS = {
+    "timeline": create_financial_timeline,
+    "ratios": create_ratio_chart,
+}
+
+def figure_json(chart_series, kind, max_points=MAX_CHART_POINTS):
+    """Serialized Plotly figure for a chart kind, suitable for caching per ticker and results version"""
+    return CHARTS[kind](chart_series, max_points=max_points).to_json()
@@ -0,0 +1,117 @@
+import logging
+import numpy as np
+import pandas as pd
+from utils.fiscal_periods import estimate_period_end, parse_period_date
+
+logger = logging.getLogger(__name__)
+
+# Metrics carried as chart-ready series on every analysis result
+CHART_METRICS = [
+    "revenue", "net_income", "operating_income", "gross_profit", "operating_cash_flow",
+    "profit_margin", "gross_margin", "debt_to_equity", "current_ratio"
+]
+
+
+def build_chart_series(financials, metrics=CHART_METRICS):
+    """
+    Convert per-filing financials into sorted, typed arrays for plotting.
+
+    The x axis is the period end date where the filing reports one, otherwise the end of
+    its fiscal period (fiscal_year, fiscal_period and fiscal_year_end), otherwise the filing
+    date; rows with none of these are dropped (and logged).
+
+    Returns:
+        dict: {"dates": datetime64[D] array, "labels": period labels, "metrics": {name: float64 array}}.
+            Metrics with no values are omitted.
+    """
+    if not financials:
+        return {"dates": np.array([], dtype="datetime64[D]"), "labels": [], "metrics": {}}
+
+    frame = pd.DataFrame(financials)
+    # Cover pages print period ends in several formats ("September 28, 2024", "2024-09-28")
+    dates = pd.Series(
+        pd.to_datetime([parse_period_date(value) for value in frame.get("period_end_date", [None] * len(frame))]),
+        index=frame.index
+    )
+    if dates.isna().any() and "fiscal_year" in frame and "fiscal_period" in frame:
+        fiscal_year_ends = frame["fiscal_year_end"] if "fiscal_year_end" in frame else [None] * len(frame)
+        estimated = [
+            estimate_period_end(year, period, year_end)
+            for year, period, year_end in zip(frame["fiscal_year"], frame["fiscal_period"], fiscal_year_ends)
+        ]
+        dates = dates.fillna(pd.Series(pd.to_datetime(estimated), index=frame.index))
+    if "filing_date" in frame:
+        dates = dates.fillna(pd.to_datetime(frame["filing_date"], format="%Y-%m-%d", errors="coerce"))
+
+    undated = int(dates.isna().sum())
+    if undated:
+        logger.warning(f"Leaving {undated} of {len(frame)} filings out of the charts: no period end, "
+                       f"fiscal period or filing date")
+
+    frame = frame.assign(chart_date=dates).dropna(subset=["chart_date"]).sort_values("chart_date", kind="stable")
+
+    fiscal_years = frame["fiscal_year"] if "fiscal_year" in frame else pd.Series(np.nan, index=frame.index)
+    fiscal_periods = frame["fiscal_period"] if "fiscal_period" in frame else pd.Series(None, index=frame.index)
+    labels = [
+        f"{period} {int(year)}" if isinstance(period, str) and pd.notna(year) else date.strftime("%Y-%m-%d")
+        for year, period, date in zip(fiscal_years, fiscal_periods, frame["chart_date"])
+    ]
+
+    series = {}
+    for metric in metrics:
+        if metric in frame:
+            values = pd.to_numeric(frame[metric], errors="coerce").to_numpy(dtype=np.float64)
+            if not np.isnan(values).all():
+                series[metric] = values
+
+    return {
+        "dates": frame["chart_date"].to_numpy().astype("datetime64[D]"),
+        "labels": labels,
+        "metrics": series
+    }
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of n_out - 2 equal buckets, the point
+    forming the largest triangle with the previously kept point and the next bucket's
+    average, which preserves peaks and troughs. NaN points are skipped.
+
+    Args:
+        x (array): Monotonic x values (numeric or datetime64).
+        y (array): y values.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Indices of the kept points, ascending.
+    """
+    x = np.asarray(x)
+    x = x.astype("datetime64[ns]").astype(np.int64).astype(np.float64) if np.issubdtype(x.dtype, np.datetime64) \
+        else x.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    valid = np.flatnonzero(~np.isnan(y))
+    if n_out >= len(valid) or n_out < 3:
+        return valid
+
+    xv, yv = x[valid], y[valid]
+    edges = np.linspace(1, len(valid) - 1, n_out - 1).astype(int)
+
+    kept = [0]
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else len(valid)
+        avg_x = xv[next_start:next_end].mean()
+        avg_y = yv[next_start:next_end].mean()
+
+        a = kept[-1]
+        areas = np.abs(
+            (xv[a] - avg_x) * (yv[start:end] - yv[a]) - (xv[a] - xv[start:end]) * (avg_y - yv[a])
+        )
+        kept.append(start + int(np.argmax(areas)))
+    kept.append(len(valid) - 1)
+
+    return valid[np.array(kept)]
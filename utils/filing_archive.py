@@ -0,0 +1,378 @@
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEME = "archive://"
+DEFAULT_ARCHIVE_DIR = "data/filings/archive"
+
+# Downloaded documents in order of preference; the first one present in an accession
+# directory is archived (full-submission.txt repeats the primary document plus exhibits)
+PRIMARY_FILENAMES = ["primary-document.html", "filing-details.html", "full-submission.txt"]
+
+FILED_DATE_PATTERN = re.compile(rb"FILED AS OF DATE:\s*(\d{8})")
+
+
+def is_archive_ref(file_path):
+    return isinstance(file_path, str) and file_path.startswith(ARCHIVE_SCHEME)
+
+
+def make_ref(accession, filename):
+    """Reference used in place of a file path, e.g. archive://0000320193-24-000123/primary-document.html"""
+    return f"{ARCHIVE_SCHEME}{accession}/{filename}"
+
+
+def parse_ref(ref):
+    """Split an archive reference into (accession, filename)"""
+    accession, _, filename = ref[len(ARCHIVE_SCHEME):].partition("/")
+    return accession, filename
+
+
+class FilingArchive:
+    """
+    Append-only pack of individually compressed filings with a single index.
+
+    filings.pack holds the compressed documents back to back; index.jsonl has one
+    record per filing (ticker, form, accession, filing date, offset, length, codec),
+    appended as filings are added so later records supersede earlier ones. Readers
+    pick up records appended by other processes on their next call. Writers (the UI,
+    the precompute worker, the bulk ingestor) hold an exclusive lock on archive.lock
+    while appending, so each recorded offset points at that writer's own bytes.
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, codec=None, level=None):
+        """
+        Args:
+            root (str): Directory holding filings.pack and index.jsonl.
+            codec (str): "zstd" or "gzip"; defaults to zstd when the zstandard package is installed.
+            level (int): Compression level (defaults: zstd 10, gzip 6).
+        """
+        self.root = root
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            raise ImportError("zstandard is required for the zstd codec")
+        self.level = level or (10 if self.codec == "zstd" else 6)
+
+        os.makedirs(self.root, exist_ok=True)
+        self.pack_path = os.path.join(self.root, "filings.pack")
+        self.index_path = os.path.join(self.root, "index.jsonl")
+        self.lock_path = os.path.join(self.root, "archive.lock")
+
+        self.records = {}    # accession -> record
+        self.by_ticker = {}  # ticker -> set of accessions
+        self._index_size = 0
+        self._lock = threading.RLock()
+        self._refresh()
+
+    def __contains__(self, accession):
+        self._refresh()
+        return accession in self.records
+
+    def __len__(self):
+        self._refresh()
+        return len(self.records)
+
+    def add(self, ticker, form, accession, content, filename="primary-document.html", filing_date=None):
+        """
+        Compress and append a filing, replacing any earlier copy of the accession.
+
+        Returns:
+            str: Archive reference for the filing.
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        if filing_date is None:
+            match = FILED_DATE_PATTERN.search(content[:4096])
+            if match:
+                raw = match.group(1).decode()
+                filing_date = f"{raw[:4]}-{raw[4:6]}-{raw[6:]}"
+
+        blob = self._compress(content)
+        with self._write_lock():
+            self._refresh()
+            with open(self.pack_path, "ab") as pack:
+                offset = pack.seek(0, os.SEEK_END)
+                pack.write(blob)
+
+            record = {
+                "ticker": ticker.upper(),
+                "form": form,
+                "accession": accession,
+                "filename": filename,
+                "filing_date": filing_date,
+                "offset": offset,
+                "length": len(blob),
+                "size": len(content),
+                "codec": self.codec
+            }
+            self._append_index([record])
+            return make_ref(accession, filename)
+
+    def read(self, accession):
+        """Return a filing's original bytes"""
+        record = self.get_record(accession)
+        if record is None:
+            raise KeyError(accession)
+
+        with open(self.pack_path, "rb") as pack:
+            pack.seek(record["offset"])
+            blob = pack.read(record["length"])
+        return self._decompress(blob, record["codec"])
+
+    def read_text(self, accession):
+        return self.read(accession).decode("utf-8", errors="replace")
+
+    def get_record(self, accession):
+        self._refresh()
+        return self.records.get(accession)
+
+    def list_filings(self, ticker, forms=None, after=None):
+        """
+        Index lookup of a ticker's filings, newest first.
+
+        Args:
+            forms (list): Only these form types.
+            after (str): Only filings dated on or after this YYYY-MM-DD date (undated filings are kept).
+
+        Returns:
+            list: Index records.
+        """
+        self._refresh()
+        records = [self.records[accession] for accession in self.by_ticker.get(ticker.upper(), ())]
+        if forms is not None:
+            records = [r for r in records if r["form"] in forms]
+        if after is not None:
+            records = [r for r in records if not r["filing_date"] or r["filing_date"] >= after]
+        return sorted(records, key=lambda r: (r["filing_date"] or "", r["accession"]), reverse=True)
+
+    def ref(self, record):
+        return make_ref(record["accession"], record["filename"])
+
+    def remove(self, accession):
+        """Drop a filing from the index; its bytes are reclaimed by compact()"""
+        with self._write_lock():
+            if accession in self:
+                self._append_index([{"accession": accession, "deleted": True}])
+
+    def import_directory(self, filings_dir, ticker=None, remove=False, skip_existing=True):
+        """
+        Archive filings downloaded by sec-edgar-downloader
+        (<filings_dir>/sec-edgar-filings/<TICKER>/<FORM>/<ACCESSION>/<file>).
+
+        Args:
+            ticker (str): Only import this ticker.
+            remove (bool): Delete each accession directory once archived.
+            skip_existing (bool): Leave accessions that are already archived untouched.
+
+        Returns:
+            list: Archive references of the imported filings.
+        """
+        base = os.path.join(filings_dir, "sec-edgar-filings")
+        tickers = [ticker.upper()] if ticker else sorted(os.listdir(base)) if os.path.isdir(base) else []
+
+        refs = []
+        for ticker_name in tickers:
+            ticker_dir = os.path.join(base, ticker_name)
+            if not os.path.isdir(ticker_dir):
+                continue
+            for form in sorted(os.listdir(ticker_dir)):
+                form_dir = os.path.join(ticker_dir, form)
+                for accession in sorted(os.listdir(form_dir)):
+                    accession_dir = os.path.join(form_dir, accession)
+                    if skip_existing and accession in self:
+                        if remove:
+                            shutil.rmtree(accession_dir, ignore_errors=True)
+                        continue
+                    filename = next(
+                        (name for name in PRIMARY_FILENAMES if os.path.exists(os.path.join(accession_dir, name))),
+                        None
+                    )
+                    if filename is None:
+                        continue
+                    try:
+                        with open(os.path.join(accession_dir, filename), "rb") as f:
+                            content = f.read()
+                        filing_date = self._filing_date_from_dir(accession_dir)
+                        refs.append(self.add(ticker_name, form, accession, content, filename, filing_date))
+                        if remove:
+                            shutil.rmtree(accession_dir)
+                    except Exception as e:
+                        logger.error(f"Error archiving {accession_dir}: {e}")
+        return refs
+
+    def compact(self):
+        """Rewrite the pack without superseded or removed filings"""
+        with self._write_lock():
+            self._refresh()
+            tmp_pack, tmp_index = f"{self.pack_path}.tmp", f"{self.index_path}.tmp"
+            records = []
+            with open(self.pack_path, "rb") as src, open(tmp_pack, "wb") as dst:
+                for record in sorted(self.records.values(), key=lambda r: r["offset"]):
+                    src.seek(record["offset"])
+                    blob = src.read(record["length"])
+                    records.append({**record, "offset": dst.tell()})
+                    dst.write(blob)
+            with open(tmp_index, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            os.replace(tmp_pack, self.pack_path)
+            os.replace(tmp_index, self.index_path)
+
+            self.records, self.by_ticker, self._index_size = {}, {}, 0
+            self._refresh()
+
+    def stats(self):
+        """Filing count and stored vs original bytes"""
+        self._refresh()
+        stored = sum(r["length"] for r in self.records.values())
+        original = sum(r["size"] for r in self.records.values())
+        return {
+            "filings": len(self.records),
+            "stored_bytes": stored,
+            "original_bytes": original,
+            "ratio": original / stored if stored else 0.0
+        }
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across this process's threads and, where flock exists, across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Apply index records appended since the last read (possibly by another process)"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except OSError:
+            return
+        if size == self._index_size:
+            return
+
+        with self._lock:
+            if size < self._index_size:
+                # The index was rewritten by compact() in another process
+                self.records, self.by_ticker, self._index_size = {}, {}, 0
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_size)
+                data = f.read()
+            # Ignore a partially written last line; it is read once complete
+            complete = data[:data.rfind(b"\n") + 1]
+            for line in complete.splitlines():
+                if line.strip():
+                    self._apply(json.loads(line))
+            self._index_size += len(complete)
+
+    def _append_index(self, records):
+        with open(self.index_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        self._refresh()
+
+    def _apply(self, record):
+        accession = record["accession"]
+        previous = self.records.pop(accession, None)
+        if previous is not None:
+            self.by_ticker.get(previous["ticker"], set()).discard(accession)
+        if not record.get("deleted"):
+            self.records[accession] = record
+            self.by_ticker.setdefault(record["ticker"], set()).add(accession)
+
+    def _compress(self, content):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(content)
+        return gzip.compress(content, compresslevel=self.level, mtime=0)
+
+    def _decompress(self, blob, codec):
+        if codec == "zstd":
+            if zstandard is None:
+                raise ImportError("zstandard is required to read zstd-compressed filings")
+            return zstandard.ZstdDecompressor().decompress(blob)
+        return gzip.decompress(blob)
+
+    def _filing_date_from_dir(self, accession_dir):
+        """Filing date from the SEC header of a downloaded full-submission.txt, if present"""
+        path = os.path.join(accession_dir, "full-submission.txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            match = FILED_DATE_PATTERN.search(f.read(4096))
+        if not match:
+            return None
+        raw = match.group(1).decode()
+        return f"{raw[:4]}-{raw[4:6]}-{raw[6:]}"
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_filing_archive(root=DEFAULT_ARCHIVE_DIR):
+    """Process-wide archive per directory"""
+    with _archives_lock:
+        if root not in _archives:
+            _archives[root] = FilingArchive(root)
+        return _archives[root]
+
+
+def read_filing(file_path, archive=None):
+    """Read a filing given a file path or an archive reference"""
+    if is_archive_ref(file_path):
+        accession, _ = parse_ref(file_path)
+        return (archive or get_filing_archive()).read_text(accession)
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the compressed filing archive")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Migrate a sec-edgar-downloader tree into the archive")
+    import_parser.add_argument("filings_dir", nargs="?", default="data/filings")
+    import_parser.add_argument("--ticker")
+    import_parser.add_argument("--remove", action="store_true", help="Delete raw files once archived")
+
+    subparsers.add_parser("compact", help="Reclaim space from replaced filings")
+    subparsers.add_parser("stats", help="Show archive size")
+
+    args = parser.parse_args(argv)
+    archive = FilingArchive(args.archive)
+    if args.command == "import":
+        refs = archive.import_directory(args.filings_dir, ticker=args.ticker, remove=args.remove)
+        print(f"Archived {len(refs)} filings")
+    elif args.command == "compact":
+        archive.compact()
+    stats = archive.stats()
+    print(f"{stats['filings']} filings, {stats['stored_bytes'] / 1e6:.1f} MB stored "
+          f"({stats['original_bytes'] / 1e6:.1f} MB original, {stats['ratio']:.1f}x)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
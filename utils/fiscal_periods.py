@@ -0,0 +1,358 @@
+import calendar
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Income statement and cash flow items cover a period and can be summed across quarters.
+# Everything else (balance sheet items) is a point-in-time value and is carried forward.
+FLOW_METRICS = [
+    "revenue", "net_income", "operating_income", "gross_profit",
+    "operating_cash_flow", "capex", "r_and_d"
+]
+
+# Cash flow statements in 10-Qs report year-to-date totals (six and nine months for
+# Q2 and Q3), unlike the three-month columns the income statement leads with
+YTD_METRICS = ["operating_cash_flow", "capex"]
+
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+
+DATE_FORMATS = ["%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%B %d %Y"]
+
+
+def parse_period_date(value):
+    """Parse a period end date as printed on a filing cover page"""
+    if not value or value == "Unknown":
+        return None
+    value = " ".join(str(value).replace("\xa0", " ").split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def fiscal_year_end_month(value):
+    """Month number from a CurrentFiscalYearEndDate value such as '--09-28'"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.startswith("--") and len(value) >= 4 and value[2:4].isdigit():
+        return int(value[2:4])
+    parsed = parse_period_date(f"{value}, 2000")
+    return parsed.month if parsed else None
+
+
+def identify_fiscal_period(metadata):
+    """
+    Identify the fiscal year and period a filing covers.
+
+    Uses the cover-page DEI facts (DocumentFiscalYearFocus/DocumentFiscalPeriodFocus)
+    when present, otherwise derives the quarter from the period end date relative to
+    the fiscal year end month.
+
+    Returns:
+        tuple: (fiscal_year, fiscal_period) where fiscal_period is "Q1".."Q4" or "FY",
+            or None if the period cannot be determined.
+    """
+    doc_type = metadata.get("doc_type", "Unknown")
+    fiscal_year = metadata.get("fiscal_year")
+    fiscal_period = metadata.get("fiscal_period")
+
+    if fiscal_year and fiscal_period:
+        fiscal_period = str(fiscal_period).upper()
+        if doc_type == "10-K":
+            fiscal_period = "FY"
+        if fiscal_period in QUARTERS or fiscal_period == "FY":
+            try:
+                return int(fiscal_year), fiscal_period
+            except (TypeError, ValueError):
+                pass
+
+    period_end = parse_period_date(metadata.get("period_end_date"))
+    if period_end is None:
+        return None
+
+    fy_end_month = fiscal_year_end_month(metadata.get("fiscal_year_end")) or 12
+    # Months elapsed since the end of the previous fiscal year (1..12)
+    months_in = (period_end.month - fy_end_month - 1) % 12 + 1
+    fiscal_year = period_end.year if period_end.month <= fy_end_month else period_end.year + 1
+
+    if doc_type == "10-K":
+        return fiscal_year, "FY"
+    return fiscal_year, QUARTERS[min((months_in - 1) // 3, 3)]
+
+
+def estimate_period_end(fiscal_year, fiscal_period, fiscal_year_end=None):
+    """
+    Last day of the final month of a fiscal period, for filings whose cover page gives
+    no period end date. Fiscal years end in December unless fiscal_year_end says otherwise.
+
+    Returns:
+        datetime: The estimated period end, or None if the period is not a quarter or year.
+    """
+    try:
+        fiscal_year = int(fiscal_year)
+    except (TypeError, ValueError):
+        return None
+    fiscal_period = str(fiscal_period).upper()
+    if fiscal_period == "FY":
+        quarters_left = 0
+    elif fiscal_period in QUARTERS:
+        quarters_left = 3 - QUARTERS.index(fiscal_period)
+    else:
+        return None
+
+    fy_end_month = fiscal_year_end_month(fiscal_year_end) or 12
+    year, month = divmod(fiscal_year * 12 + fy_end_month - 1 - 3 * quarters_left, 12)
+    return datetime(year, month + 1, calendar.monthrange(year, month + 1)[1])
+
+
+def previous_quarter(fiscal_year, quarter):
+    """Return the (fiscal_year, quarter) immediately before the given quarter"""
+    index = QUARTERS.index(quarter)
+    if index == 0:
+        return fiscal_year - 1, "Q4"
+    return fiscal_year, QUARTERS[index - 1]
+
+
+def next_quarter(fiscal_year, quarter):
+    """Return the (fiscal_year, quarter) immediately after the given quarter"""
+    index = QUARTERS.index(quarter)
+    if index == 3:
+        return fiscal_year + 1, "Q1"
+    return fiscal_year, QUARTERS[index + 1]
+
+
+class PeriodLedger:
+    """
+    Period-aware store of reported metrics with incrementally maintained rollups.
+
+    Quarterly values are three-month figures. 10-Q filings report most flow metrics that
+    way, but the ytd_metrics (cash flow items) year-to-date, so those are stored as the
+    difference from the prior quarter's year-to-date value, and left out of a quarter
+    until that value is known. Q4 is never reported on its own, so it is derived as the
+    annual figure minus the first three quarters. Adding a filing only touches the
+    handful of periods whose trailing-twelve-month (TTM) or year-over-year (YoY) values
+    depend on it.
+    """
+
+    def __init__(self, flow_metrics=None, ytd_metrics=None):
+        self.flow_metrics = set(flow_metrics or FLOW_METRICS)
+        self.ytd_metrics = set(YTD_METRICS if ytd_metrics is None else ytd_metrics) & self.flow_metrics
+        self.quarters = {}   # (fiscal_year, "Qn") -> metrics
+        self.ytd = {}        # (fiscal_year, "Qn") -> ytd_metrics as reported, year-to-date
+        self.annuals = {}    # fiscal_year -> metrics
+        self.derived = set() # quarters derived from annual minus three quarters
+        self.rollups = {}    # (fiscal_year, period) -> {"ttm": {...}, "yoy": {...}}
+        self.sources = {}    # (fiscal_year, period) -> filing key
+        self.seen = set()
+
+    def add(self, fiscal_year, fiscal_period, metrics, key=None):
+        """
+        Add the metrics of one filing and update the dependent rollups.
+
+        Returns:
+            list: The (fiscal_year, period) keys whose values changed.
+        """
+        if key is not None:
+            if key in self.seen:
+                return []
+            self.seen.add(key)
+
+        values = {k: v for k, v in metrics.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        changed = []
+
+        if fiscal_period == "FY":
+            self.annuals[fiscal_year] = values
+            self.sources[(fiscal_year, "FY")] = key
+            changed.append((fiscal_year, "FY"))
+            self._refresh_annual_yoy(fiscal_year)
+            self._refresh_annual_yoy(fiscal_year + 1)
+            changed.extend(self._derive_q4(fiscal_year))
+        elif fiscal_period in QUARTERS:
+            self.quarters[(fiscal_year, fiscal_period)] = {k: v for k, v in values.items() if k not in self.ytd_metrics}
+            self.ytd[(fiscal_year, fiscal_period)] = {k: v for k, v in values.items() if k in self.ytd_metrics}
+            self.derived.discard((fiscal_year, fiscal_period))
+            self.sources[(fiscal_year, fiscal_period)] = key
+            changed.append((fiscal_year, fiscal_period))
+            self._decumulate(fiscal_year, fiscal_period)
+            self._refresh_quarter(fiscal_year, fiscal_period)
+            # The next quarter's three-month values depend on this quarter's year-to-date ones
+            if fiscal_period != "Q4":
+                following = next_quarter(fiscal_year, fiscal_period)
+                if following in self.ytd:
+                    self._decumulate(*following)
+                    self._refresh_quarter(*following)
+                    changed.append(following)
+                changed.extend(self._derive_q4(fiscal_year))
+        else:
+            logger.warning(f"Ignoring unknown fiscal period {fiscal_period} for {fiscal_year}")
+
+        return changed
+
+    def quarter(self, fiscal_year, quarter):
+        """Return the (reported or derived) metrics for a quarter"""
+        return self.quarters.get((fiscal_year, quarter))
+
+    def ttm(self, fiscal_year, quarter):
+        """Return the trailing-twelve-month values ending at the given quarter"""
+        return self.rollups.get((fiscal_year, quarter), {}).get("ttm", {})
+
+    def yoy(self, fiscal_year, period):
+        """Return year-over-year growth rates for a quarter or fiscal year"""
+        return self.rollups.get((fiscal_year, period), {}).get("yoy", {})
+
+    def latest_period(self):
+        """Return the most recent (fiscal_year, period) held in the ledger"""
+        keys = [(fy, QUARTERS.index(q)) for fy, q in self.quarters]
+        keys += [(fy, 3) for fy in self.annuals]
+        if not keys:
+            return None
+        fiscal_year, index = max(keys)
+        if (fiscal_year, QUARTERS[index]) in self.quarters:
+            return fiscal_year, QUARTERS[index]
+        return fiscal_year, "FY"
+
+    def annual_series(self):
+        """Fiscal-year rows in chronological order"""
+        return [
+            {"fiscal_year": fy, "fiscal_period": "FY", **self.annuals[fy],
+             **{f"{k}_growth": v for k, v in self.yoy(fy, "FY").items()}}
+            for fy in sorted(self.annuals)
+        ]
+
+    def ttm_series(self):
+        """Consecutive trailing-twelve-month rows in chronological order"""
+        rows = []
+        for fy, q in sorted(self.quarters, key=lambda k: (k[0], QUARTERS.index(k[1]))):
+            ttm = self.ttm(fy, q)
+            # Skip windows with gaps, where only point-in-time values are known
+            if any(metric in self.flow_metrics for metric in ttm):
+                rows.append({"fiscal_year": fy, "fiscal_period": q, **ttm})
+        return rows
+
+    def rows(self):
+        """All quarterly and annual periods with their rollups, in chronological order"""
+        keys = [(fy, q) for fy, q in self.quarters] + [(fy, "FY") for fy in self.annuals]
+        keys.sort(key=lambda k: (k[0], 4 if k[1] == "FY" else QUARTERS.index(k[1])))
+
+        rows = []
+        for fy, period in keys:
+            values = self.annuals[fy] if period == "FY" else self.quarters[(fy, period)]
+            row = {"fiscal_year": fy, "fiscal_period": period,
+                   "derived": (fy, period) in self.derived, **values}
+            row.update({f"{k}_ttm": v for k, v in self.ttm(fy, period).items() if k in self.flow_metrics})
+            row.update({f"{k}_yoy": v for k, v in self.yoy(fy, period).items()})
+            rows.append(row)
+        return rows
+
+    def _derive_q4(self, fiscal_year):
+        """Derive Q4 as annual minus Q1-Q3 once all four inputs are known"""
+        annual = self.annuals.get(fiscal_year)
+        if annual is None:
+            return []
+        if (fiscal_year, "Q4") in self.quarters and (fiscal_year, "Q4") not in self.derived:
+            return []  # A reported Q4 wins over a derived one
+
+        parts = [self.quarters.get((fiscal_year, q)) for q in QUARTERS[:3]]
+        if any(part is None for part in parts):
+            return []
+
+        q4 = {}
+        q3_ytd = self.ytd.get((fiscal_year, "Q3"), {})
+        for metric, value in annual.items():
+            if metric in self.ytd_metrics:
+                if metric in q3_ytd:
+                    q4[metric] = value - q3_ytd[metric]
+            elif metric in self.flow_metrics:
+                if all(metric in part for part in parts):
+                    q4[metric] = value - sum(part[metric] for part in parts)
+            else:
+                q4[metric] = value
+
+        self.quarters[(fiscal_year, "Q4")] = q4
+        self.derived.add((fiscal_year, "Q4"))
+        self._refresh_quarter(fiscal_year, "Q4")
+        return [(fiscal_year, "Q4")]
+
+    def _decumulate(self, fiscal_year, quarter):
+        """Set a reported quarter's three-month ytd_metrics from its year-to-date values"""
+        current = self.quarters.get((fiscal_year, quarter))
+        ytd = self.ytd.get((fiscal_year, quarter))
+        if current is None or ytd is None:
+            return
+        index = QUARTERS.index(quarter)
+        prior = self.ytd.get((fiscal_year, QUARTERS[index - 1])) if index else {}
+        for metric, value in ytd.items():
+            if index == 0:
+                current[metric] = value
+            elif prior is not None and metric in prior:
+                current[metric] = value - prior[metric]
+            else:
+                current.pop(metric, None)  # Unknown until the prior quarter is added
+
+    def _refresh_quarter(self, fiscal_year, quarter):
+        """Recompute rollups for the quarters whose TTM or YoY window covers this one"""
+        key = (fiscal_year, quarter)
+        for _ in range(4):
+            self._refresh_ttm(*key)
+            key = next_quarter(*key)
+        self._refresh_quarter_yoy(fiscal_year, quarter)
+        self._refresh_quarter_yoy(fiscal_year + 1, quarter)
+
+    def _refresh_ttm(self, fiscal_year, quarter):
+        current = self.quarters.get((fiscal_year, quarter))
+        if current is None:
+            return
+
+        window = [current]
+        key = (fiscal_year, quarter)
+        for _ in range(3):
+            key = previous_quarter(*key)
+            window.append(self.quarters.get(key))
+
+        ttm = {}
+        for metric, value in current.items():
+            if metric in self.flow_metrics:
+                if all(part is not None and metric in part for part in window):
+                    ttm[metric] = sum(part[metric] for part in window)
+            else:
+                ttm[metric] = value
+
+        self.rollups.setdefault((fiscal_year, quarter), {})["ttm"] = ttm
+        self._refresh_ttm_yoy(fiscal_year, quarter)
+        self._refresh_ttm_yoy(fiscal_year + 1, quarter)
+
+    def _refresh_quarter_yoy(self, fiscal_year, quarter):
+        current = self.quarters.get((fiscal_year, quarter))
+        prior = self.quarters.get((fiscal_year - 1, quarter))
+        if current is None:
+            return
+        self.rollups.setdefault((fiscal_year, quarter), {})["yoy"] = self._growth(current, prior)
+
+    def _refresh_ttm_yoy(self, fiscal_year, quarter):
+        rollup = self.rollups.get((fiscal_year, quarter))
+        prior = self.rollups.get((fiscal_year - 1, quarter), {}).get("ttm")
+        if not rollup or "ttm" not in rollup:
+            return
+        rollup["ttm_yoy"] = self._growth(rollup["ttm"], prior)
+
+    def _refresh_annual_yoy(self, fiscal_year):
+        current = self.annuals.get(fiscal_year)
+        if current is None:
+            return
+        prior = self.annuals.get(fiscal_year - 1)
+        self.rollups.setdefault((fiscal_year, "FY"), {})["yoy"] = self._growth(current, prior)
+
+    def _growth(self, current, prior):
+        """Period-over-period growth for metrics present in both periods"""
+        if not prior:
+            return {}
+        growth = {}
+        for metric, value in current.items():
+            previous = prior.get(metric)
+            if previous:
+                growth[metric] = (value - previous) / abs(previous)
+        return growth
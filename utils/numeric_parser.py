@@ -0,0 +1,121 @@
+import re
+import numpy as np
+import pandas as pd
+
+# One numeric token per cell: optional "(" or "-", "$", digits with thousands separators,
+# decimals, and an optional ")" and/or "%". Cells split across columns ("(1,234" then ")")
+# are negative when the opening parenthesis is present.
+NUMBER_PATTERN = re.compile(
+    r'^(?P<open>\()?\s*(?P<minus>[-−])?\s*\$?\s*(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+)'
+    r'\s*(?P<close>\))?\s*(?P<percent>%)?\s*\)?$'
+)
+
+# Footnote markers attached to a value ("391,035(1)", "12.5*", "8.2 †") or filling a whole cell;
+# a lone single-character parenthesized cell such as "(1)" is a footnote reference, not -1
+FOOTNOTE_SUFFIX = re.compile(r'(?<=[\d)%])\s*(?:\(\d{1,2}\)|\[[a-z0-9]{1,2}\]|[*†‡]+)$', re.IGNORECASE)
+FOOTNOTE_CELL = re.compile(r'^(?:\([a-z0-9]\)|\[[a-z0-9]{1,2}\]|[*†‡]+)$', re.IGNORECASE)
+
+# Dashes that SEC tables print for zero or nil
+DASH_CELL = re.compile(r'^\$?\s*[-–—‒―]+$')
+
+# Table-level units, e.g. "(In millions, except per-share amounts)" or "$ in thousands"
+SCALE_PATTERN = re.compile(r'\bin\s+(thousands|millions|billions)\b', re.IGNORECASE)
+SCALES = {"thousands": 1e3, "millions": 1e6, "billions": 1e9}
+
+# Cell-level units inside a value ("$1.2 billion")
+CELL_SCALE_PATTERN = re.compile(r'\s*(?:in\s+)?(thousand|million|billion)s?\b', re.IGNORECASE)
+CELL_SCALES = {"thousand": 1e3, "million": 1e6, "billion": 1e9}
+
+
+def parse_numeric_series(values, scale=1.0):
+    """
+    Parse a column of table cells to floats in one vectorized pass.
+
+    Handles "$", thousands separators, parenthesized negatives (including a closing
+    parenthesis in the next cell), leading minus signs, em-dash zeros, footnote markers
+    and percentages. Percentages become fractions and are not scaled.
+
+    Args:
+        values (pd.Series): Cell values.
+        scale (float): Table-level multiplier (see detect_table_scale).
+
+    Returns:
+        pd.Series: float64 values, NaN where a cell is not numeric.
+    """
+    if not isinstance(values, pd.Series):
+        values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64) * scale
+
+    text = values.astype(str).str.strip().str.replace(FOOTNOTE_SUFFIX, '', regex=True)
+    parts = text.str.extract(NUMBER_PATTERN)
+
+    numbers = pd.to_numeric(parts["number"].str.replace(',', '', regex=False), errors="coerce")
+    negative = parts["open"].notna() | parts["minus"].notna()
+    percent = parts["percent"].notna()
+
+    result = numbers.where(~negative, -numbers)
+    result = result.where(percent, result * scale)
+    result = result.where(~percent, result / 100)
+
+    result[text.str.match(DASH_CELL)] = 0.0
+    result[text.str.match(FOOTNOTE_CELL)] = np.nan
+    # Cells that were already numbers (e.g. from a mixed object column)
+    is_number = values.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+    if is_number.any():
+        result[is_number] = values[is_number].astype(np.float64) * scale
+
+    return result.astype(np.float64)
+
+
+def parse_numeric_value(value, scale=1.0):
+    """Parse a single value; returns None when it is not numeric"""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return None if pd.isna(value) else float(value) * scale
+    if not isinstance(value, str):
+        return None
+
+    # Units written in the value itself ("$1.2 billion") override the table scale
+    match = CELL_SCALE_PATTERN.search(value)
+    if match:
+        scale = CELL_SCALES[match.group(1).lower()]
+        value = CELL_SCALE_PATTERN.sub('', value)
+
+    parsed = parse_numeric_series(pd.Series([value]), scale).iloc[0]
+    return None if pd.isna(parsed) else float(parsed)
+
+
+def detect_table_scale(table, header_rows=3, caption=None):
+    """
+    Find the table-level unit that SEC tables state once in the header
+    ("(In millions, except per-share amounts)") rather than in each cell.
+
+    Statements usually print it in a caption above the table instead, which
+    extract_tables keeps as table.attrs["caption"]; a unit in the table itself wins.
+
+    Returns:
+        float: 1e3, 1e6, 1e9, or 1.0 when no unit is stated.
+    """
+    header = [str(column) for column in table.columns]
+    for row in table.head(header_rows).itertuples(index=False):
+        header.extend(str(cell) for cell in row)
+
+    match = SCALE_PATTERN.search(" ".join(header))
+    if match is None:
+        match = SCALE_PATTERN.search(table.attrs.get("caption", "") if caption is None else caption)
+    return SCALES[match.group(1).lower()] if match else 1.0
+
+
+def parse_table(table, scale=None):
+    """
+    Parse every cell of a table at once.
+
+    Returns:
+        pd.DataFrame: float64 frame with the table's shape (NaN for non-numeric cells).
+    """
+    if scale is None:
+        scale = detect_table_scale(table)
+    # One pass over all cells; per-column passes pay pandas overhead for every column
+    cells = pd.Series(table.to_numpy(dtype=object).ravel())
+    values = parse_numeric_series(cells, scale).to_numpy().reshape(table.shape)
+    return pd.DataFrame(values, index=table.index)
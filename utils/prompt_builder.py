@@ -0,0 +1,221 @@
+import re
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prompt token budgets per model, leaving room in the context window for the completion
+MODEL_PROMPT_BUDGETS = {
+    "mistral": 3000,
+    "llama2": 2500,
+    "llama3": 3000,
+    "phi3": 2000,
+    "gpt-3.5-turbo": 3000,
+    "gpt-4": 6000,
+}
+DEFAULT_PROMPT_BUDGET = 2000
+
+# Relative importance of each metric when the budget forces facts to be dropped
+METRIC_PRIORITY = {
+    "revenue": 10, "net_income": 9, "operating_income": 8, "gross_margin": 8, "profit_margin": 8,
+    "operating_cash_flow": 7, "debt_to_equity": 7, "gross_profit": 6, "total_assets": 6,
+    "cash_and_equivalents": 6, "long_term_debt": 6, "total_liabilities": 5, "total_equity": 5,
+    "current_ratio": 5, "r_and_d": 4, "capex": 4, "short_term_debt": 4, "rd_intensity": 3,
+    "asset_turnover": 3,
+}
+
+# Trend key suffixes and how much they add to (or take from) the metric's priority
+SUFFIX_WEIGHTS = [
+    ("_avg_growth", 0), ("_volatility", -4), ("_growth", 1), ("_trend", -1),
+    ("_cagr", 1), ("_ttm", 0), ("_yoy", 1),
+]
+
+PERCENT_SUFFIXES = ("_growth", "_cagr", "_volatility", "_yoy", "_margin", "_intensity")
+MULTIPLE_METRICS = ("debt_to_equity", "current_ratio", "asset_turnover")
+# Dollar amounts; other large values (share or employee counts) are shown without "$"
+CURRENCY_METRICS = (
+    "revenue", "net_income", "operating_income", "gross_profit", "total_assets", "total_liabilities",
+    "total_equity", "cash_and_equivalents", "long_term_debt", "short_term_debt", "operating_cash_flow",
+    "capex", "r_and_d",
+)
+SKIPPED_KEYS = {"fiscal_year", "fiscal_year_end", "derived"}
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+SALIENT_TERMS = re.compile(
+    r'\b(material(ly)?|adverse(ly)?|significant(ly)?|substantial|decline|loss|risk|depend|'
+    r'litigation|regulat\w*|competition|supply|tariff|interest rate|currency|cyber\w*)\b',
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English prose)"""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def split_metric_key(key):
+    """Split 'revenue_avg_growth' into ('revenue', '_avg_growth')"""
+    for suffix, _ in SUFFIX_WEIGHTS:
+        if key.endswith(suffix):
+            return key[:-len(suffix)], suffix
+    return key, ""
+
+
+def format_value(key, value):
+    """Format a metric compactly: $391.0B, 46.2%, 1.87x, 15.2B (shares)"""
+    if isinstance(value, str):
+        return value
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+
+    metric, suffix = split_metric_key(key)
+    if key.endswith(PERCENT_SUFFIXES):
+        return f"{value * 100:.1f}%"
+    if metric in MULTIPLE_METRICS and suffix in ("", "_ttm"):
+        return f"{value:.2f}x"
+
+    sign = "-" if value < 0 else ""
+    currency = "$" if metric in CURRENCY_METRICS else ""
+    magnitude = abs(value)
+    for threshold, unit in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if magnitude >= threshold:
+            return f"{sign}{currency}{magnitude / threshold:.1f}{unit}"
+    return f"{value:.3g}"
+
+
+def salience(key, value):
+    """Score how much a fact deserves a place in a constrained prompt"""
+    metric, suffix = split_metric_key(key)
+    score = METRIC_PRIORITY.get(metric, 1) + dict(SUFFIX_WEIGHTS).get(suffix, 0)
+    if suffix in ("_growth", "_cagr", "_avg_growth", "_yoy") and isinstance(value, (int, float)):
+        # Large moves are more newsworthy than flat ones
+        score += min(abs(value) * 10, 5)
+    if suffix == "_trend" and value == "stable":
+        score -= 2
+    return score
+
+
+def rank_facts(values):
+    """Return 'label: value' lines ordered by salience, dropping empty values"""
+    facts = []
+    for key, value in values.items():
+        if key in SKIPPED_KEYS:
+            continue
+        formatted = format_value(key, value)
+        if formatted is None:
+            continue
+        facts.append((salience(key, value), f"{key.replace('_', ' ')}: {formatted}"))
+    facts.sort(key=lambda fact: fact[0], reverse=True)
+    return [line for _, line in facts]
+
+
+def compress_text(text, max_tokens):
+    """
+    Summary-of-sections compression for long filing text.
+
+    Keeps the lead sentence of every paragraph, then fills the remaining budget with
+    the sentences carrying the most risk/financial signal, in document order.
+    Sentences with no signal beyond a paragraph's lead are dropped.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    if len(paragraphs) == 1:
+        # Flattened text: treat runs of sentences as pseudo-paragraphs
+        sentences = SENTENCE_SPLIT.split(paragraphs[0])
+        paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+
+    candidates = []  # (priority, paragraph index, sentence index, sentence)
+    for p_index, paragraph in enumerate(paragraphs):
+        for s_index, sentence in enumerate(SENTENCE_SPLIT.split(paragraph)):
+            signal = len(SALIENT_TERMS.findall(sentence)) + (1 if re.search(r'\d', sentence) else 0)
+            if s_index > 0 and signal == 0:
+                continue
+            priority = 100 if s_index == 0 else signal
+            candidates.append((priority, p_index, s_index, sentence))
+
+    budget = max_tokens
+    selected = []
+    for priority, p_index, s_index, sentence in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        cost = estimate_tokens(sentence) + 1
+        if cost > budget:
+            continue
+        selected.append((p_index, s_index, sentence))
+        budget -= cost
+
+    selected.sort()
+    lines, current = [], None
+    for p_index, _, sentence in selected:
+        if p_index != current:
+            lines.append(sentence)
+            current = p_index
+        else:
+            lines[-1] += " " + sentence
+    return "\n".join(lines)
+
+
+class PromptBuilder:
+    """Assemble LLM prompts within a per-model token budget"""
+
+    def __init__(self, model_name="mistral", max_tokens=None):
+        self.model_name = model_name
+        self.max_tokens = max_tokens or MODEL_PROMPT_BUDGETS.get(model_name.split(":")[0], DEFAULT_PROMPT_BUDGET)
+
+    def build(self, template, values):
+        """
+        Fill a template, fitting variable content into the budget.
+
+        Args:
+            template (str): str.format template.
+            values (dict): Field values. Strings are kept verbatim if short and compressed
+                otherwise; lists are ranked fact lines and are cut from the end.
+
+        Returns:
+            str: The prompt.
+        """
+        fixed = {k: v for k, v in values.items() if not self._is_variable(v)}
+        variable = {k: v for k, v in values.items() if self._is_variable(v)}
+
+        skeleton = template.format(**fixed, **{k: "" for k in variable})
+        remaining = self.max_tokens - estimate_tokens(skeleton)
+
+        needs = {k: self._need(v) for k, v in variable.items()}
+        total_need = sum(needs.values())
+        fitted = {}
+        for key, value in variable.items():
+            if total_need <= remaining:
+                share = needs[key]
+            else:
+                share = int(max(remaining, 0) * needs[key] / max(total_need, 1))
+            fitted[key] = self._fit(value, share)
+
+        prompt = template.format(**fixed, **fitted)
+        if estimate_tokens(prompt) > self.max_tokens:
+            logger.warning(f"Prompt of ~{estimate_tokens(prompt)} tokens exceeds budget of {self.max_tokens}")
+        return prompt
+
+    def _is_variable(self, value):
+        return isinstance(value, list) or (isinstance(value, str) and estimate_tokens(value) > 200)
+
+    def _need(self, value):
+        """Tokens needed to keep a value whole, counted the way _fit spends them"""
+        if isinstance(value, list):
+            return sum(estimate_tokens(line) + 1 for line in value)
+        return estimate_tokens(value)
+
+    def _fit(self, value, max_tokens):
+        """Trim ranked facts from the end, or compress free text, to max_tokens"""
+        if isinstance(value, str):
+            return compress_text(value, max_tokens)
+
+        lines, used = [], 0
+        for line in value:
+            cost = estimate_tokens(line) + 1
+            if used + cost > max_tokens:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
@@ -0,0 +1,294 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+REPLAY_MODES = (OFF, RECORD, REPLAY)
+
+# Fixture kinds, one subdirectory each
+EDGAR_KIND = "edgar"
+LLM_KIND = "llm"
+EMBEDDING_KIND = "embeddings"
+
+
+class FixtureMissing(LookupError):
+    """A replayed call that was never recorded"""
+
+
+class FixtureStore:
+    """
+    Recorded responses of external calls, keyed by a hash of the request.
+
+    In record mode calls go through and their responses are saved; in replay mode
+    they are answered from the fixtures only, and a call that was never recorded
+    raises FixtureMissing (and is listed in misses). Off passes every call through.
+    A manifest records when the fixtures were made plus any expected results.
+    """
+
+    def __init__(self, fixture_dir, mode=REPLAY):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.fixture_dir = fixture_dir
+        self.mode = mode
+        self.misses = []  # (kind, key) of unrecorded calls seen while replaying
+        self.manifest_path = os.path.join(fixture_dir, "manifest.json")
+        self.manifest = self._load_manifest()
+        if mode == RECORD:
+            os.makedirs(fixture_dir, exist_ok=True)
+            self.manifest.setdefault("recorded_at", datetime.now().strftime("%Y-%m-%d"))
+            self.save_manifest()
+
+    @staticmethod
+    def key(kind, payload):
+        return hashlib.sha1(json.dumps([kind, payload], sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+    def path(self, kind, key, suffix=".json"):
+        return os.path.join(self.fixture_dir, kind, f"{key}{suffix}")
+
+    def call(self, kind, payload, fn):
+        """Answer a JSON-serializable call from the fixtures, or make and record it"""
+        if self.mode == OFF:
+            return fn()
+
+        key = self.key(kind, payload)
+        path = self.path(kind, key)
+        if self.mode == REPLAY:
+            try:
+                with open(path) as f:
+                    return json.load(f)["response"]
+            except (OSError, ValueError, KeyError):
+                raise self.missing(kind, key)
+
+        response = fn()
+        self._write_json(path, {"request": payload, "response": response})
+        return response
+
+    def missing(self, kind, key):
+        """Note an unrecorded call and return the exception to raise"""
+        self.misses.append((kind, key))
+        logger.error(f"No recorded {kind} fixture {key} in {self.fixture_dir}")
+        return FixtureMissing(f"{kind}/{key}")
+
+    @property
+    def recorded_at(self):
+        """Date the fixtures were recorded, as a datetime (None if unknown)"""
+        recorded = self.manifest.get("recorded_at")
+        return datetime.strptime(recorded, "%Y-%m-%d") if recorded else None
+
+    def save_manifest(self):
+        self._write_json(self.manifest_path, self.manifest)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent LLM calls may record the same request at once
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True, default=str)
+        os.replace(tmp, path)
+
+
+class ReplayDownloader:
+    """
+    Stand-in for sec_edgar_downloader.Downloader that records or replays the files a
+    download leaves under <output_dir>/sec-edgar-filings/<TICKER>/<FORM>.
+
+    The date window is left out of the key, since it moves with the day of the run;
+    replays pin it with SECRetriever.as_of instead.
+    """
+
+    def __init__(self, store, output_dir, loader=None):
+        """
+        Args:
+            loader (callable): Builds the real Downloader; only called when recording.
+        """
+        self.store = store
+        self.output_dir = output_dir
+        self.loader = loader
+        self._downloader = None
+
+    def get(self, form, ticker, **kwargs):
+        payload = {"form": form, "ticker": ticker.upper(), "limit": kwargs.get("limit"),
+                   "download_details": kwargs.get("download_details", True)}
+        form_dir = os.path.join(self.output_dir, "sec-edgar-filings", ticker.upper(), form)
+        if self.store.mode == OFF:
+            return self._real().get(form, ticker, **kwargs)
+
+        key = self.store.key(EDGAR_KIND, payload)
+        files_dir = self.store.path(EDGAR_KIND, key, suffix="")
+        if self.store.mode == REPLAY:
+            response = self.store.call(EDGAR_KIND, payload, None)
+            if os.path.isdir(files_dir):
+                shutil.copytree(files_dir, form_dir, dirs_exist_ok=True)
+            return response["count"]
+
+        count = self._real().get(form, ticker, **kwargs)
+        shutil.rmtree(files_dir, ignore_errors=True)
+        if os.path.isdir(form_dir):
+            shutil.copytree(form_dir, files_dir)
+        self.store.call(EDGAR_KIND, payload, lambda: {"count": count})
+        return count
+
+    def _real(self):
+        if self._downloader is None:
+            self._downloader = self.loader()
+        return self._downloader
+
+
+class ReplayLLM:
+    """Record or replay an LLMManager's completions (same interface as the manager)"""
+
+    def __init__(self, store, manager):
+        self.store = store
+        self.manager = manager
+
+    def __getattr__(self, name):
+        if name == "manager":
+            raise AttributeError(name)
+        return getattr(self.manager, name)
+
+    def generate(self, prompt, temperature=0.7, max_tokens=800, timeout=None, task=None):
+        return self.complete(prompt, temperature, max_tokens, timeout)["text"]
+
+    def complete(self, prompt, temperature=0.7, max_tokens=800, timeout=None, task=None, schema=None):
+        # Timeouts only decide whether a live call succeeds, so they are not part of the key
+        payload = {"model": self.manager.model_name, "prompt": prompt, "temperature": temperature,
+                   "max_tokens": max_tokens, "schema": schema}
+        extra = {"schema": schema} if schema else {}
+        return self.store.call(LLM_KIND, payload,
+                               lambda: self.manager.complete(prompt, temperature, max_tokens, timeout, **extra))
+
+
+class ReplayEmbeddingModel:
+    """Record or replay a SentenceTransformer's encode() calls; the model is only loaded to record"""
+
+    def __init__(self, store, model_name, loader=None):
+        """
+        Args:
+            loader (callable): Builds the real model; defaults to SentenceTransformer(model_name).
+        """
+        self.store = store
+        self.model_name = model_name
+        self.loader = loader
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            if self.loader is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            else:
+                self._model = self.loader()
+        return self._model
+
+    def encode(self, texts, **kwargs):
+        if self.store.mode == OFF:
+            return self.model.encode(texts, **kwargs)
+
+        key = self.store.key(EMBEDDING_KIND, {"model": self.model_name, "texts": texts})
+        path = self.store.path(EMBEDDING_KIND, key, suffix=".npy")
+        if self.store.mode == REPLAY:
+            try:
+                return np.load(path)
+            except (OSError, ValueError):
+                raise self.store.missing(EMBEDDING_KIND, key)
+
+        embeddings = np.asarray(self.model.encode(texts, **kwargs))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path, embeddings)
+        return embeddings
+
+    def get_sentence_embedding_dimension(self):
+        return self.store.call(EMBEDDING_KIND, {"model": self.model_name, "dimension": True},
+                               lambda: self.model.get_sentence_embedding_dimension())
+
+
+def install_replay(orchestrator, store, work_dir=None):
+    """
+    Route a SECAnalysisOrchestrator's EDGAR downloads, LLM calls and embedding-model
+    calls through a FixtureStore.
+
+    With work_dir, downloads, the filing archive, the vector store and the on-disk
+    caches are kept there too, so replays neither read nor change data/.
+
+    Returns:
+        The orchestrator.
+    """
+    from sec_edgar_downloader import Downloader
+    from agents.retriever import SECRetriever
+    from agents.filing_diff import FilingDiffer
+    from agents.llm_extractor import ExtractionCache
+    from models.embeddings import EmbeddingManager
+    from models.shard_router import ShardRouter
+    from utils.filing_archive import get_filing_archive
+    from utils.result_cache import ResultCache
+
+    if work_dir:
+        old = orchestrator.retriever
+        archive = get_filing_archive(os.path.join(work_dir, "filings", "archive")) if old.use_archive else None
+        orchestrator.retriever = SECRetriever(
+            old.company_name, old.email, output_dir=os.path.join(work_dir, "filings"),
+            ticker_map=old.ticker_map, use_archive=old.use_archive, archive=archive
+        )
+        orchestrator.parser.archive = archive
+        old = orchestrator.embedding_manager
+        orchestrator.embedding_manager = EmbeddingManager(
+            model_name=old.model_name, persist_dir=os.path.join(work_dir, "vector_store"),
+            chunk_size=old.chunk_size, chunk_overlap=old.chunk_overlap, quantization=old.quantization,
+            hnsw_params=old.hnsw_params, rerank_candidates=old.rerank_candidates, reranker=old.reranker,
+            backend=old.backend, batch_size=old.batch_size,
+            shard_router=ShardRouter(
+                os.path.join(work_dir, "vector_store", "shards"), dim=old.shard_router.dim,
+                dtype=old.shard_router.dtype, num_shards=old.shard_router.num_shards,
+                sectors=old.shard_router.sectors, memory_budget=old.shard_router.memory_budget
+            ) if old.shard_router is not None else None
+        )
+        orchestrator.differ = FilingDiffer(cache_dir=os.path.join(work_dir, "fingerprints"))
+        orchestrator.cache = ResultCache(os.path.join(work_dir, "results"))
+        if orchestrator.analyzer.llm_extractor is not None:
+            orchestrator.analyzer.llm_extractor.cache = ExtractionCache(os.path.join(work_dir, "extractions"))
+
+    retriever = orchestrator.retriever
+    retriever._dl = ReplayDownloader(
+        store, retriever.output_dir,
+        loader=lambda: Downloader(retriever.company_name, retriever.email, retriever.output_dir)
+    )
+    if store.mode == REPLAY and store.recorded_at:
+        # Look back from the day the filings were recorded, not from today
+        retriever.as_of = store.recorded_at
+
+    embedding_manager = orchestrator.embedding_manager
+    # Backends differ slightly numerically, so each records its own embeddings
+    model_key = embedding_manager.model_name if embedding_manager.backend == "sentence-transformers" \
+        else f"{embedding_manager.backend}:{embedding_manager.model_name}"
+    embedding_manager._embedding_model = ReplayEmbeddingModel(store, model_key, loader=embedding_manager.load_model)
+
+    # The router's route managers are wrapped in place, so every holder of the router is covered
+    llm = orchestrator.llm_manager
+    if hasattr(llm, "routes"):
+        for route in llm.routes.values():
+            route.manager = ReplayLLM(store, route.manager)
+    else:
+        orchestrator.llm_manager = orchestrator.insight_pipeline.llm_manager = ReplayLLM(store, llm)
+    return orchestrator
+
+
+def results_digest(results):
+    """Hash of a ticker's results without their timestamps, to compare replayed runs"""
+    stable = {key: value for key, value in results.items() if key != "processed_at"}
+    encoded = json.dumps(stable, sort_keys=True, default=lambda o: o.tolist() if hasattr(o, "tolist") else str(o))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import pickle
+import logging
+
+logger = logging.getLogger(__name__)
+
+def results_version(results):
+    """Identifier that changes whenever a ticker's results are recomputed or extended"""
+    version = json.dumps([
+        results.get("ticker"),
+        sorted(results.get("accessions", [])),
+        results.get("processed_at"),
+        "insight_sections" in results,
+    ])
+    return hashlib.sha1(version.encode("utf-8")).hexdigest()[:20]
+
+def cache_key(ticker, years=None):
+    """Cache key of a ticker's results; runs over a non-default history are kept apart"""
+    return ticker.upper() if not years else f"{ticker.upper()}.{years}Y"
+
+class ResultCache:
+    """
+    Persistent per-ticker cache of pipeline results, shared across processes.
+
+    Each ticker is stored as one pickle file; reads are served from memory until the
+    file on disk is newer (e.g. written by the precompute worker in another process).
+    A small status file per ticker records background processing state.
+    """
+
+    def __init__(self, cache_dir="data/processed/results"):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._memory = {}  # ticker -> (mtime, entry)
+
+    def __contains__(self, ticker):
+        return self.get(ticker) is not None
+
+    def __getitem__(self, ticker):
+        entry = self.get(ticker)
+        if entry is None:
+            raise KeyError(ticker)
+        return entry["results"]
+
+    def __setitem__(self, ticker, results):
+        self.put(ticker, results)
+
+    def get(self, ticker):
+        """Return {"results", "accessions", "updated_at"} for a ticker, or None"""
+        path = self._path(ticker, "results")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._memory.pop(ticker, None)
+            return None
+
+        cached = self._memory.get(ticker)
+        if cached and cached[0] >= mtime:
+            return cached[1]
+
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error reading cached results for {ticker}: {e}")
+            return None
+
+        self._memory[ticker] = (mtime, entry)
+        return entry
+
+    def put(self, ticker, results):
+        """Store results; the filing accessions they cover are kept for freshness checks"""
+        entry = {
+            "results": results,
+            "accessions": sorted(results.get("accessions", [])),
+            "updated_at": time.time()
+        }
+        path = self._path(ticker, "results")
+        self._write(path, entry)
+        self._memory[ticker] = (os.path.getmtime(path), entry)
+
+    def invalidate(self, ticker):
+        """Drop a ticker's cached results"""
+        self._memory.pop(ticker, None)
+        try:
+            os.remove(self._path(ticker, "results"))
+        except OSError:
+            pass
+
+    def get_status(self, ticker):
+        """Background processing status for a ticker ({} if none)"""
+        try:
+            with open(self._path(ticker, "status"), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+
+    def set_status(self, ticker, state, **details):
+        """Record background processing state, e.g. set_status("AAPL", "processing", accession=...)"""
+        self._write(self._path(ticker, "status"), {"state": state, "updated_at": time.time(), **details})
+
+    def _path(self, ticker, kind):
+        return os.path.join(self.cache_dir, f"{ticker.upper()}.{kind}.pkl")
+
+    def _write(self, path, value):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+class MemoryResultCache(ResultCache):
+    """ResultCache kept in this process only, for deployments without a shared disk"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._memory = {}  # ticker -> entry
+        self._status = {}
+
+    def get(self, ticker):
+        return self._memory.get(ticker.upper())
+
+    def put(self, ticker, results):
+        self._memory[ticker.upper()] = {
+            "results": results,
+            "accessions": sorted(results.get("accessions", [])),
+            "updated_at": time.time()
+        }
+
+    def invalidate(self, ticker):
+        self._memory.pop(ticker.upper(), None)
+
+    def get_status(self, ticker):
+        return self._status.get(ticker.upper(), {})
+
+    def set_status(self, ticker, state, **details):
+        self._status[ticker.upper()] = {"state": state, "updated_at": time.time(), **details}
+
+CACHE_BACKENDS = {"disk": ResultCache, "memory": MemoryResultCache}
+
+def get_result_cache(backend="disk", cache_dir="data/processed/results"):
+    """Result cache for a configured backend name"""
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown result cache backend: {backend}")
+    return CACHE_BACKENDS[backend](cache_dir)
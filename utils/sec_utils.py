@@ -3,18 +3,35 @@ import pandas as pd
 import logging
 import requests
 from bs4 import BeautifulSoup
+from utils.ticker_map import get_ticker_map
 
 logger = logging.getLogger(__name__)
 
-def validate_ticker(ticker):
-    """Validate if a ticker symbol is valid"""
+# Pieces of an EDGAR full submission (full-submission.txt): the header's form type and one
+# <DOCUMENT> per file (the filing itself, exhibits, XBRL), whose <TYPE> and <TEXT> are read
+SUBMISSION_TYPE = re.compile(r"CONFORMED SUBMISSION TYPE:\s*(\S+)")
+SUBMISSION_DOCUMENT = re.compile(r"<DOCUMENT>(.*?)</DOCUMENT>", re.S)
+DOCUMENT_TYPE = re.compile(r"<TYPE>([^\n<]+)")
+DOCUMENT_TEXT = re.compile(r"<TEXT>\s*(?:<XBRL>)?(.*?)(?:</XBRL>)?\s*</TEXT>", re.S)
+
+def validate_ticker(ticker, ticker_map=None):
+    """
+    Validate if a ticker symbol is valid.
+    
+    Once the local ticker map has been refreshed from EDGAR the symbol must also exist
+    in it; with only the bundled seed, the format check alone applies.
+    """
     if not ticker or not isinstance(ticker, str):
         return False
     
-    # Basic format validation
-    if not re.match(r'^[A-Z0-9.]{1,5}$', ticker):
+    # Basic format validation (EDGAR writes share classes as BRK-B)
+    if not re.match(r'^[A-Z0-9.\-]{1,6}$', ticker):
         return False
     
+    ticker_map = ticker_map if ticker_map is not None else get_ticker_map()
+    if ticker_map.complete:
+        return ticker in ticker_map
+    
     return True
 
 def clean_text(text):
@@ -37,6 +54,61 @@ def clean_text(text):
     
     return text
 
+def split_paragraphs(text, min_length=2):
+    """Split text on blank lines into cleaned, non-empty paragraphs"""
+    if not text:
+        return []
+    paragraphs = (clean_text(p) for p in re.split(r'\n\s*\n', text))
+    return [p for p in paragraphs if len(p) >= min_length]
+
+def primary_document(submission):
+    """
+    HTML of the primary document in an EDGAR full submission, as sec-edgar-downloader saves
+    it in primary-document.html: the <TEXT> of the first <DOCUMENT> whose type is the
+    submission's form type (else the first <DOCUMENT>), without its <XBRL> wrapper.
+
+    Returns:
+        str: The document's HTML, or None when the submission has no HTML primary document
+            (older plain-text filings).
+    """
+    documents = SUBMISSION_DOCUMENT.findall(submission)
+    if not documents:
+        return None
+    form = SUBMISSION_TYPE.search(submission)
+    primary = documents[0]
+    if form:
+        for document in documents:
+            doc_type = DOCUMENT_TYPE.search(document)
+            if doc_type and doc_type.group(1).strip() == form.group(1):
+                primary = document
+                break
+    text = DOCUMENT_TEXT.search(primary)
+    if not text or not re.search(r"<html", text.group(1), re.I):
+        return None
+    return text.group(1)
+
+def table_caption(table_elem, max_blocks=3, max_siblings=8):
+    """
+    Text of the few blocks printed just above a table, where statements give their title
+    and units ("(In millions, except per-share amounts)"), stopping at an earlier table
+    """
+    # Filings usually wrap each table in a div of its own; the caption precedes the wrapper
+    element = table_elem
+    while element.parent is not None and element.parent.name not in ("body", "[document]") \
+            and len(element.parent.find_all(True, recursive=False)) == 1:
+        element = element.parent
+    
+    blocks = []
+    for sibling in element.find_previous_siblings(limit=max_siblings):
+        if sibling.name == "table" or sibling.find("table") is not None:
+            break
+        text = clean_text(sibling.get_text(" "))
+        if text:
+            blocks.append(text)
+            if len(blocks) == max_blocks:
+                break
+    return " ".join(reversed(blocks))
+
 def extract_tables(soup):
     """Extract tables from BeautifulSoup object"""
     if not soup:
@@ -68,16 +140,17 @@ def extract_tables(soup):
             if row_data:  # Only add non-empty rows
                 table_data.append(row_data)
         
-        # Only process tables with actual data
-        if len(table_data) >= 3 and all(len(row) > 1 for row in table_data):
+        # Only process tables with actual data; statements keep single-cell heading rows ("ASSETS:")
+        if len(table_data) >= 3 and sum(len(row) > 1 for row in table_data) >= 3:
             # Convert to pandas DataFrame
             try:
                 # Use first row as header if it looks like a header
                 df = pd.DataFrame(table_data[1:], columns=table_data[0])
-                tables.append(df)
             except:
                 # If that fails, just use default column names
                 df = pd.DataFrame(table_data)
-                tables.append(df)
+            # Units are often stated above the table rather than in it (see detect_table_scale)
+            df.attrs["caption"] = table_caption(table_elem)
+            tables.append(df)
     
     return tables
@@ -0,0 +1,96 @@
+import re
+import pandas as pd
+
+INCOME_STATEMENT = "income_statement"
+BALANCE_SHEET = "balance_sheet"
+CASH_FLOW = "cash_flow"
+SEGMENT = "segment"
+OTHER = "other"
+
+STATEMENT_TYPES = [INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW]
+
+# Line items that characterize each statement; a table's score is the number of distinct
+# keywords found among its row labels and header
+TABLE_KEYWORDS = {
+    INCOME_STATEMENT: [
+        "net sales", "total net sales", "revenue", "cost of sales", "cost of revenue", "gross margin",
+        "gross profit", "operating expenses", "operating income", "income from operations",
+        "income before provision", "income before income taxes", "provision for income taxes",
+        "net income", "earnings per share", "basic", "diluted"
+    ],
+    BALANCE_SHEET: [
+        "total assets", "current assets", "total current assets", "total liabilities",
+        "current liabilities", "total current liabilities", "accounts receivable", "inventories",
+        "property, plant and equipment", "accounts payable", "retained earnings", "accumulated deficit",
+        "shareholders' equity", "stockholders' equity", "commercial paper", "deferred revenue"
+    ],
+    CASH_FLOW: [
+        "operating activities", "investing activities", "financing activities",
+        "depreciation and amortization", "share-based compensation", "stock-based compensation",
+        "changes in operating assets", "cash generated by", "net cash provided by", "net cash used in",
+        "payments for acquisition", "purchases of property", "capital expenditures",
+        "repurchases of common stock", "payments for dividends", "beginning balances", "ending balances"
+    ],
+    SEGMENT: [
+        "segment", "americas", "europe", "greater china", "asia pacific", "rest of asia pacific",
+        "japan", "emea", "international", "geographic", "other countries", "u.s."
+    ],
+}
+
+# Minimum distinct keyword matches before a table is tagged with a type
+MIN_MATCHES = {INCOME_STATEMENT: 5, BALANCE_SHEET: 4, CASH_FLOW: 3, SEGMENT: 3}
+
+_PATTERNS = {
+    table_type: re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+    for table_type, keywords in TABLE_KEYWORDS.items()
+}
+
+
+def table_text(table, header_rows=3):
+    """Lowercased row labels and header cells of a table, the classifier's only input"""
+    cells = table.to_numpy(dtype=object)
+    parts = list(table.columns) + list(cells[:, 0]) + list(cells[:header_rows].ravel())
+    return " | ".join(map(str, parts)).lower().replace("’", "'")
+
+
+def score_table(table):
+    """Distinct keyword matches per table type"""
+    text = table_text(table)
+    return {table_type: len(set(pattern.findall(text))) for table_type, pattern in _PATTERNS.items()}
+
+
+def classify_table(table):
+    """
+    Tag a table as an income statement, balance sheet, cash flow statement, segment
+    disclosure or other.
+
+    Returns:
+        str: One of INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW, SEGMENT or OTHER.
+    """
+    if not isinstance(table, pd.DataFrame) or table.empty or table.shape[1] < 2:
+        return OTHER
+
+    scores = score_table(table)
+    table_type, score = max(scores.items(), key=lambda item: item[1])
+    return table_type if score >= MIN_MATCHES[table_type] else OTHER
+
+
+def classify_tables(tables):
+    """Tags for a list of tables, in the same order"""
+    return [classify_table(table) for table in tables]
+
+
+def index_tables(tables, table_types=None):
+    """
+    Group table positions by type.
+
+    Returns:
+        dict: {table_type: [index, ...]} covering every table.
+    """
+    if table_types is None or len(table_types) != len(tables):
+        table_types = classify_tables(tables)
+
+    index = {}
+    for i, table_type in enumerate(table_types):
+        index.setdefault(table_type, []).append(i)
+    return index
@@ -0,0 +1,191 @@
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import difflib
+import logging
+import argparse
+import requests
+
+logger = logging.getLogger(__name__)
+
+COMPANY_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEED_PATH = "data/company_tickers.json"
+INDEX_PATH = "data/processed/ticker_map.pkl"
+
+# Words ignored when matching company names
+NAME_STOPWORDS = {"inc", "corp", "corporation", "co", "company", "ltd", "plc", "the", "group", "holdings", "sa", "nv", "lp"}
+
+
+def normalize_name(name):
+    """Lowercase a company name and drop punctuation and legal suffixes"""
+    words = re.findall(r"[a-z0-9]+", name.lower())
+    return " ".join(word for word in words if word not in NAME_STOPWORDS)
+
+
+class TickerMap:
+    """
+    In-memory ticker -> CIK index built from EDGAR's company_tickers.json.
+
+    Lookups are dict accesses. The index is pickled to INDEX_PATH by refresh(); until then
+    the small bundled seed (data/company_tickers.json) is used, which only covers
+    well-known companies and is therefore marked incomplete.
+    """
+
+    def __init__(self, index_path=INDEX_PATH, seed_path=SEED_PATH):
+        self.index_path = index_path
+        self.seed_path = seed_path
+        self.ciks = {}    # ticker -> int CIK
+        self.titles = {}  # ticker -> company name
+        self.complete = False
+        self.updated_at = None
+        self._names = None  # normalized name -> [tickers], built on first search
+        self.load()
+
+    def __contains__(self, ticker):
+        return ticker.upper() in self.ciks
+
+    def __len__(self):
+        return len(self.ciks)
+
+    def get_cik(self, ticker):
+        """Return the zero-padded 10-digit CIK for a ticker, or None"""
+        cik = self.ciks.get(ticker.upper())
+        return str(cik).zfill(10) if cik is not None else None
+
+    def get_title(self, ticker):
+        return self.titles.get(ticker.upper())
+
+    def search(self, query, limit=5):
+        """
+        Fuzzy search by ticker or company name.
+
+        Returns:
+            list: (ticker, title) pairs, best match first.
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        matches = []
+        if query.upper() in self.ciks:
+            matches.append(query.upper())
+
+        if self._names is None:
+            self._names = {}
+            for ticker, title in self.titles.items():
+                self._names.setdefault(normalize_name(title), []).append(ticker)
+
+        normalized = normalize_name(query)
+        # Prefix matches first ("micro" -> Microsoft), then close spellings
+        names = [name for name in self._names if name.startswith(normalized)] if normalized else []
+        names.sort(key=len)
+        names += difflib.get_close_matches(normalized, self._names.keys(), n=limit, cutoff=0.6)
+        for name in names:
+            for ticker in self._names[name]:
+                if ticker not in matches:
+                    matches.append(ticker)
+
+        return [(ticker, self.titles.get(ticker, "")) for ticker in matches[:limit]]
+
+    def load(self):
+        """Load the pickled index, falling back to the bundled seed"""
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, "rb") as f:
+                    state = pickle.load(f)
+                self.ciks, self.titles = state["ciks"], state["titles"]
+                self.complete, self.updated_at = state["complete"], state["updated_at"]
+                self._names = None
+                return
+        except Exception as e:
+            logger.error(f"Error loading ticker index {self.index_path}: {e}")
+
+        try:
+            with open(self.seed_path) as f:
+                self._from_company_tickers(json.load(f), complete=False)
+        except Exception as e:
+            logger.error(f"Error loading ticker seed {self.seed_path}: {e}")
+
+    def refresh(self, source=COMPANY_TICKERS_URL, user_agent="YourCompanyName your.email@example.com"):
+        """
+        Rebuild the index from company_tickers.json and persist it.
+
+        Args:
+            source (str): EDGAR URL or path to a local copy of company_tickers.json.
+
+        Returns:
+            int: Number of tickers indexed.
+        """
+        if source.startswith(("http://", "https://")):
+            response = requests.get(source, headers={"User-Agent": user_agent}, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+        else:
+            with open(source) as f:
+                data = json.load(f)
+
+        self._from_company_tickers(data, complete=True)
+        self.updated_at = time.time()
+
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "ciks": self.ciks,
+                "titles": self.titles,
+                "complete": self.complete,
+                "updated_at": self.updated_at
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.index_path)
+
+        logger.info(f"Indexed {len(self.ciks)} tickers from {source}")
+        return len(self.ciks)
+
+    def _from_company_tickers(self, data, complete):
+        # company_tickers.json is {"0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."}, ...}
+        ciks, titles = {}, {}
+        for row in data.values():
+            ticker = str(row["ticker"]).upper()
+            ciks[ticker] = int(row["cik_str"])
+            titles[ticker] = row["title"]
+        self.ciks, self.titles, self.complete = ciks, titles, complete
+        self._names = None
+
+
+_default_map = None
+
+
+def get_ticker_map():
+    """Process-wide TickerMap, loaded on first use"""
+    global _default_map
+    if _default_map is None:
+        _default_map = TickerMap()
+    return _default_map
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local ticker -> CIK index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser("refresh", help="Rebuild the index from company_tickers.json")
+    refresh_parser.add_argument("--source", default=COMPANY_TICKERS_URL, help="URL or local file")
+    refresh_parser.add_argument("--user-agent", default=os.environ.get("SEC_USER_AGENT", "YourCompanyName yourname@email.com"))
+
+    search_parser = subparsers.add_parser("search", help="Find tickers by name")
+    search_parser.add_argument("query")
+
+    args = parser.parse_args(argv)
+    ticker_map = TickerMap()
+    if args.command == "refresh":
+        count = ticker_map.refresh(args.source, user_agent=args.user_agent)
+        print(f"Indexed {count} tickers")
+    else:
+        for ticker, title in ticker_map.search(args.query):
+            print(f"{ticker:8} {title}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())